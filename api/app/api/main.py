@@ -1,9 +1,11 @@
 from fastapi import APIRouter
 
-from api.routes import topology, chat, devices
+from api.routes import topology, chat, devices, knowledge, metrics
 
 api_router = APIRouter(prefix="/v1")
 
 api_router.include_router(topology.router)
 api_router.include_router(chat.router)
-api_router.include_router(devices.router)
\ No newline at end of file
+api_router.include_router(devices.router)
+api_router.include_router(knowledge.router)
+api_router.include_router(metrics.router)
\ No newline at end of file
@@ -1,6 +1,5 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
-from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
 from services import llm
@@ -13,26 +12,25 @@ class RenameChatRequest(BaseModel):
 router = APIRouter(prefix="/topologies", tags=["LLM", "Chat"])
 
 @router.get("/{topology_id}/chat")
-def get_chat_sessions(topology_id: str):
-    return chat.get_chat_sessions_by_topology(topology_id)
+async def get_chat_sessions(topology_id: str):
+    return await chat.get_chat_sessions_by_topology(topology_id)
 
 @router.delete("/{topology_id}/chat/{session_id}")
-def delete_chat_session(session_id: str):
-    chat_id = chat.delete_chat_session_by_id(session_id)
+async def delete_chat_session(session_id: str):
+    chat_id = await chat.delete_chat_session_by_id(session_id)
     return {"status": "deleted", "id": chat_id}
 
 @router.put("/{topology_id}/chat/{session_id}")
 async def rename_chat_session(session_id: str, request: RenameChatRequest):
-    chat_id = await run_in_threadpool(
-        chat.rename_chat_session,
+    chat_id = await chat.rename_chat_session(
         session_id,
         request.title
     )
     return {"status": "renamed", "id": chat_id}
 
 @router.get("/{topology_id}/chat/{session_id}/history")
-def get_chat_history(topology_id: str, session_id: str):
-    history = chat.get_chat_history_by_session(session_id, topology_id)
+async def get_chat_history(topology_id: str, session_id: str):
+    history = await chat.get_chat_history_by_session(session_id, topology_id)
     if history is None:
         raise HTTPException(status_code=404, detail="Session not found in this topology")
     return history
@@ -42,17 +40,13 @@ async def send_message(topology_id: str, session_id: str, msg: ChatMessageIn):
     current_session_id = session_id
     
     if session_id == "new":
-        topology_exists = await run_in_threadpool(
-            chat.check_topology_exists,
-            topology_id
-        )
+        topology_exists = await chat.check_topology_exists(topology_id)
         if not topology_exists:
             raise HTTPException(status_code=404, detail="Topology not found")
         
         session_title = (msg.content[:30] + '...') if len(msg.content) > 30 else msg.content
         
-        current_session_id = await run_in_threadpool(
-            chat.create_chat_session,
+        current_session_id = await chat.create_chat_session(
             topology_id,
             session_title,
             'ask',
@@ -61,13 +55,9 @@ async def send_message(topology_id: str, session_id: str, msg: ChatMessageIn):
         conversation_history = []
     else:
         current_session_id = session_id
-        conversation_history = await run_in_threadpool(
-            chat.get_conversation_history,
-            current_session_id
-        )
+        conversation_history = await chat.get_conversation_history(current_session_id)
 
-    await run_in_threadpool(
-        chat.save_chat_message,
+    await chat.save_chat_message(
         current_session_id,
         "user",
         msg.content
@@ -104,32 +94,26 @@ async def send_message_agent(topology_id: str, session_id: str, msg: ChatMessage
     current_session_id = session_id
     
     if session_id == "new":
-        topology_exists = await run_in_threadpool(
-            chat.check_topology_exists,
-            topology_id
-        )
+        topology_exists = await chat.check_topology_exists(topology_id)
         if not topology_exists:
             raise HTTPException(status_code=404, detail="Topology not found")
         
         session_title = (msg.content[:30] + '...') if len(msg.content) > 30 else msg.content
         
-        current_session_id = await run_in_threadpool(
-            chat.create_chat_session,
+        current_session_id = await chat.create_chat_session(
             topology_id,
             session_title,
             'agent',
             msg.model
         )
 
-    await run_in_threadpool(
-        chat.save_chat_message,
+    await chat.save_chat_message(
         current_session_id,
         "user",
         msg.content
     )
 
-    history = await run_in_threadpool(
-        chat.get_conversation_history,
+    history = await chat.get_conversation_history(
         current_session_id,
         2
     )
@@ -154,8 +138,7 @@ async def send_message_agent(topology_id: str, session_id: str, msg: ChatMessage
 
         # 5. Save Final Assistant Response
         if full_response:
-             await run_in_threadpool(
-                chat.save_chat_message,
+             await chat.save_chat_message(
                 current_session_id,
                 "assistant",
                 full_response
@@ -172,17 +155,13 @@ async def send_message_local(topology_id: str, session_id: str, msg: ChatMessage
     current_session_id = session_id
     
     if session_id == "new":
-        topology_exists = await run_in_threadpool(
-            chat.check_topology_exists,
-            topology_id
-        )
+        topology_exists = await chat.check_topology_exists(topology_id)
         if not topology_exists:
             raise HTTPException(status_code=404, detail="Topology not found")
         
         session_title = (msg.content[:30] + '...') if len(msg.content) > 30 else msg.content
         
-        current_session_id = await run_in_threadpool(
-            chat.create_chat_session,
+        current_session_id = await chat.create_chat_session(
             topology_id,
             session_title,
             'local',
@@ -191,14 +170,12 @@ async def send_message_local(topology_id: str, session_id: str, msg: ChatMessage
         conversation_history = []
     else:
         current_session_id = session_id
-        conversation_history = await run_in_threadpool(
-            chat.get_conversation_history,
+        conversation_history = await chat.get_conversation_history(
             current_session_id,
             2
         )
 
-    await run_in_threadpool(
-        chat.save_chat_message,
+    await chat.save_chat_message(
         current_session_id,
         "user",
         msg.content
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException
 
-from services import gns3, devices
+from datetime import datetime
+
+from services import gns3, devices, snapshots, inventory, config_cache
 
 
 task_status = {}
@@ -9,38 +11,78 @@ router = APIRouter(prefix="/topologies", tags=["ansible", "topology"])
 
 @router.get("/{topology_id}/devices")
 async def get_devices(topology_id: str):
-    gns_nodes = gns3.get_devices(topology_id)
+    gns_nodes = await inventory.get_nodes(topology_id)
 
     device_ids = set([n['node_id'] for n in gns_nodes])
     
-    for n in gns_nodes:
-        devices.create_new_device(
-            topology_id, 
-            n["node_id"], 
-            n["name"],
-            n.get("device_type"),
-            n.get("port")
-        )
+    # A followed project is already kept in sync by its notification stream
+    if not inventory.is_live(topology_id):
+        counts = await devices.sync_devices(topology_id, gns_nodes)
+        if counts["inserted"] or counts["updated"] or counts["removed"]:
+            config_cache.invalidate_devices(topology_id)
     
-    ds = devices.get_devices_with_config(topology_id)
+    ds = await devices.get_devices_with_config_async(topology_id)
     
     final = [d for d in ds if d["device_id"] in device_ids]
 
     return final
 
+@router.post("/{topology_id}/devices/sync")
+async def sync_devices(topology_id: str):
+    """Sync devices from GNS3 and report how many rows were inserted, updated and removed"""
+    gns_nodes = await gns3.get_devices(topology_id)
+
+    if not gns_nodes:
+        raise HTTPException(status_code=502, detail="No nodes returned by GNS3")
+
+    result = await devices.sync_devices(topology_id, gns_nodes)
+    config_cache.invalidate_devices(topology_id)
+
+    return result
+
+@router.get("/{topology_id}/devices/{device_id}/config")
+async def get_device_config(topology_id: str, device_id: str, at: datetime = None):
+    """Latest stored running-config for one device, or the one in effect at `at`"""
+    if at:
+        config = await snapshots.get_config_at(topology_id, device_id, at)
+    else:
+        config = await devices.get_latest_config_async(topology_id, device_id)
+
+    if not config:
+        raise HTTPException(status_code=404, detail="No config snapshot found for this device")
+    
+    return config
+
+@router.get("/{topology_id}/devices/{device_id}/config/history")
+async def get_device_config_history(topology_id: str, device_id: str, limit: int = 50):
+    return await snapshots.get_history(topology_id, device_id, limit)
+
+@router.get("/{topology_id}/devices/{device_id}/config/diff")
+async def get_device_config_diff(topology_id: str, device_id: str, from_id: str, to_id: str = None):
+    """Diff between two snapshots, `to_id` defaults to the latest snapshot"""
+    diff = await snapshots.diff_snapshots(topology_id, device_id, from_id, to_id)
+
+    if not diff:
+        raise HTTPException(status_code=404, detail="Snapshot not found for this device")
+    
+    return diff
+
 @router.patch("/{topology_id}/devices/{device_id}")
-def update_device_ip(topology_id: str, device_id: str, body: dict):
+async def update_device_ip(topology_id: str, device_id: str, body: dict):
     ip_address = body.get('ip_address')
 
     if not ip_address:
         raise HTTPException(status_code=400, detail="ip_address is required")
     
     try:
-        result = devices.update_device_ip(topology_id, device_id, ip_address)
+        result = await devices.update_device_ip(topology_id, device_id, ip_address)
         
         if not result:
             raise HTTPException(status_code=404, detail="Device not found")
         
+        inventory.set_ip_address(topology_id, device_id, ip_address)
+        config_cache.invalidate_devices(topology_id)
+
         return {"status": "updated", "device_id": result}
     except Exception as e:
         error_msg = str(e)
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+
+from services import knowledge
+
+router = APIRouter(prefix="/knowledge", tags=["knowledge"])
+
+@router.delete("/cache")
+async def invalidate_knowledge_cache(model: str = None):
+    """Forget cached LightRAG answers (for one model or all), e.g. after reindexing"""
+    removed = await knowledge.invalidate(model)
+
+    return {"status": "invalidated", "model": model, "stored_rows_removed": removed}
@@ -0,0 +1,70 @@
+from fastapi import APIRouter
+
+from utils import db
+from services import backends, compaction, config_cache, context, gns3, inventory, knowledge, llm, scheduler, ssh, jobs
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/db")
+async def get_db_pool_metrics():
+    """Connection pool size, checkouts and saturation for this process"""
+    return {
+        "sync": db.get_pool_stats(),
+        "async": db.get_async_pool_stats(),
+    }
+
+
+@router.get("/compaction")
+async def get_compaction_metrics():
+    """Rows and bytes reclaimed by the retention worker"""
+    return compaction.compaction_stats
+
+@router.get("/gns3")
+async def get_gns3_metrics():
+    """Hit/miss counters of the GNS3 project and node cache"""
+    return gns3.gns3_cache.get_stats()
+
+@router.get("/inventory")
+async def get_inventory_metrics():
+    """State of the GNS3 notification subscriptions"""
+    return inventory.get_stats()
+
+@router.get("/ssh")
+async def get_ssh_metrics():
+    """Pooled SSH sessions used by fetch_live_config"""
+    return ssh.get_stats()
+
+@router.get("/jobs")
+async def get_job_metrics():
+    """Number of jobs per status across all workers"""
+    return await jobs.get_stats()
+
+@router.get("/config-cache")
+async def get_config_cache_metrics():
+    """Hit rates of the running-config and device list caches used by agent tools"""
+    return config_cache.get_stats()
+
+@router.get("/http")
+async def get_http_metrics():
+    """Requests and new TCP connections of the shared llama-server/LightRAG clients"""
+    return llm.get_http_stats()
+
+@router.get("/context")
+async def get_context_metrics():
+    """Calibrated chars/token, prompt cache hits per model and how often agent context was trimmed"""
+    return context.get_stats()
+
+@router.get("/knowledge")
+async def get_knowledge_metrics():
+    """Hits, evictions and upstream calls of the LightRAG context cache"""
+    return knowledge.get_stats()
+
+@router.get("/devices")
+async def get_device_scheduler_metrics():
+    """Per-device queue depth, wait time and coalesced reads of the operation scheduler"""
+    return scheduler.get_stats()
+
+@router.get("/backends")
+async def get_backend_metrics():
+    """Health, in-flight requests and ejections of each llama-server/LightRAG replica"""
+    return backends.get_stats()
\ No newline at end of file
@@ -1,19 +1,35 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
+import asyncio
 import httpx
+import json
+import uuid
 
 from models.domain import UserTopologyIn
 
-from services import gns3, topologies, ansible, devices as devices_services
+from services import gns3, topologies, jobs, task_events, devices as devices_services
 
 router = APIRouter(prefix="/topologies", tags=["ansible", "topology"])
 
+TERMINAL_TASK_STATUS = ("completed", "failed")
+
+def _sse(event: str, data: dict):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _check_task_id(task_id: str):
+    """Task ids are job UUIDs; anything else would fail the jobs.id lookup"""
+    try:
+        uuid.UUID(task_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Task not found")
+
 @router.get("/")
 async def get_topologies():
     """List all topologies/projects from GNS3 Server"""
 
     try:
-        projects = gns3.get_project_lists()
+        projects = await gns3.get_project_lists()
 
         return projects
     except httpx.HTTPError as e:
@@ -22,11 +38,11 @@ async def get_topologies():
 
 @router.get("/{topology_id}")
 async def get_topology_detail(topology_id: str):
-    gns_data = gns3.get_project_detail(topology_id)
+    gns_data = await gns3.get_project_detail(topology_id)
 
-    topologies.create_new_topology(gns_data["project_id"], gns_data["name"])
+    await topologies.create_new_topology(gns_data["project_id"], gns_data["name"])
 
-    result = topologies.get_topology_detail(topology_id)
+    result = await topologies.get_topology_detail_async(topology_id)
     if not result:
         raise HTTPException(status_code=404, detail="Topology not found")
     
@@ -34,7 +50,7 @@ async def get_topology_detail(topology_id: str):
 
 @router.patch("/{topology_id}")
 async def update_user_topology(topology_id: str, user: UserTopologyIn):
-    result = topologies.update_user_topology(topology_id, user.username, user.password)
+    result = await topologies.update_user_topology(topology_id, user.username, user.password)
 
     if not result:
         raise HTTPException(status_code=404, detail="Topology not found")
@@ -44,24 +60,78 @@ async def update_user_topology(topology_id: str, user: UserTopologyIn):
 
 
 @router.get("/{topology_id}/task/{task_id}")
-def get_task_status(topology_id: str, task_id: str):
+async def get_task_status(topology_id: str, task_id: str):
     """Get the status of a background task"""
-    if task_id not in ansible.task_status:
+    _check_task_id(task_id)
+
+    task = await jobs.get_job(task_id)
+    if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task = ansible.task_status[task_id]
     if task["topology_id"] != topology_id:
         raise HTTPException(status_code=404, detail="Task not found for this topology")
     
     return task
 
+@router.get("/{topology_id}/task/{task_id}/events")
+async def stream_task_events(topology_id: str, task_id: str):
+    """
+    Server-sent events for a background task: the current state first, then
+    'progress' and per-'device' events as they happen, and a final 'summary'.
+    """
+    _check_task_id(task_id)
+
+    queue = task_events.subscribe(task_id)
+
+    task = await jobs.get_job(task_id)
+    if not task or task["topology_id"] != topology_id:
+        task_events.unsubscribe(task_id, queue)
+        raise HTTPException(status_code=404, detail="Task not found for this topology")
+
+    async def event_stream():
+        current = task
+        # The job row can be deleted while the stream is open
+        gone = _sse("error", {"task_id": task_id, "detail": "Task no longer exists"})
+
+        try:
+            yield _sse("progress", current)
+
+            while current["status"] not in TERMINAL_TASK_STATUS:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Catch up in case a notification was missed while reconnecting
+                    current = await jobs.get_job(task_id)
+                    if current is None:
+                        yield gone
+                        return
+
+                    yield ": keepalive\n\n"
+                    continue
+
+                if event.get("type") == "progress":
+                    current = {**current, **event}
+
+                yield _sse(event.get("type", "progress"), event)
+
+            summary = await jobs.get_job(task_id)
+            if summary is None:
+                yield gone
+                return
+
+            yield _sse("summary", summary)
+        finally:
+            task_events.unsubscribe(task_id, queue)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @router.post("/{topology_id}/config/refresh")
-def refresh_configs(topology_id: str, background_task: BackgroundTasks):
+async def refresh_configs(topology_id: str):
     """
     Trigger Ansible to fetch configs for ALL devices in this specific topology.
     """
     
-    device_list = devices_services.get_devices_with_config(topology_id)
+    device_list = await devices_services.list_devices_async(topology_id)
 
     if not device_list:
         raise HTTPException(status_code=400, detail="No devices found. Sync first.")
@@ -71,20 +141,11 @@ def refresh_configs(topology_id: str, background_task: BackgroundTasks):
     if not valid_devices:
         raise HTTPException(status_code=400, detail="No routers with IP addresses found. Please set IP addresses for routers first.")
     
-    import uuid
-    task_id = str(uuid.uuid4())
-
-    ansible.task_status[task_id] = {
-        "status": "running",
-        "topology_id": topology_id,
-        "progress": 0,
-        "total_devices": len(valid_devices),
-        "completed_devices": 0,
-        "message": "Starting config refresh..."
-    }
-    
-    background_task.add_task(ansible.run_fetch_config, topology_id, task_id)
-
-    return {"status": "queued", "task_id": task_id, "message": "Config refresh started in background"}
-
-
+    task_id = await jobs.enqueue_job(
+        "config_refresh",
+        topology_id,
+        total_devices=len(valid_devices),
+        message="Waiting for a worker..."
+    )
+
+    return {"status": "queued", "task_id": task_id, "message": "Config refresh queued"}
\ No newline at end of file
@@ -8,26 +8,127 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ANSIBLE_DIR = os.path.join(BASE_DIR, "../ansible")
 CONFIG_DIR = os.path.join(BASE_DIR, "../configs")
 
-PUSH_CONFIG_PLAYBOOK = "push_config.yml"
+PUSH_CONFIG_BATCH_PLAYBOOK = "push_config_batch.yml"
 GET_CONFIG_PLAYBOOK = "get_config.yml"
 
+ANSIBLE_FORKS = int(os.getenv("ANSIBLE_FORKS", "10"))
+
+# Background jobs (config refresh) are claimed from the jobs table
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_CONCURRENT = int(os.getenv("JOB_MAX_CONCURRENT", "4"))
+JOB_MAX_PER_TOPOLOGY = int(os.getenv("JOB_MAX_PER_TOPOLOGY", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "10"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+# A running job without a heartbeat for this long is handed to another worker
+JOB_LEASE_TIMEOUT = float(os.getenv("JOB_LEASE_TIMEOUT", "600"))
+# How long shutdown waits for running jobs before putting them back in the queue
+JOB_SHUTDOWN_TIMEOUT = float(os.getenv("JOB_SHUTDOWN_TIMEOUT", "30"))
+
+# Persistent SSH sessions for show commands, Ansible is used when they fail
+SSH_POOL_ENABLED = os.getenv("SSH_POOL_ENABLED", "true").lower() == "true"
+SSH_PORT = int(os.getenv("SSH_PORT", "22"))
+SSH_CONNECT_TIMEOUT = int(os.getenv("SSH_CONNECT_TIMEOUT", "10"))
+SSH_IDLE_TIMEOUT = float(os.getenv("SSH_IDLE_TIMEOUT", "300"))
+SSH_KEEPALIVE_INTERVAL = float(os.getenv("SSH_KEEPALIVE_INTERVAL", "60"))
+# How long a command may take to print its output and return to the prompt
+SSH_COMMAND_TIMEOUT = float(os.getenv("SSH_COMMAND_TIMEOUT", "30"))
+
 os.makedirs(CONFIG_DIR, exist_ok=True)
 
+def _urls(value: str):
+    """Comma separated list of replica URLs"""
+    return [url.strip() for url in (value or "").split(",") if url.strip()]
+
+# model -> replica URLs
 LIGHTRAG_URL = {
-    "qwen": os.getenv("LIGHTRAG_QWEN_URL"),
-    "deepseek": os.getenv("LIGHTRAG_DEEPSEEK_URL"),
-    "gemma": os.getenv("LIGHTRAG_GEMMA_URL"),
+    "qwen": _urls(os.getenv("LIGHTRAG_QWEN_URL")),
+    "deepseek": _urls(os.getenv("LIGHTRAG_DEEPSEEK_URL")),
+    "gemma": _urls(os.getenv("LIGHTRAG_GEMMA_URL")),
 }
 
 LLAMA_SERVER_URL = {
-    "qwen": os.getenv("LLAMA_SERVER_QWEN_URL"),
-    "deepseek": os.getenv("LLAMA_SERVER_DEEPSEEK_URL"),
-    "gemma": os.getenv("LLAMA_SERVER_GEMMA_URL"),
+    "qwen": _urls(os.getenv("LLAMA_SERVER_QWEN_URL")),
+    "deepseek": _urls(os.getenv("LLAMA_SERVER_DEEPSEEK_URL")),
+    "gemma": _urls(os.getenv("LLAMA_SERVER_GEMMA_URL")),
 }
 GNS_URL = os.getenv("GNS_URL")
 GNS_IP = os.getenv("GNS_IP")
 
+GNS3_TIMEOUT = float(os.getenv("GNS3_TIMEOUT", "10"))
+GNS3_MAX_CONNECTIONS = int(os.getenv("GNS3_MAX_CONNECTIONS", "20"))
+# Seconds project and node lists are served from memory
+GNS3_CACHE_TTL = float(os.getenv("GNS3_CACHE_TTL", "5"))
+# Follow /projects/{id}/notifications to keep device inventory in memory
+GNS3_NOTIFICATIONS_ENABLED = os.getenv("GNS3_NOTIFICATIONS_ENABLED", "false").lower() == "true"
+GNS3_NOTIFICATIONS_RETRY = float(os.getenv("GNS3_NOTIFICATIONS_RETRY", "5"))
+
 DB_NAME = os.getenv("DB_NAME")
 DB_HOST = os.getenv("DB_HOST")
 DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
\ No newline at end of file
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_PORT = os.getenv("DB_PORT", "5432")
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "30"))
+# The async pool serves the async routes next to the sync pool above, Postgres
+# sees up to DB_POOL_MAX_SIZE + DB_ASYNC_POOL_MAX_SIZE connections from the API
+DB_ASYNC_POOL_MIN_SIZE = int(os.getenv("DB_ASYNC_POOL_MIN_SIZE", "1"))
+DB_ASYNC_POOL_MAX_SIZE = int(os.getenv("DB_ASYNC_POOL_MAX_SIZE", "5"))
+
+# Every Nth snapshot of a device keeps its full text, the rest are stored as deltas
+SNAPSHOT_KEYFRAME_INTERVAL = int(os.getenv("SNAPSHOT_KEYFRAME_INTERVAL", "20"))
+
+# Comma separated "max_age:granularity" tiers, "all" keeps every snapshot, "*" is any age
+SNAPSHOT_RETENTION = os.getenv("SNAPSHOT_RETENTION", "7d:all,30d:1h,*:1d")
+# Chat messages older than this are deleted, 0 keeps them forever
+CHAT_RETENTION_DAYS = int(os.getenv("CHAT_RETENTION_DAYS", "0"))
+
+# Seconds between compaction passes, 0 disables the worker
+COMPACTION_INTERVAL = float(os.getenv("COMPACTION_INTERVAL", "3600"))
+COMPACTION_BATCH_SIZE = int(os.getenv("COMPACTION_BATCH_SIZE", "200"))
+# Upper bound in seconds on how old a cached running-config / device list may be
+CONFIG_CACHE_TTL = float(os.getenv("CONFIG_CACHE_TTL", "300"))
+CONFIG_CACHE_MAX_SIZE = int(os.getenv("CONFIG_CACHE_MAX_SIZE", "1024"))
+# Default "fresh enough" age for fetch_live_config when the agent doesn't pass one
+CONFIG_CACHE_MAX_AGE = float(os.getenv("CONFIG_CACHE_MAX_AGE", "60"))
+
+# Read-only tool calls from one model turn run concurrently up to this many
+TOOL_CALL_CONCURRENCY = int(os.getenv("TOOL_CALL_CONCURRENCY", "4"))
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", "120"))
+
+# Shared HTTP clients for llama-server and LightRAG, opened in the app lifespan
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LIGHTRAG_TIMEOUT = float(os.getenv("LIGHTRAG_TIMEOUT", "30"))
+LIGHTRAG_MAX_CONNECTIONS = int(os.getenv("LIGHTRAG_MAX_CONNECTIONS", "16"))
+
+# Used when llama-server's /props can't be read; completion space is kept free
+LLM_CONTEXT_WINDOW = int(os.getenv("LLM_CONTEXT_WINDOW", "49152"))
+# Seconds before a llama-server whose /props failed is asked again
+LLM_PROPS_RETRY = float(os.getenv("LLM_PROPS_RETRY", "30"))
+LLM_COMPLETION_RESERVE = int(os.getenv("LLM_COMPLETION_RESERVE", "4096"))
+# Most recent tool outputs that are never evicted from the agent context
+CONTEXT_KEEP_RECENT_TOOLS = int(os.getenv("CONTEXT_KEEP_RECENT_TOOLS", "4"))
+# Pin each chat session to one llama-server slot (id_slot) to reuse its KV cache
+LLM_SLOT_AFFINITY = os.getenv("LLM_SLOT_AFFINITY", "true").lower() == "true"
+
+# LightRAG context cache keyed by model, mode and normalized query
+KNOWLEDGE_CACHE_TTL = float(os.getenv("KNOWLEDGE_CACHE_TTL", "86400"))
+KNOWLEDGE_CACHE_MAX_SIZE = int(os.getenv("KNOWLEDGE_CACHE_MAX_SIZE", "512"))
+# Also keep answers in the knowledge_cache table so they survive restarts
+KNOWLEDGE_CACHE_PERSIST = os.getenv("KNOWLEDGE_CACHE_PERSIST", "false").lower() == "true"
+
+# Concurrent read connections per device; pushes always get the device alone
+DEVICE_MAX_CONNECTIONS = int(os.getenv("DEVICE_MAX_CONNECTIONS", "1"))
+
+# Active /health probes of llama-server and LightRAG replicas
+BACKEND_HEALTH_INTERVAL = float(os.getenv("BACKEND_HEALTH_INTERVAL", "10"))
+BACKEND_HEALTH_TIMEOUT = float(os.getenv("BACKEND_HEALTH_TIMEOUT", "2"))
+# Consecutive errors before a replica is ejected until its health check passes
+BACKEND_MAX_FAILURES = int(os.getenv("BACKEND_MAX_FAILURES", "3"))
+# Seconds a chat session keeps going to the replica it used last
+BACKEND_STICKY_TTL = float(os.getenv("BACKEND_STICKY_TTL", "3600"))
@@ -1,9 +1,57 @@
+import asyncio
+
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 
 from api.main import api_router
 from app.mcp.server import mcp_app
+from utils import db
+import worker
+from services import backends, compaction, gns3, inventory, llm, ssh, task_events
+from config import BACKEND_HEALTH_INTERVAL, COMPACTION_INTERVAL, JOB_WORKERS
+
+async def _stop(task: asyncio.Task):
+    """Cancel a background task and wait until it has unwound"""
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await db.get_async_pool()
+    await gns3.start()
+
+    worker_threads, worker_stop = worker.start_workers(JOB_WORKERS) if JOB_WORKERS > 0 else ([], None)
+
+    compaction_task = asyncio.create_task(compaction.compaction_worker()) if COMPACTION_INTERVAL > 0 else None
+    health_task = asyncio.create_task(backends.health_worker()) if BACKEND_HEALTH_INTERVAL > 0 else None
+
+    async with mcp_app.lifespan(app):
+        await llm.start()
+        try:
+            yield
+        finally:
+            await llm.close()
+
+    if compaction_task:
+        await _stop(compaction_task)
+
+    if health_task:
+        await _stop(health_task)
+
+    if worker_stop:
+        await run_in_threadpool(worker.stop_workers, worker_threads, worker_stop)
+
+    await task_events.close()
+    await inventory.close()
+    ssh.close_all()
+    await gns3.close()
+    await db.close_async_pool()
+    db.close_pool()
 
-app = FastAPI(title="Dispatch", lifespan=mcp_app.lifespan)
+app = FastAPI(title="Dispatch", lifespan=lifespan)
 
 app.include_router(api_router)
 
@@ -1,20 +1,22 @@
 from fastmcp import FastMCP
+from starlette.concurrency import run_in_threadpool
 from typing import List
 
 import json
 
-from services import llm, devices, ansible
+from services import llm, ansible, inventory, config_cache, verification
+from utils.ios_config import parse_config
 
 mcp = FastMCP("Dispatch Network")
 
 @mcp.tool
-def list_devices(topology_id: str) -> str:
+async def list_devices(topology_id: str) -> str:
     """
     List all devices in the specified topology to understand the network map.
     Returns a JSON string of devices with names, types, and port information.
     """
 
-    ds = devices.get_devices_with_config(topology_id)
+    ds = inventory.list_devices(topology_id) or await run_in_threadpool(config_cache.list_devices, topology_id)
 
     return json.dumps([{
         "name": d["name"], 
@@ -24,22 +26,53 @@ def list_devices(topology_id: str) -> str:
     } for d in ds], indent=2)
 
 @mcp.tool
-def fetch_live_config(topology_id: str, device_name: str) -> str:
+async def fetch_live_config(topology_id: str, device_name: str, max_age: int = None, sections: List[str] = None) -> str:
     """
     Connects to the device immediately, runs 'show running-config', 
     saves it to history, and returns the configuration content.
     Use this to inspect the device state before making any changes.
+
+    - max_age: Seconds a previously fetched config may be old and still be
+      returned without connecting (default 60, at most the cache TTL).
+      Pushes always invalidate it.
+      Pass 0 to force a live read, e.g. when validating a push.
+    - sections: Return only parts of the config instead of all of it:
+      "summary" (hostname, interface addresses/state, routing, ACLs, lines),
+      a kind ("interfaces", "routing", "acls", "lines", "banners", "global", "other")
+      or a section header such as "interface GigabitEthernet0/1" or "router ospf".
+      Omit to get the full running-config.
     """
     try:
-        config_content = ansible.run_fetch_single_config(topology_id, device_name)
-        return config_content
+        # Blocking SSH/Ansible work runs off the event loop so calls can overlap
+        config_content = await run_in_threadpool(config_cache.get_config, topology_id, device_name, max_age)
+
+        if config_content is None:
+            config_content = await run_in_threadpool(ansible.run_fetch_single_config, topology_id, device_name)
+
+            if config_content.startswith("Error"):
+                return config_content
+
+        if not sections:
+            return config_content
+
+        index = parse_config(config_content)
+        parts = []
+
+        if any(s.strip().lower() == "summary" for s in sections):
+            parts.append(index.summary())
+
+        selectors = [s for s in sections if s.strip().lower() != "summary"]
+        if selectors:
+            parts.append(index.render(selectors))
+
+        return "\n!\n".join(parts)
     except ValueError as e:
         return f"Error: {str(e)}"
     except Exception as e:
         return f"System Error fetching config: {str(e)}"
 
 @mcp.tool
-def push_configuration(topology_id: str, device_configs: List[dict]) -> str:
+async def push_configuration(topology_id: str, device_configs: List[dict]) -> str:
     """
     Pushes configuration commands to live devices using Ansible.
 
@@ -70,22 +103,40 @@ def push_configuration(topology_id: str, device_configs: List[dict]) -> str:
     3. **One Block Per Context**: Do not mix Interface commands and Global commands in the same dict entry. Create two separate entries.
     """
     try:
-        results = []
         for config in device_configs:
-            device_name = config.get("device_name")
-            commands = config.get("commands", [])
-            parent = config.get("parent")
-            
-            print(f"Pushing to {device_name} [parent: {parent or 'global'}]: {commands}")
-            
-            result = ansible.run_push_config(topology_id, device_name, commands, parent)
-            
-            results.append(f"{device_name} [{parent or 'global'}]: Success")
+            print(f"Pushing to {config.get('device_name')} [parent: {config.get('parent') or 'global'}]: {config.get('commands', [])}")
+
+        await run_in_threadpool(verification.record_pre_push, topology_id, [c.get("device_name") for c in device_configs])
+
+        results = await run_in_threadpool(ansible.run_push_configs, topology_id, device_configs)
         
-        return "\n".join(results)
+        return "\n".join(
+            f"{r['device']} [{r['parent'] or 'global'}]: Success" if r["status"] == "success"
+            else f"{r['device']} [{r['parent'] or 'global'}]: Failed - {r['error']}"
+            for r in results
+        )
     except Exception as e:
         return f"Push Error: {str(e)}"
 
+@mcp.tool
+async def verify_configuration(topology_id: str, device_configs: List[dict]) -> str:
+    """
+    Checks whether a push took effect. Pass the SAME `device_configs` that were
+    given to `push_configuration`. Reads each device's config once and compares
+    it with the config from before the push.
+
+    Returns JSON per device: `status` (applied, partial, not_applied, unknown)
+    and per block (`parent`) the number of `applied` commands, the `missing`
+    ones, `unexpected` lines that appeared without being pushed and lines that
+    were `removed`. `other_changes` lists sections that changed but were not
+    part of the push.
+    """
+    try:
+        report = await verification.verify_push(topology_id, device_configs)
+        return json.dumps(report, separators=(",", ":"))
+    except Exception as e:
+        return f"Verification Error: {str(e)}"
+
 @mcp.tool
 async def fetch_related_knowledge(query: str, model_name: str, topology_id: str = None) -> str:
     """
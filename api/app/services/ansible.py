@@ -1,21 +1,22 @@
 import ansible_runner
 
-from utils.db import execute_read
+from utils.db import execute_read, transaction
 
-from services import devices, topologies
+from services import devices, topologies, ssh, jobs, config_cache, scheduler
 
-from config import ANSIBLE_DIR, GET_CONFIG_PLAYBOOK, PUSH_CONFIG_PLAYBOOK
-
-task_status = {}
+from config import (
+    ANSIBLE_DIR, ANSIBLE_FORKS, GET_CONFIG_PLAYBOOK, PUSH_CONFIG_BATCH_PLAYBOOK, SSH_POOL_ENABLED
+)
 
 def get_dynamic_inventory(topology_id: str):
-    topologies = execute_read("SELECT * FROM topologies WHERE project_id = %s", (topology_id,))
-    
-    if not topologies:
-        raise ValueError(f"Topology with ID {topology_id} not found")
-    
-    topology = topologies[0]
-    device_list = execute_read("SELECT * FROM devices WHERE topology_id = %s AND device_type = 'Router'", (topology_id,))
+    with transaction():
+        topologies = execute_read("SELECT * FROM topologies WHERE project_id = %s", (topology_id,))
+        
+        if not topologies:
+            raise ValueError(f"Topology with ID {topology_id} not found")
+        
+        topology = topologies[0]
+        device_list = execute_read("SELECT * FROM devices WHERE topology_id = %s AND device_type = 'Router'", (topology_id,))
     
     inventory = {
         "all": {
@@ -38,12 +39,13 @@ def get_dynamic_inventory(topology_id: str):
 
 def get_device_inventory(topology_id: str, device_name: str):
     """Helper to generate inventory for a device"""
-    topology = topologies.get_topology_detail(topology_id)
-    
-    if not topology:
-        raise ValueError(f"Topology with id {topology_id} not found.")
-    
-    dev = devices.get_device_by_name(topology_id, device_name)
+    with transaction():
+        topology = topologies.get_topology_detail(topology_id)
+        
+        if not topology:
+            raise ValueError(f"Topology with id {topology_id} not found.")
+        
+        dev = devices.get_device_by_name(topology_id, device_name)
 
     if not dev:
         raise ValueError(f"Device {device_name} not found in topology {topology['name']}.")
@@ -62,12 +64,44 @@ def get_device_inventory(topology_id: str, device_name: str):
 
 def run_fetch_single_config(topology_id: str, device_name: str):
     """
-    Runs 'get_config' playbook for a specific device, saves to DB, 
+    Fetches the running config of a specific device, saves to DB, 
     and returns the content directly.
+
+    Uses the pooled SSH session for the device when possible and falls back
+    to the 'get_config' playbook when that fails. Concurrent fetches of the
+    same device share one connection and result.
     """
 
+    return scheduler.read(
+        topology_id,
+        device_name,
+        "show running-config",
+        lambda: _fetch_single_config(topology_id, device_name)
+    )
+
+def _fetch_single_config(topology_id: str, device_name: str):
     try:
         target = get_device_inventory(topology_id, device_name)
+
+        if SSH_POOL_ENABLED:
+            try:
+                config_content = ssh.run_command(
+                    topology_id,
+                    device_name,
+                    ssh.target_from_inventory(target, device_name),
+                    "show running-config"
+                )
+
+                dev = devices.get_device_by_name(topology_id, device_name)
+                if dev:
+                    devices.insert_config_snapshot(dev[0]["device_id"], config_content)
+
+                config_cache.put_config(topology_id, device_name, config_content)
+
+                return config_content
+            except Exception as e:
+                print(f"SSH session failed for {device_name}, falling back to Ansible: {e}")
+
         runner = ansible_runner.run(
             private_data_dir=ANSIBLE_DIR,
             playbook=GET_CONFIG_PLAYBOOK,
@@ -91,6 +125,8 @@ def run_fetch_single_config(topology_id: str, device_name: str):
                         if dev:
                             devices.insert_config_snapshot(dev, config_content)
 
+                        config_cache.put_config(topology_id, hostname, config_content)
+
                         return config_content
         
         return f"Error: No configuration found for device {device_name}"
@@ -98,94 +134,189 @@ def run_fetch_single_config(topology_id: str, device_name: str):
         print(f"Background Ansible Failed: {e}")
         return f"Error: {str(e)}"
 
+def _config_from_event(event: dict):
+    """(hostname, config) from a finished 'show running-config' task event, else None"""
+    if event.get('event') != 'runner_on_ok':
+        return None
+
+    event_data = event.get('event_data', {})
+    if 'show running-config' not in event_data.get('task', ''):
+        return None
+
+    stdout = event_data.get('res', {}).get('stdout', [])
+    if not stdout:
+        return None
+
+    return event_data.get('host', ''), stdout[0]
+
 def run_fetch_config(topology_id: str, task_id: str):
-    """Helper to fetch running config in background"""
-    try:
-        inventory = get_dynamic_inventory(topology_id)
-        total_hosts = len(inventory["all"]["hosts"])
-        
-        task_status[task_id]["message"] = f"Running ansible on {total_hosts} devices..."
-        
+    """
+    Job handler that fetches running configs for every router in a topology.
+
+    Configs are saved from the runner's event callback as each host finishes,
+    so progress in the jobs table moves per device and no config is held until
+    the play ends. Returns the final message, raises to let the worker retry.
+    """
+    inventory = get_dynamic_inventory(topology_id)
+    total_hosts = len(inventory["all"]["hosts"])
+
+    task = {
+        "total_devices": total_hosts,
+        "completed_devices": 0,
+        "failed_devices": [],
+        "progress": 0,
+        "message": f"Running ansible on {total_hosts} devices...",
+    }
+    jobs.update_job(task_id, **task)
+
+    finished = set()
+
+    def update_progress():
+        task["progress"] = int((len(finished) / total_hosts) * 100) if total_hosts else 100
+        task["message"] = f"Completed {task['completed_devices']}/{total_hosts} devices"
+        jobs.update_job(task_id, **task)
+
+    def on_event(event):
+        result = _config_from_event(event)
+
+        if result:
+            hostname, config_content = result
+
+            try:
+                dev = devices.get_device_by_name(topology_id, hostname)
+
+                if dev:
+                    devices.insert_config_snapshot(dev[0]["device_id"], config_content)
+                    config_cache.put_config(topology_id, hostname, config_content)
+                    task["completed_devices"] += 1
+                    jobs.publish_event(task_id, {"type": "device", "device": hostname, "status": "completed"})
+            except Exception as e:
+                task["failed_devices"].append({"device": hostname, "error": str(e)})
+                jobs.publish_event(task_id, {"type": "device", "device": hostname, "status": "failed", "error": str(e)})
+
+            finished.add(hostname)
+            release(hostname)
+            update_progress()
+
+            # Already persisted, don't let the runner keep the config around
+            return False
+
+        if event.get('event') in ('runner_on_failed', 'runner_on_unreachable'):
+            event_data = event.get('event_data', {})
+            hostname = event_data.get('host', '')
+
+            if hostname not in finished:
+                error = event_data.get('res', {}).get('msg', event.get('event'))
+
+                task["failed_devices"].append({"device": hostname, "error": error})
+                jobs.publish_event(task_id, {"type": "device", "device": hostname, "status": "failed", "error": error})
+                finished.add(hostname)
+                release(hostname)
+                update_progress()
+
+        return event.get('event') != 'runner_on_ok'
+    
+    # Pushes to a device wait until the play is done with it, and vice versa
+    with scheduler.devices(topology_id, inventory["all"]["hosts"], exclusive=False) as release:
         runner = ansible_runner.run(
             private_data_dir=ANSIBLE_DIR,
             playbook=GET_CONFIG_PLAYBOOK,
             inventory=inventory,
+            event_handler=on_event,
         )
-        
-        completed_count = 0
-        
-        if runner.status == 'successful' or runner.status == 'failed':
-            for event in runner.events:
-                if event.get('event') == 'runner_on_ok':
-                    event_data = event.get('event_data', {})
-                    task_name = event_data.get('task', '')
-                    hostname = event_data.get('host', '')
-                    
-                    if 'show running-config' in task_name:
-                        task_result = event_data.get('res', {})
-                        stdout = task_result.get('stdout', [])
-                        
-                        if stdout and len(stdout) > 0:
-                            config_content = stdout[0]
-                            
-                            dev = devices.get_device_by_name(topology_id, hostname)[0]["device_id"]
-                            
-                            if dev:
-                                devices.insert_config_snapshot(dev, config_content)
-
-                                completed_count += 1
-                                task_status[task_id]["completed_devices"] = completed_count
-                                task_status[task_id]["progress"] = int((completed_count / total_hosts) * 100)
-                                task_status[task_id]["message"] = f"Completed {completed_count}/{total_hosts} devices"
-            
-            task_status[task_id]["status"] = "completed"
-            task_status[task_id]["progress"] = 100
-            task_status[task_id]["message"] = f"Config refresh completed. {completed_count} devices updated."
-        else:
-            task_status[task_id]["status"] = "failed"
-            task_status[task_id]["message"] = f"Ansible job failed with status: {runner.status}"
-            
-    except Exception as e:
-        task_status[task_id]["status"] = "failed"
-        task_status[task_id]["message"] = f"Error: {str(e)}"
-        print(f"Background Ansible Failed: {e}")
+    
+    if runner.status != 'successful' and runner.status != 'failed':
+        raise RuntimeError(f"Ansible job failed with status: {runner.status}")
+
+    return f"Config refresh completed. {task['completed_devices']} devices updated."
 
-def run_push_config(topology_id: str, device_name: str, commands: list, parent: str = None):
+def run_push_configs(topology_id: str, device_configs: list):
     """
-    Helper to push running config synchronously.
-    
-    Args:
-        commands: List of config lines (e.g., ["ip address 1.1.1.1..."])
-        parent: Optional parent context (e.g., "interface Gi0/0"). 
-                If None, commands are treated as global.
+    Push many config blocks to many devices in a single play.
+
+    Blocks are grouped per device and applied in their original order, while
+    devices run in parallel up to ANSIBLE_FORKS. Returns one result per entry
+    of `device_configs`, in the same order.
     """
 
-    if not commands:
-        raise ValueError("No commands provided to push.")
+    results = []
+    blocks_by_device = {}
 
-    payload = {
-        "commands": commands
-    }
+    for index, config in enumerate(device_configs):
+        device_name = config.get("device_name")
+        commands = config.get("commands", [])
+        parent = config.get("parent")
 
-    if parent:
-        payload["name"] = parent
+        # The model sometimes sends the string "null" for global config
+        if parent in ("", "null", "None"):
+            parent = None
 
-    target = get_device_inventory(topology_id, device_name)
+        result = {"device": device_name, "parent": parent, "status": "pending", "error": None}
+        results.append(result)
 
-    runner = ansible_runner.run(
-        private_data_dir=ANSIBLE_DIR,
-        playbook=PUSH_CONFIG_PLAYBOOK,
-        inventory=target,
-        extravars={
-            "interface_config": payload 
-        },
-    )
+        if not commands:
+            result.update(status="failed", error="No commands provided to push.")
+            continue
 
-    if runner.status != 'successful':
-        error_msg = "Unknown error"
-        if hasattr(runner, 'stdout') and hasattr(runner.stdout, 'read'):
-            error_msg = runner.stdout.read()
-        
-        raise RuntimeError(f"Ansible Push Failed: {error_msg}")
+        block = {"id": index, "commands": commands}
+        if parent:
+            block["name"] = parent
+
+        blocks_by_device.setdefault(device_name, []).append(block)
+
+    inventory = {"all": {"hosts": {}, "vars": {}}}
+
+    for device_name, blocks in blocks_by_device.items():
+        try:
+            target = get_device_inventory(topology_id, device_name)
+        except ValueError as e:
+            for block in blocks:
+                results[block["id"]].update(status="failed", error=str(e))
+            continue
+
+        host = target["all"]["hosts"][device_name]
+        host["config_blocks"] = blocks
+
+        inventory["all"]["hosts"][device_name] = host
+        inventory["all"]["vars"] = target["all"]["vars"]
+
+    if not inventory["all"]["hosts"]:
+        return results
+
+    def on_event(event):
+        kind = event.get('event')
+        event_data = event.get('event_data', {})
+        res = event_data.get('res', {})
+
+        if kind in ('runner_item_on_ok', 'runner_item_on_failed'):
+            item = res.get('item') or {}
+
+            if 'id' in item:
+                if kind == 'runner_item_on_ok':
+                    results[item['id']]["status"] = "success"
+                else:
+                    results[item['id']].update(status="failed", error=res.get('msg', 'Failed'))
+        elif kind in ('runner_on_unreachable', 'runner_on_failed'):
+            for block in blocks_by_device.get(event_data.get('host'), []):
+                if results[block["id"]]["status"] == "pending":
+                    results[block["id"]].update(status="failed", error=res.get('msg', kind))
+
+        return True
+
+    with scheduler.devices(topology_id, inventory["all"]["hosts"], exclusive=True):
+        runner = ansible_runner.run(
+            private_data_dir=ANSIBLE_DIR,
+            playbook=PUSH_CONFIG_BATCH_PLAYBOOK,
+            inventory=inventory,
+            forks=ANSIBLE_FORKS,
+            event_handler=on_event,
+        )
+
+    for device_name in inventory["all"]["hosts"]:
+        config_cache.invalidate_config(topology_id, device_name)
+
+    for result in results:
+        if result["status"] == "pending":
+            result.update(status="failed", error=f"No result from Ansible (status: {runner.status})")
 
-    return {"status": "success", "device": device_name, "events": list(runner.events)}
\ No newline at end of file
+    return results
\ No newline at end of file
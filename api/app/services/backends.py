@@ -0,0 +1,209 @@
+import asyncio
+import time
+
+from contextlib import asynccontextmanager
+
+import httpx
+
+from config import (
+    LLAMA_SERVER_URL, LIGHTRAG_URL,
+    BACKEND_HEALTH_INTERVAL, BACKEND_HEALTH_TIMEOUT, BACKEND_MAX_FAILURES, BACKEND_STICKY_TTL
+)
+from utils.cache import TTLCache
+
+class Backend:
+    def __init__(self, url: str):
+        self.url = url
+        self.healthy = True
+        self.outstanding = 0
+        # Consecutive failed requests or health checks
+        self.failures = 0
+        # Server properties (e.g. llama-server's /props) cached by the caller
+        self.props = None
+        self.stats = {"requests": 0, "errors": 0, "ejections": 0, "readmissions": 0}
+
+    @property
+    def health_url(self):
+        return f"{self.url.rstrip('/').removesuffix('/v1')}/health"
+
+    def get_stats(self):
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "failures": self.failures,
+            "props": self.props,
+            **self.stats,
+        }
+
+def _is_backend_error(error: Exception):
+    """Connection problems and 5xx count against a replica, 4xx are the caller's fault"""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status is None or status >= 500
+
+class BackendPool:
+    """
+    Replicas serving one model. Requests go to the healthy replica with the
+    fewest requests in flight; a chat session sticks to the replica it used
+    last (its KV cache lives there) while that replica stays healthy. Replicas
+    are ejected after BACKEND_MAX_FAILURES consecutive errors and re-admitted
+    once their /health check passes again.
+    """
+
+    def __init__(self, name: str, urls: list):
+        self.name = name
+        self.backends = [Backend(url) for url in urls]
+        self._sticky = TTLCache(BACKEND_STICKY_TTL, max_size=10000)
+
+    def pick(self, session_id: str = None, exclude=()):
+        candidates = [b for b in self.backends if b.healthy and b not in exclude]
+
+        # With every replica ejected, trying one beats failing outright
+        if not candidates:
+            candidates = [b for b in self.backends if b not in exclude] or self.backends
+
+        if not candidates:
+            raise RuntimeError(f"No backend configured for {self.name}")
+
+        if session_id:
+            sticky = self._sticky.get(session_id)
+            for backend in candidates:
+                if backend.url == sticky:
+                    return backend
+
+        backend = min(candidates, key=lambda b: b.outstanding)
+
+        if session_id:
+            self._sticky.set(session_id, backend.url)
+
+        return backend
+
+    def record_failure(self, backend: Backend, error: Exception):
+        if not _is_backend_error(error):
+            return
+
+        backend.stats["errors"] += 1
+        backend.failures += 1
+
+        if backend.healthy and backend.failures >= BACKEND_MAX_FAILURES:
+            backend.healthy = False
+            backend.stats["ejections"] += 1
+            print(f"Ejected {self.name} backend {backend.url}: {error}")
+
+    @asynccontextmanager
+    async def request(self, session_id: str = None, exclude=()):
+        """Pick a replica and count the request as in flight on it until the block exits"""
+        backend = self.pick(session_id, exclude)
+        errors = backend.stats["errors"]
+
+        backend.outstanding += 1
+        backend.stats["requests"] += 1
+
+        try:
+            yield backend
+        except Exception as e:
+            self.record_failure(backend, e)
+            raise
+        finally:
+            backend.outstanding -= 1
+
+            if backend.stats["errors"] == errors:
+                backend.failures = 0
+
+    async def call(self, fn, session_id: str = None):
+        """Await `fn(backend)`, trying the next replica when one fails"""
+        tried = []
+
+        while True:
+            try:
+                async with self.request(session_id, exclude=tried) as backend:
+                    tried.append(backend)
+                    return await fn(backend)
+            except Exception as e:
+                if not _is_backend_error(e) or len(tried) >= len(self.backends):
+                    raise
+
+    @asynccontextmanager
+    async def stream(self, fn, session_id: str = None):
+        """
+        Like call(), for responses read inside the block (e.g. a token stream):
+        yields (backend, `await fn(backend)`) and keeps the replica counted as
+        busy until the block exits. Only failures of `fn` move on to the next
+        replica, once the block has started reading nothing is retried.
+        """
+        tried = []
+
+        while True:
+            async with self.request(session_id, exclude=tried) as backend:
+                tried.append(backend)
+
+                try:
+                    result = await fn(backend)
+                except Exception as e:
+                    if not _is_backend_error(e) or len(tried) >= len(self.backends):
+                        raise
+
+                    self.record_failure(backend, e)
+                    continue
+
+                yield backend, result
+                return
+
+    async def check(self, client: httpx.AsyncClient):
+        async def probe(backend: Backend):
+            try:
+                response = await client.get(backend.health_url, timeout=BACKEND_HEALTH_TIMEOUT)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+
+            if ok:
+                backend.failures = 0
+                if not backend.healthy:
+                    backend.healthy = True
+                    # It may have come back with a different model or slot count
+                    backend.props = None
+                    backend.stats["readmissions"] += 1
+                    print(f"Re-admitted {self.name} backend {backend.url}")
+            else:
+                self.record_failure(backend, RuntimeError("health check failed"))
+
+        await asyncio.gather(*(probe(b) for b in self.backends))
+
+    def get_stats(self):
+        return {
+            "backends": [b.get_stats() for b in self.backends],
+            "sticky_sessions": self._sticky.get_stats()["size"],
+        }
+
+llm_pools = {model: BackendPool(f"llm:{model}", urls) for model, urls in LLAMA_SERVER_URL.items()}
+lightrag_pools = {model: BackendPool(f"lightrag:{model}", urls) for model, urls in LIGHTRAG_URL.items()}
+
+health_stats = {
+    "runs": 0,
+    "last_run_at": None,
+}
+
+async def check_all(client: httpx.AsyncClient):
+    await asyncio.gather(*(pool.check(client) for pool in [*llm_pools.values(), *lightrag_pools.values()]))
+
+    health_stats["runs"] += 1
+    health_stats["last_run_at"] = time.time()
+
+async def health_worker():
+    """Probe every replica's /health each BACKEND_HEALTH_INTERVAL seconds"""
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                await check_all(client)
+            except Exception as e:
+                print(f"Backend health check failed: {e}")
+
+            await asyncio.sleep(BACKEND_HEALTH_INTERVAL)
+
+def get_stats():
+    return {
+        "llm": {model: pool.get_stats() for model, pool in llm_pools.items()},
+        "lightrag": {model: pool.get_stats() for model, pool in lightrag_pools.items()},
+        **health_stats,
+    }
@@ -0,0 +1,276 @@
+import asyncio
+import time
+
+from datetime import datetime, timedelta
+
+from psycopg.errors import LockNotAvailable
+
+from config import SNAPSHOT_RETENTION, CHAT_RETENTION_DAYS, COMPACTION_INTERVAL, COMPACTION_BATCH_SIZE
+from utils.db import async_execute_read, async_execute_write, async_transaction
+from utils.delta import encode_delta, apply_delta
+
+EPOCH = datetime(1970, 1, 1)
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+compaction_stats = {
+    "runs": 0,
+    "last_run_at": None,
+    "last_duration_ms": None,
+    "snapshot_rows_deleted": 0,
+    "snapshot_rows_rewritten": 0,
+    "devices_skipped": 0,
+    "chat_rows_deleted": 0,
+    "bytes_reclaimed": 0,
+    "errors": 0,
+    "last_error": None,
+}
+
+def _seconds(value: str):
+    return int(value[:-1]) * UNITS[value[-1]]
+
+def parse_retention(spec: str):
+    """
+    "7d:all,30d:1h,*:1d" -> [(604800, 0), (2592000, 3600), (None, 86400)]
+    i.e. (max_age_seconds, bucket_seconds) where bucket 0 keeps every snapshot.
+    """
+    tiers = []
+    for part in spec.split(","):
+        age, granularity = part.strip().split(":")
+        tiers.append((
+            None if age == "*" else _seconds(age),
+            0 if granularity == "all" else _seconds(granularity)
+        ))
+
+    if not tiers or tiers[-1][0] is not None:
+        raise ValueError(f"Retention '{spec}' needs a last '*:<granularity>' tier for the oldest snapshots")
+
+    return tiers
+
+RETENTION_TIERS = parse_retention(SNAPSHOT_RETENTION)
+
+def _expired(candidates: list, now: datetime):
+    """Snapshots outside their tier's bucket, candidates sorted newest first"""
+    kept_buckets = set()
+    expired = []
+
+    for row in candidates:
+        age = (now - row["created_at"]).total_seconds()
+
+        for index, (max_age, bucket) in enumerate(RETENTION_TIERS):
+            if max_age is None or age < max_age:
+                break
+
+        if bucket == 0:
+            continue
+
+        key = (index, int((row["created_at"] - EPOCH).total_seconds() // bucket))
+        if key in kept_buckets:
+            expired.append(row)
+        else:
+            kept_buckets.add(key)
+
+    return expired
+
+async def _load_chain(device_id: str, start: datetime, end: datetime):
+    """Rows from `start` forward until the first full snapshot newer than `end`"""
+    q = """
+    SELECT id, content, delta, created_at FROM config_snapshots
+    WHERE device_id = %s AND created_at {op} %s
+    ORDER BY created_at ASC
+    LIMIT %s
+    """
+
+    rows = []
+    op = ">="
+
+    while True:
+        page = await async_execute_read(q.format(op=op), (device_id, start, COMPACTION_BATCH_SIZE))
+        if not page:
+            return rows
+
+        for row in page:
+            rows.append(row)
+            if row["created_at"] > end and row["content"] is not None:
+                return rows
+
+        start = page[-1]["created_at"]
+        op = ">"
+
+async def _compact_device(device_id: str, now: datetime):
+    """
+    Delete one batch of expired snapshots for a device. Surviving deltas whose
+    newer neighbour is deleted are re-encoded, or stored in full when a deleted
+    keyframe was between them, so history stays reconstructable. Returns None
+    when another transaction holds the device, it is retried on the next pass.
+    """
+    async with async_transaction():
+        await async_execute_write("SET LOCAL lock_timeout = '2s'")
+
+        device = await async_execute_read(
+            "SELECT latest_snapshot_id FROM devices WHERE device_id = %s FOR UPDATE SKIP LOCKED",
+            (device_id,)
+        )
+        if not device:
+            return None
+
+        q = """
+        SELECT id, created_at FROM config_snapshots
+        WHERE device_id = %s AND created_at < %s AND id IS DISTINCT FROM %s
+        ORDER BY created_at DESC
+        """
+        candidates = await async_execute_read(q, (
+            device_id,
+            now - timedelta(seconds=RETENTION_TIERS[0][0] or 0),
+            device[0]["latest_snapshot_id"],
+        ))
+
+        expired = _expired(candidates, now)[-COMPACTION_BATCH_SIZE:]
+        if not expired:
+            return 0
+
+        expired_ids = {row["id"] for row in expired}
+        oldest, newest = expired[-1]["created_at"], expired[0]["created_at"]
+
+        older = await async_execute_read(
+            "SELECT created_at FROM config_snapshots WHERE device_id = %s AND created_at < %s ORDER BY created_at DESC LIMIT 1",
+            (device_id, oldest)
+        )
+        rows = await _load_chain(device_id, older[0]["created_at"] if older else oldest, newest)
+
+        contents = [None] * len(rows)
+        for i in range(len(rows) - 1, -1, -1):
+            if rows[i]["content"] is not None:
+                contents[i] = rows[i]["content"]
+            else:
+                contents[i] = apply_delta(contents[i + 1], rows[i]["delta"])
+
+        reclaimed = 0
+        rewritten = 0
+        survivor = None
+        crossed_keyframe = False
+
+        # Walk newest to oldest, tracking the nearest newer survivor
+        for i in range(len(rows) - 1, -1, -1):
+            row = rows[i]
+
+            if row["id"] in expired_ids:
+                crossed_keyframe = crossed_keyframe or row["content"] is not None
+                continue
+
+            if survivor is not None and survivor != i + 1 and row["content"] is None:
+                old_size = len(row["delta"])
+
+                if crossed_keyframe:
+                    await async_execute_write(
+                        "UPDATE config_snapshots SET content = %s, delta = NULL WHERE id = %s",
+                        (contents[i], row["id"])
+                    )
+                    reclaimed -= len(contents[i].encode("utf-8")) - old_size
+                else:
+                    delta = encode_delta(contents[survivor], contents[i])
+                    await async_execute_write(
+                        "UPDATE config_snapshots SET delta = %s WHERE id = %s",
+                        (delta, row["id"])
+                    )
+                    reclaimed -= len(delta) - old_size
+
+                rewritten += 1
+
+            survivor = i
+            crossed_keyframe = False
+
+        deleted = await async_execute_read(
+            """
+            DELETE FROM config_snapshots WHERE id = ANY(%s::uuid[])
+            RETURNING COALESCE(octet_length(content), 0) + COALESCE(octet_length(delta), 0) as size
+            """,
+            (list(expired_ids),)
+        )
+        reclaimed += sum(r["size"] for r in deleted)
+
+    compaction_stats["snapshot_rows_deleted"] += len(deleted)
+    compaction_stats["snapshot_rows_rewritten"] += rewritten
+    compaction_stats["bytes_reclaimed"] += reclaimed
+
+    return len(deleted)
+
+async def compact_snapshots():
+    now = (await async_execute_read("SELECT LOCALTIMESTAMP as now"))[0]["now"]
+    first_tier_age = RETENTION_TIERS[0][0]
+
+    if first_tier_age is None and RETENTION_TIERS[0][1] == 0:
+        return
+
+    device_ids = await async_execute_read(
+        """
+        SELECT d.device_id FROM devices d
+        WHERE EXISTS (
+            SELECT 1 FROM config_snapshots cs
+            WHERE cs.device_id = d.device_id AND cs.created_at < LOCALTIMESTAMP - make_interval(secs => %s)
+        )
+        """,
+        (first_tier_age or 0,)
+    )
+
+    for row in device_ids:
+        while True:
+            try:
+                deleted = await _compact_device(row["device_id"], now)
+            except LockNotAvailable:
+                deleted = None
+
+            if deleted is None:
+                compaction_stats["devices_skipped"] += 1
+                break
+
+            if deleted < COMPACTION_BATCH_SIZE:
+                break
+
+            await asyncio.sleep(0.1)
+
+async def compact_chat_messages():
+    if CHAT_RETENTION_DAYS <= 0:
+        return
+
+    q = """
+    DELETE FROM chat_messages WHERE id IN (
+        SELECT id FROM chat_messages
+        WHERE created_at < LOCALTIMESTAMP - make_interval(days => %s)
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING COALESCE(octet_length(content), 0) + COALESCE(octet_length(meta_data), 0) as size
+    """
+
+    while True:
+        deleted = await async_execute_read(q, (CHAT_RETENTION_DAYS, COMPACTION_BATCH_SIZE))
+
+        compaction_stats["chat_rows_deleted"] += len(deleted)
+        compaction_stats["bytes_reclaimed"] += sum(r["size"] for r in deleted)
+
+        if len(deleted) < COMPACTION_BATCH_SIZE:
+            return
+
+        await asyncio.sleep(0.1)
+
+async def run_compaction():
+    """One retention pass over config snapshots and chat messages"""
+    started = time.monotonic()
+
+    try:
+        await compact_snapshots()
+        await compact_chat_messages()
+    except Exception as e:
+        compaction_stats["errors"] += 1
+        compaction_stats["last_error"] = str(e)
+        print(f"Compaction Failed: {e}")
+    finally:
+        compaction_stats["runs"] += 1
+        compaction_stats["last_run_at"] = datetime.now().isoformat()
+        compaction_stats["last_duration_ms"] = int((time.monotonic() - started) * 1000)
+
+async def compaction_worker():
+    while True:
+        await run_compaction()
+        await asyncio.sleep(COMPACTION_INTERVAL)
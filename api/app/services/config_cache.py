@@ -0,0 +1,83 @@
+import time
+
+from config import CONFIG_CACHE_TTL, CONFIG_CACHE_MAX_SIZE, CONFIG_CACHE_MAX_AGE
+from services import devices
+from utils.cache import TTLCache, MISSING
+
+# (topology_id, device_name) -> running-config text
+config_cache = TTLCache(CONFIG_CACHE_TTL, CONFIG_CACHE_MAX_SIZE)
+# (topology_id,) -> device rows, for topologies not followed by the inventory
+device_list_cache = TTLCache(CONFIG_CACHE_TTL, CONFIG_CACHE_MAX_SIZE)
+
+# (topology_id, device_name or None) -> monotonic time of the last invalidation,
+# stored snapshots confirmed before it (e.g. pre-push) don't count as fresh.
+# Snapshots are never served past CONFIG_CACHE_TTL, so older entries can expire.
+_invalidated_at = TTLCache(CONFIG_CACHE_TTL, CONFIG_CACHE_MAX_SIZE)
+
+cache_stats = {
+    "snapshot_hits": 0,
+    "live_fetches": 0,
+}
+
+def get_config(topology_id: str, device_name: str, max_age: float = None):
+    """
+    Running-config no older than `max_age` seconds, or None if it has to be
+    fetched. Falls back to the latest stored snapshot so configs pulled by a
+    refresh job or another worker count as fresh too. `max_age` is capped at
+    CONFIG_CACHE_TTL.
+    """
+    max_age = min(CONFIG_CACHE_MAX_AGE if max_age is None else max_age, CONFIG_CACHE_TTL)
+    if max_age <= 0:
+        return None
+
+    config = config_cache.get((topology_id, device_name), max_age, default=MISSING)
+    if config is not MISSING:
+        return config
+
+    invalidated_at = max(
+        _invalidated_at.get((topology_id, device_name), default=0),
+        _invalidated_at.get((topology_id, None), default=0)
+    )
+    if invalidated_at:
+        max_age = min(max_age, time.monotonic() - invalidated_at)
+
+    latest = devices.get_latest_config_by_name(topology_id, device_name)
+    if latest is None or latest["content"] is None or latest["age"] > max_age:
+        return None
+
+    cache_stats["snapshot_hits"] += 1
+    # Back-date the entry so it doesn't look fresher than the snapshot is
+    config_cache.set((topology_id, device_name), latest["content"], age=latest["age"])
+
+    return latest["content"]
+
+def put_config(topology_id: str, device_name: str, config: str):
+    cache_stats["live_fetches"] += 1
+    config_cache.set((topology_id, device_name), config)
+
+def invalidate_config(topology_id: str, device_name: str = None):
+    _invalidated_at.set((topology_id, device_name), time.monotonic())
+
+    if device_name is None:
+        config_cache.invalidate_where(lambda key: key[0] == topology_id)
+    else:
+        config_cache.invalidate((topology_id, device_name))
+
+def list_devices(topology_id: str, max_age: float = None):
+    rows = device_list_cache.get((topology_id,), max_age, default=MISSING)
+
+    if rows is MISSING:
+        rows = devices.list_devices(topology_id)
+        device_list_cache.set((topology_id,), rows)
+
+    return rows
+
+def invalidate_devices(topology_id: str):
+    device_list_cache.invalidate((topology_id,))
+
+def get_stats():
+    return {
+        "configs": config_cache.get_stats(),
+        "device_lists": device_list_cache.get_stats(),
+        **cache_stats,
+    }
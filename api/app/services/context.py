@@ -0,0 +1,220 @@
+import json
+import math
+
+from config import LLM_CONTEXT_WINDOW, LLM_PROPS_RETRY, LLM_COMPLETION_RESERVE, CONTEXT_KEEP_RECENT_TOOLS, BACKEND_STICKY_TTL
+from utils.cache import TTLCache
+
+# Starting guess for chars per token, refined per model from the prompt_tokens
+# llama-server reports for every request
+DEFAULT_CHARS_PER_TOKEN = 3.5
+# Chat template tokens around each message (role markers, separators)
+MESSAGE_OVERHEAD = 4
+
+# Used for a llama-server whose /props can't be read
+DEFAULT_SERVER_PROPS = {"n_ctx": LLM_CONTEXT_WINDOW, "total_slots": None}
+
+_chars_per_token = {}
+# base_url -> True while a failed /props read is not retried
+_props_failures = TTLCache(LLM_PROPS_RETRY, max_size=1000)
+# model -> prompt tokens sent / served from llama-server's prompt cache
+_prompt_cache = {}
+# (base_url, session_id) -> llama-server slot the session was pinned to
+_session_slots = TTLCache(BACKEND_STICKY_TTL, max_size=10000)
+
+context_stats = {
+    "requests": 0,
+    "tool_outputs_evicted": 0,
+    "exchanges_dropped": 0,
+}
+
+def _message_chars(msg: dict):
+    chars = len(msg.get("content") or "")
+
+    for tc in msg.get("tool_calls") or []:
+        chars += len(tc["function"]["name"]) + len(tc["function"]["arguments"] or "")
+
+    return chars
+
+async def get_server_props(base_url: str, http_client):
+    """
+    Per-slot context size and slot count from llama-server's /props, or None
+    if the server can't be asked. A failed server isn't asked again for
+    LLM_PROPS_RETRY seconds; successful answers are kept by the caller.
+    """
+    if _props_failures.get(base_url):
+        return None
+
+    root = base_url.rstrip("/").removesuffix("/v1")
+
+    try:
+        response = await http_client.get(f"{root}/props")
+        response.raise_for_status()
+        props = response.json()
+    except Exception:
+        _props_failures.set(base_url, True)
+        return None
+
+    return {
+        "n_ctx": props.get("default_generation_settings", {}).get("n_ctx") or LLM_CONTEXT_WINDOW,
+        "total_slots": props.get("total_slots"),
+    }
+
+def assign_slot(base_url: str, session_id: str, total_slots: int):
+    """
+    Slot of `base_url` a chat session sends every request to, so its earlier
+    turns stay in that slot's KV cache. Picked once, as the slot with the fewest
+    sessions pinned to it, and kept while the session is active.
+    """
+    key = (base_url, session_id)
+    slot = _session_slots.get(key)
+
+    if slot is None or slot >= total_slots:
+        pinned = [0] * total_slots
+        for (url, _), other in _session_slots.items():
+            if url == base_url and other < total_slots:
+                pinned[other] += 1
+
+        slot = pinned.index(min(pinned))
+
+    # Refreshed on every use so only idle sessions expire
+    _session_slots.set(key, slot)
+
+    return slot
+
+class AgentContext:
+    """
+    Message list of one agent run with a running token estimate.
+
+    Each message is measured once when appended. When the estimate goes over
+    the budget, old tool outputs are replaced by a short stub first, then the
+    oldest whole exchanges (an assistant tool_calls message together with its
+    tool replies) are dropped, so the history stays a valid tool-calling
+    conversation. The first `keep_first` messages (instructions and the user's
+    request) are always kept.
+    """
+
+    def __init__(self, model: str, context_window: int, tools: list = None, keep_first: int = 1):
+        self.model = model
+        self.keep_first = keep_first
+        self.budget = context_window - LLM_COMPLETION_RESERVE
+        self.messages = []
+        self._chars = []
+        self._stubbed = []
+        self._fixed_chars = len(json.dumps(tools)) if tools else 0
+        self._total_chars = self._fixed_chars
+        self._sent = None
+
+    @property
+    def chars_per_token(self):
+        return _chars_per_token.get(self.model, DEFAULT_CHARS_PER_TOKEN)
+
+    @property
+    def tokens(self):
+        return math.ceil(self._total_chars / self.chars_per_token) + MESSAGE_OVERHEAD * len(self.messages)
+
+    def append(self, msg: dict):
+        if msg.get("content") is None:
+            msg["content"] = ""
+
+        chars = _message_chars(msg)
+
+        self.messages.append(msg)
+        self._chars.append(chars)
+        self._stubbed.append(False)
+        self._total_chars += chars
+
+    def _set_content(self, index: int, content: str):
+        chars = len(content)
+
+        self._total_chars += chars - self._chars[index]
+        self._chars[index] = chars
+        self.messages[index]["content"] = content
+
+    def _exchange_end(self, start: int):
+        """Index just past the exchange starting at `start`"""
+        end = start + 1
+
+        if self.messages[start].get("tool_calls"):
+            while end < len(self.messages) and self.messages[end]["role"] == "tool":
+                end += 1
+
+        return end
+
+    def fit(self):
+        if self.tokens <= self.budget:
+            return
+
+        tool_indexes = [i for i, m in enumerate(self.messages) if m["role"] == "tool" and not self._stubbed[i]]
+
+        for i in tool_indexes[:-CONTEXT_KEEP_RECENT_TOOLS or None]:
+            name = self.messages[i].get("name", "tool")
+
+            self._set_content(i, f"[Earlier {name} output removed to fit the context window. Call the tool again if it is still needed.]")
+            self._stubbed[i] = True
+            context_stats["tool_outputs_evicted"] += 1
+
+            if self.tokens <= self.budget:
+                return
+
+        first = self.keep_first
+
+        while self.tokens > self.budget and len(self.messages) > first:
+            end = self._exchange_end(first)
+
+            # Never drop the exchange the model is currently answering
+            if end >= len(self.messages):
+                break
+
+            self._total_chars -= sum(self._chars[first:end])
+            del self.messages[first:end], self._chars[first:end], self._stubbed[first:end]
+            context_stats["exchanges_dropped"] += 1
+
+    def prepare(self):
+        """Messages to send, fitted to the budget; remembers their size for calibrate()"""
+        self.fit()
+        self._sent = (self._total_chars, len(self.messages))
+        context_stats["requests"] += 1
+
+        return self.messages
+
+    def calibrate(self, prompt_tokens: int):
+        """Fold the server's real prompt token count into the model's chars/token ratio"""
+        if not self._sent or not prompt_tokens:
+            return
+
+        chars, count = self._sent
+        content_tokens = prompt_tokens - MESSAGE_OVERHEAD * count
+
+        if content_tokens <= 0:
+            return
+
+        observed = chars / content_tokens
+        _chars_per_token[self.model] = 0.7 * self.chars_per_token + 0.3 * observed
+
+    def record_cache_usage(self, usage, timings: dict = None):
+        """Count how much of the prompt llama-server took from its KV cache"""
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None)
+
+        # Older llama-server builds only report it in their own timings block
+        if cached is None and timings:
+            cached = timings.get("cache_n")
+
+        stats = _prompt_cache.setdefault(self.model, {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0})
+        stats["requests"] += 1
+        stats["prompt_tokens"] += usage.prompt_tokens or 0
+        stats["cached_tokens"] += cached or 0
+
+def get_stats():
+    return {
+        "chars_per_token": {model: round(ratio, 3) for model, ratio in _chars_per_token.items()},
+        "props_failures": _props_failures.get_stats()["size"],
+        "pinned_sessions": _session_slots.get_stats()["size"],
+        "prompt_cache": {
+            model: {
+                **stats,
+                "cached_ratio": round(stats["cached_tokens"] / stats["prompt_tokens"], 3) if stats["prompt_tokens"] else None,
+            } for model, stats in _prompt_cache.items()
+        },
+        **context_stats,
+    }
@@ -1,6 +1,24 @@
-from utils.db import execute_write, execute_read
+import hashlib
+import re
 
-def create_new_device(topology_id: str, device_id: str, name: str, device_type: str = None, port: int = None):
+from config import SNAPSHOT_KEYFRAME_INTERVAL
+from utils.delta import encode_delta
+from utils.db import execute_write, execute_read, transaction, async_execute_write, async_execute_read, async_transaction
+
+# Header lines IOS regenerates on every "show running-config"
+VOLATILE_CONFIG_LINES = re.compile(
+    r"^(Building configuration\.\.\.|Current configuration :|! Last configuration change at"
+    r"|! NVRAM config last updated at|! No configuration change since last restart)"
+)
+
+def normalize_config(config: str):
+    lines = [l.rstrip() for l in config.replace("\r\n", "\n").split("\n")]
+    return "\n".join(l for l in lines if not VOLATILE_CONFIG_LINES.match(l)).strip()
+
+def config_hash(config: str):
+    return hashlib.sha256(normalize_config(config).encode("utf-8")).hexdigest()
+
+async def create_new_device(topology_id: str, device_id: str, name: str, device_type: str = None, port: int = None):
     q = """
     INSERT INTO devices (topology_id, device_id, name, device_type, port)
     VALUES (%s, %s, %s, %s, %s)
@@ -9,7 +27,66 @@ def create_new_device(topology_id: str, device_id: str, name: str, device_type:
     RETURNING device_id
     """
 
-    return execute_write(q, (topology_id, device_id, name, device_type, port))
+    return await async_execute_write(q, (topology_id, device_id, name, device_type, port))
+
+async def sync_devices(topology_id: str, nodes: list):
+    """
+    Bulk upsert GNS3 nodes into devices in one transaction.
+
+    Only rows whose name, device_type or port changed are written, and devices
+    that are no longer part of the project are removed. An empty node list is
+    treated as "GNS3 unavailable" and leaves the table untouched.
+    """
+    if not nodes:
+        return {"inserted": 0, "updated": 0, "removed": 0, "unchanged": 0}
+
+    node_ids = [n["node_id"] for n in nodes]
+
+    upsert = """
+    INSERT INTO devices (topology_id, device_id, name, device_type, port)
+    SELECT %s, n.device_id, n.name, n.device_type, n.port
+    FROM unnest(%s::uuid[], %s::varchar[], %s::varchar[], %s::int[]) AS n(device_id, name, device_type, port)
+    ON CONFLICT (device_id) DO UPDATE 
+    SET name = EXCLUDED.name, device_type = EXCLUDED.device_type, port = EXCLUDED.port
+    WHERE (devices.name, devices.device_type, devices.port)
+        IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.device_type, EXCLUDED.port)
+    RETURNING (xmax = 0) AS inserted
+    """
+
+    remove = """
+    DELETE FROM devices
+    WHERE topology_id = %s AND NOT (device_id = ANY(%s::uuid[]))
+    RETURNING device_id
+    """
+
+    async with async_transaction():
+        written = await async_execute_read(upsert, (
+            topology_id,
+            node_ids,
+            [n["name"] for n in nodes],
+            [n.get("device_type") for n in nodes],
+            [n.get("port") for n in nodes],
+        ))
+        removed = await async_execute_read(remove, (topology_id, node_ids))
+
+    inserted = sum(1 for r in written if r["inserted"])
+    updated = len(written) - inserted
+
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "removed": len(removed),
+        "unchanged": len(nodes) - len(written),
+    }
+
+async def delete_device(topology_id: str, device_id: str):
+    q = """
+    DELETE FROM devices
+    WHERE device_id = %s AND topology_id = %s
+    RETURNING device_id
+    """
+
+    return await async_execute_write(q, (device_id, topology_id))
 
 def get_device_by_name(topology_id: str, name: str):
     q = """
@@ -19,33 +96,126 @@ def get_device_by_name(topology_id: str, name: str):
 
     return execute_read(q, (topology_id, name,))
 
+DEVICES_WITH_CONFIG_QUERY = """
+SELECT d.device_id, d.topology_id, d.name, d.device_type, d.ip_address, d.port, d.created_at,
+    cs.content as latest_config, cs.created_at as latest_config_at
+FROM devices d
+LEFT JOIN config_snapshots cs ON cs.id = d.latest_snapshot_id
+WHERE d.topology_id = %s
+"""
+
+LIST_DEVICES_QUERY = """
+SELECT d.device_id, d.topology_id, d.name, d.device_type, d.ip_address, d.port, d.created_at,
+    d.latest_snapshot_id, cs.created_at as latest_config_at, cs.last_seen_at as latest_config_seen_at
+FROM devices d
+LEFT JOIN config_snapshots cs ON cs.id = d.latest_snapshot_id
+WHERE d.topology_id = %s
+"""
+
+LATEST_CONFIG_QUERY = """
+SELECT d.device_id, d.name, cs.id as snapshot_id, cs.content, cs.created_at, cs.last_seen_at
+FROM devices d
+JOIN config_snapshots cs ON cs.id = d.latest_snapshot_id
+WHERE d.topology_id = %s AND d.device_id = %s
+"""
+
 def get_devices_with_config(topology_id: str):
+    return execute_read(DEVICES_WITH_CONFIG_QUERY, (topology_id,))
+
+async def get_devices_with_config_async(topology_id: str):
+    return await async_execute_read(DEVICES_WITH_CONFIG_QUERY, (topology_id,))
+
+def list_devices(topology_id: str):
+    """Devices without config bodies, for callers that only need names/addresses"""
+    return execute_read(LIST_DEVICES_QUERY, (topology_id,))
+
+async def list_devices_async(topology_id: str):
+    return await async_execute_read(LIST_DEVICES_QUERY, (topology_id,))
+
+def get_latest_config(topology_id: str, device_id: str):
+    result = execute_read(LATEST_CONFIG_QUERY, (topology_id, device_id))
+    return result[0] if result else None
+
+async def get_latest_config_async(topology_id: str, device_id: str):
+    result = await async_execute_read(LATEST_CONFIG_QUERY, (topology_id, device_id))
+    return result[0] if result else None
+
+def get_latest_config_by_name(topology_id: str, name: str):
+    """Latest stored config of a device and its age in seconds (since last confirmed)"""
     q = """
-    SELECT d.device_id, d.topology_id, d.name, d.device_type, d.ip_address, d.port, d.created_at, (
-        SELECT content FROM config_snapshots cs
-        WHERE cs.device_id = d.device_id
-        ORDER BY cs.created_at DESC
-        LIMIT 1
-    ) as latest_config
+    SELECT d.device_id, cs.id as snapshot_id, cs.content,
+        EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP::timestamp - cs.last_seen_at))::float AS age
     FROM devices d
-    WHERE d.topology_id = %s
+    JOIN config_snapshots cs ON cs.id = d.latest_snapshot_id
+    WHERE d.topology_id = %s AND d.name = %s
     """
 
-    return execute_read(q, (topology_id,))
+    result = execute_read(q, (topology_id, name))
+    return result[0] if result else None
 
-def update_device_ip(topology_id: str, device_id: str, ip_address: str):
+async def update_device_ip(topology_id: str, device_id: str, ip_address: str):
     q = """
     UPDATE devices SET ip_address = %s
     WHERE device_id = %s AND topology_id = %s
     RETURNING *
     """
 
-    return execute_write(q, (ip_address, device_id, topology_id))
+    return await async_execute_write(q, (ip_address, device_id, topology_id))
 
 def insert_config_snapshot(device_id: str, config: str):
-    q = """
-    INSERT INTO config_snapshots (device_id, content)
-    VALUES (%s, %s) RETURNING *
     """
+    Store a running-config for a device and return the snapshot id.
+
+    If it matches the latest snapshot once volatile header lines are ignored,
+    only that snapshot's last_seen_at/observations are bumped. Otherwise the new
+    snapshot is stored in full and the previous one is rewritten as a delta
+    against it, unless it is a keyframe.
+    """
+    content_hash = config_hash(config)
+
+    with transaction():
+        # Row lock serializes concurrent snapshots of the same device
+        device = execute_read(
+            "SELECT latest_snapshot_id FROM devices WHERE device_id = %s FOR UPDATE",
+            (device_id,)
+        )
+        latest_id = device[0]["latest_snapshot_id"] if device else None
+        latest = None
+
+        if latest_id:
+            latest = execute_read("SELECT content_hash, seq FROM config_snapshots WHERE id = %s", (latest_id,))
+
+            if latest and latest[0]["content_hash"] == content_hash:
+                q = """
+                UPDATE config_snapshots
+                SET last_seen_at = CURRENT_TIMESTAMP, observations = observations + 1
+                WHERE id = %s RETURNING id
+                """
+
+                return execute_write(q, (latest_id,))
+
+        seq = latest[0]["seq"] + 1 if latest else 0
+
+        q = """
+        WITH snapshot AS (
+            INSERT INTO config_snapshots (device_id, content, content_hash, seq)
+            VALUES (%s, %s, %s, %s) RETURNING *
+        ), pointer AS (
+            UPDATE devices SET latest_snapshot_id = snapshot.id
+            FROM snapshot
+            WHERE devices.device_id = snapshot.device_id
+        )
+        SELECT * FROM snapshot
+        """
+
+        snapshot_id = execute_write(q, (device_id, config, content_hash, seq))
+
+        if latest and latest[0]["seq"] % SNAPSHOT_KEYFRAME_INTERVAL != 0:
+            previous = execute_read("SELECT content FROM config_snapshots WHERE id = %s", (latest_id,))
+
+            execute_write(
+                "UPDATE config_snapshots SET content = NULL, delta = %s WHERE id = %s",
+                (encode_delta(config, previous[0]["content"]), latest_id)
+            )
 
-    return execute_write(q, (device_id, config, ))
\ No newline at end of file
+        return snapshot_id
@@ -1,53 +1,91 @@
 from fastapi import HTTPException
 import httpx
 
-from config import GNS_URL
+from config import GNS_URL, GNS3_TIMEOUT, GNS3_MAX_CONNECTIONS, GNS3_CACHE_TTL
+from utils.cache import TTLCache
 
-def get_project_lists():
-    try:
-        with httpx.Client() as client:
-            response = client.get(f"{GNS_URL}/projects")
+_client = None
+
+gns3_cache = TTLCache(GNS3_CACHE_TTL)
+
+async def start():
+    global _client
+
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=GNS3_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=GNS3_MAX_CONNECTIONS,
+                max_keepalive_connections=GNS3_MAX_CONNECTIONS
+            ),
+        )
+
+    return _client
+
+async def close():
+    global _client
+
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+def to_device(node: dict):
+    """Map a GNS3 node to the fields kept in devices, None for non router/switch nodes"""
+    node_type = node.get('node_type')
+    if node_type not in ['dynamips', 'iou']:
+        return None
+
+    return {
+        'node_id': node['node_id'],
+        'name': node['name'],
+        'device_type': 'Router' if node_type == 'dynamips' else 'Switch',
+        'port': node.get('console')
+    }
 
-            response.raise_for_status()
+async def get_project_lists():
+    async def load():
+        client = await start()
+        response = await client.get(f"{GNS_URL}/projects")
 
-            return response.json()
+        response.raise_for_status()
+
+        return response.json()
+
+    try:
+        return await gns3_cache.get_or_load(("projects",), load)
     except httpx.HTTPError as e:
         return []
     
-def get_project_detail(topology_id: str):
+async def get_project_detail(topology_id: str):
+    async def load():
+        client = await start()
+        response = await client.get(f"{GNS_URL}/projects/{topology_id}")
+        
+        if response.status_code == 404:
+            raise HTTPException(status_code=404, detail="Topology not found in GNS3")
+        
+        response.raise_for_status()
+        
+        return response.json()
+
     try:
-        with httpx.Client() as client:
-            response = client.get(f"{GNS_URL}/projects/{topology_id}")
-            
-            if response.status_code == 404:
-                raise HTTPException(status_code=404, detail="Topology not found in GNS3")
-            
-            response.raise_for_status()
-            
-            return response.json()
+        return await gns3_cache.get_or_load(("project", topology_id), load)
     except httpx.HTTPError as e:
         raise HTTPException(status_code=502, detail=f"GNS3 Error: {str(e)}")
     
-def get_devices(topology_id: str):
+async def fetch_devices(topology_id: str):
+    """Uncached router/switch nodes of a project, raises httpx.HTTPError on failure"""
+    client = await start()
+    response = await client.get(f"{GNS_URL}/projects/{topology_id}/nodes")
+
+    response.raise_for_status()
+
+    data = response.json()
+
+    return [d for d in (to_device(n) for n in data) if d]
+
+async def get_devices(topology_id: str):
     try:
-        with httpx.Client() as client:
-            response = client.get(f"{GNS_URL}/projects/{topology_id}/nodes")
-            
-            response.raise_for_status()
-            
-            data = response.json()
-
-            filtered = []
-            for n in data:
-                node_type = n.get('node_type')
-                if node_type in ['dynamips', 'iou']:
-                    device_type = 'Router' if node_type == 'dynamips' else 'Switch'
-                    filtered.append({
-                        'node_id': n['node_id'],
-                        'name': n['name'],
-                        'device_type': device_type,
-                        'port': n.get('console')
-                    })
-            return filtered
+        return await gns3_cache.get_or_load(("nodes", topology_id), lambda: fetch_devices(topology_id))
     except httpx.HTTPError:
         return []
\ No newline at end of file
@@ -0,0 +1,173 @@
+import asyncio
+import json
+
+import httpx
+
+from config import GNS_URL, GNS3_TIMEOUT, GNS3_NOTIFICATIONS_ENABLED, GNS3_NOTIFICATIONS_RETRY
+from services import gns3, devices
+
+# topology_id -> {node_id: node}, filled from the GNS3 notification stream
+inventories = {}
+ip_addresses = {}
+
+_subscriptions = {}
+_live = set()
+
+inventory_stats = {
+    "events": 0,
+    "nodes_created": 0,
+    "nodes_updated": 0,
+    "nodes_deleted": 0,
+    "reconnects": 0,
+    "last_error": None,
+}
+
+def is_live(topology_id: str):
+    return topology_id in _live
+
+def subscribe(topology_id: str):
+    """Start following the project's notification feed if enabled and not already running"""
+    if not GNS3_NOTIFICATIONS_ENABLED:
+        return
+
+    task = _subscriptions.get(topology_id)
+    if task is None or task.done():
+        _subscriptions[topology_id] = asyncio.create_task(_follow(topology_id))
+
+async def unsubscribe(topology_id: str):
+    task = _subscriptions.pop(topology_id, None)
+    _live.discard(topology_id)
+
+    if task:
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+async def close():
+    await asyncio.gather(*(unsubscribe(topology_id) for topology_id in list(_subscriptions)))
+
+async def get_nodes(topology_id: str):
+    """GNS3 router/switch nodes, from memory when the project is being followed"""
+    if is_live(topology_id):
+        return list(inventories[topology_id].values())
+
+    subscribe(topology_id)
+
+    return await gns3.get_devices(topology_id)
+
+def list_devices(topology_id: str):
+    """In-memory equivalent of devices.list_devices, None if the project isn't followed"""
+    if not is_live(topology_id):
+        return None
+
+    ips = ip_addresses.get(topology_id, {})
+
+    return [{
+        "device_id": n["node_id"],
+        "topology_id": topology_id,
+        "name": n["name"],
+        "device_type": n["device_type"],
+        "port": n["port"],
+        "ip_address": ips.get(n["node_id"]),
+    } for n in inventories[topology_id].values()]
+
+def set_ip_address(topology_id: str, device_id: str, ip_address: str):
+    if topology_id in ip_addresses:
+        ip_addresses[topology_id][device_id] = ip_address
+
+async def _prime(topology_id: str):
+    """
+    Load the node list the notifications apply to. Raises when GNS3 can't be
+    read or returns no nodes, so the project isn't served from an empty inventory.
+    """
+    nodes = await gns3.fetch_devices(topology_id)
+    if not nodes:
+        raise ConnectionError(f"GNS3 returned no nodes for project {topology_id}")
+
+    gns3.gns3_cache.set(("nodes", topology_id), nodes)
+    await devices.sync_devices(topology_id, nodes)
+
+    rows = await devices.list_devices_async(topology_id)
+
+    inventories[topology_id] = {n["node_id"]: n for n in nodes}
+    ip_addresses[topology_id] = {r["device_id"]: r["ip_address"] for r in rows}
+
+async def _handle(topology_id: str, notification: dict):
+    action = notification.get("action")
+    event = notification.get("event") or {}
+
+    if action in ("node.created", "node.updated"):
+        node = gns3.to_device(event)
+        if not node:
+            return
+
+        inventory = inventories[topology_id]
+        previous = inventory.get(node["node_id"])
+        inventory[node["node_id"]] = node
+
+        if previous != node:
+            await devices.create_new_device(topology_id, node["node_id"], node["name"], node["device_type"], node["port"])
+            inventory_stats["nodes_updated" if previous else "nodes_created"] += 1
+    elif action == "node.deleted":
+        node_id = event.get("node_id")
+
+        if inventories[topology_id].pop(node_id, None):
+            await devices.delete_device(topology_id, node_id)
+            ip_addresses[topology_id].pop(node_id, None)
+            inventory_stats["nodes_deleted"] += 1
+    elif action in ("project.closed", "project.deleted"):
+        raise ConnectionError(f"GNS3 project {topology_id} was {action.split('.')[1]}")
+    else:
+        return
+
+    gns3.gns3_cache.invalidate(("nodes", topology_id))
+
+async def _follow(topology_id: str):
+    """
+    Keep inventories[topology_id] in sync with GNS3. The stream is opened before
+    the node list is loaded so no change between the two is missed, and the
+    whole thing is retried every GNS3_NOTIFICATIONS_RETRY seconds on failure.
+    """
+    url = f"{GNS_URL}/projects/{topology_id}/notifications"
+
+    while True:
+        try:
+            client = await gns3.start()
+
+            async with client.stream("GET", url, timeout=httpx.Timeout(GNS3_TIMEOUT, read=None)) as response:
+                response.raise_for_status()
+
+                await _prime(topology_id)
+                _live.add(topology_id)
+
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+
+                    try:
+                        notification = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+
+                    inventory_stats["events"] += 1
+                    await _handle(topology_id, notification)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            inventory_stats["last_error"] = str(e)
+            print(f"GNS3 notification stream for {topology_id} failed: {e}")
+        finally:
+            _live.discard(topology_id)
+
+        inventory_stats["reconnects"] += 1
+        await asyncio.sleep(GNS3_NOTIFICATIONS_RETRY)
+
+def get_stats():
+    return {
+        "enabled": GNS3_NOTIFICATIONS_ENABLED,
+        "subscriptions": len(_subscriptions),
+        "live": sorted(_live),
+        **inventory_stats,
+    }
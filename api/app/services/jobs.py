@@ -0,0 +1,141 @@
+import json
+
+from config import JOB_MAX_CONCURRENT, JOB_MAX_PER_TOPOLOGY, JOB_MAX_ATTEMPTS, JOB_RETRY_BACKOFF, JOB_LEASE_TIMEOUT
+from utils.db import execute_read, execute_write, transaction, async_execute_read, async_execute_write
+
+# Key for pg_advisory_xact_lock so concurrency caps are checked by one claimer at a time
+CLAIM_LOCK_KEY = 7_341_001
+
+# NOTIFY channel carrying progress and per-device events for SSE subscribers
+JOB_EVENTS_CHANNEL = "job_events"
+
+JOB_FIELDS = ("status", "progress", "total_devices", "completed_devices", "failed_devices", "message")
+
+async def enqueue_job(kind: str, topology_id: str, payload: dict = None, total_devices: int = 0, message: str = None):
+    q = """
+    INSERT INTO jobs (kind, topology_id, payload, total_devices, message, max_attempts)
+    VALUES (%s, %s, %s::jsonb, %s, %s, %s)
+    RETURNING id
+    """
+
+    return await async_execute_write(q, (kind, topology_id, json.dumps(payload or {}), total_devices, message, JOB_MAX_ATTEMPTS))
+
+async def get_job(job_id: str):
+    q = """
+    SELECT id, kind, topology_id, status, progress, total_devices, completed_devices,
+        failed_devices, message, attempts, max_attempts, run_after, created_at, updated_at
+    FROM jobs WHERE id = %s
+    """
+
+    result = await async_execute_read(q, (job_id,))
+    return result[0] if result else None
+
+def claim_job(worker_id: str):
+    """
+    Take the oldest runnable job that fits under the global and per-topology
+    running caps, or None. Jobs whose worker stopped heartbeating are requeued first.
+    """
+    with transaction():
+        execute_read("SELECT pg_advisory_xact_lock(%s)", (CLAIM_LOCK_KEY,))
+
+        execute_write("""
+        UPDATE jobs SET status = 'queued', locked_by = NULL,
+            message = 'Worker lost, retrying...', updated_at = LOCALTIMESTAMP
+        WHERE status = 'running' AND heartbeat_at < LOCALTIMESTAMP - make_interval(secs => %s)
+        """, (JOB_LEASE_TIMEOUT,))
+
+        q = """
+        UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_by = %s,
+            heartbeat_at = LOCALTIMESTAMP, updated_at = LOCALTIMESTAMP
+        WHERE id = (
+            SELECT j.id FROM jobs j
+            WHERE j.status = 'queued' AND j.run_after <= LOCALTIMESTAMP
+                AND (SELECT count(*) FROM jobs r WHERE r.status = 'running') < %s
+                AND (
+                    SELECT count(*) FROM jobs r
+                    WHERE r.status = 'running' AND r.topology_id = j.topology_id
+                ) < %s
+            ORDER BY j.run_after, j.created_at
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING *
+        """
+
+        result = execute_read(q, (worker_id, JOB_MAX_CONCURRENT, JOB_MAX_PER_TOPOLOGY))
+
+    return result[0] if result else None
+
+def update_job(job_id: str, **fields):
+    """Write progress fields and refresh the job's heartbeat"""
+    columns = [f for f in JOB_FIELDS if f in fields]
+    assignments = [f"{c} = %s::jsonb" if c == "failed_devices" else f"{c} = %s" for c in columns]
+    params = [json.dumps(fields[c]) if c == "failed_devices" else fields[c] for c in columns]
+
+    q = f"""
+    UPDATE jobs SET {''.join(a + ', ' for a in assignments)}heartbeat_at = LOCALTIMESTAMP, updated_at = LOCALTIMESTAMP
+    WHERE id = %s
+    """
+
+    execute_write(q, (*params, job_id))
+
+    if columns:
+        publish_progress(job_id)
+
+def publish_progress(job_id: str):
+    q = """
+    SELECT pg_notify(%s, json_build_object(
+        'type', 'progress',
+        'task_id', id,
+        'status', status,
+        'progress', progress,
+        'completed_devices', completed_devices,
+        'total_devices', total_devices,
+        'message', left(message, 1000)
+    )::text)
+    FROM jobs WHERE id = %s
+    """
+
+    execute_write(q, (JOB_EVENTS_CHANNEL, job_id))
+
+def publish_event(job_id: str, event: dict):
+    """Send a one-off event (e.g. a device finished) to task stream subscribers"""
+    execute_write("SELECT pg_notify(%s, %s)", (JOB_EVENTS_CHANNEL, json.dumps({"task_id": str(job_id), **event})))
+
+def complete_job(job_id: str, message: str):
+    update_job(job_id, status="completed", progress=100, message=message)
+
+def fail_job(job: dict, error: str):
+    """Requeue with exponential backoff, or mark failed once attempts are used up"""
+    if job["attempts"] < job["max_attempts"]:
+        delay = JOB_RETRY_BACKOFF * 2 ** (job["attempts"] - 1)
+
+        execute_write("""
+        UPDATE jobs SET status = 'queued', locked_by = NULL,
+            run_after = LOCALTIMESTAMP + make_interval(secs => %s),
+            message = %s, updated_at = LOCALTIMESTAMP
+        WHERE id = %s
+        """, (delay, f"Attempt {job['attempts']} failed: {error}. Retrying in {int(delay)}s...", job["id"]))
+
+        publish_progress(job["id"])
+    else:
+        update_job(job["id"], status="failed", message=f"Error: {error}")
+
+def requeue_jobs(worker_ids: list):
+    """Put jobs still running on these workers back in the queue, the attempt doesn't count"""
+    with transaction():
+        rows = execute_read("""
+        UPDATE jobs SET status = 'queued', locked_by = NULL, attempts = GREATEST(attempts - 1, 0),
+            message = 'Worker stopped, requeued', updated_at = LOCALTIMESTAMP
+        WHERE status = 'running' AND locked_by = ANY(%s)
+        RETURNING id
+        """, (list(worker_ids),))
+
+        for row in rows:
+            publish_progress(row["id"])
+
+    return len(rows)
+
+async def get_stats():
+    rows = await async_execute_read("SELECT status, count(*) as jobs FROM jobs GROUP BY status")
+    return {r["status"]: r["jobs"] for r in rows}
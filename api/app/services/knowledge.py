@@ -0,0 +1,101 @@
+import hashlib
+import re
+
+from config import KNOWLEDGE_CACHE_TTL, KNOWLEDGE_CACHE_MAX_SIZE, KNOWLEDGE_CACHE_PERSIST
+from utils.cache import TTLCache
+from utils.db import async_execute_read, async_execute_write
+
+# (model, mode, normalized query) -> LightRAG context
+knowledge_cache = TTLCache(KNOWLEDGE_CACHE_TTL, KNOWLEDGE_CACHE_MAX_SIZE)
+
+knowledge_stats = {
+    "upstream_calls": 0,
+    "db_hits": 0,
+    "db_errors": 0,
+}
+
+def normalize_query(query: str):
+    """Case, spacing and trailing punctuation don't change what LightRAG retrieves"""
+    return re.sub(r"\s+", " ", query).strip().rstrip("?.!").strip().lower()
+
+def _query_hash(query: str):
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+async def _load_stored(model: str, mode: str, query: str):
+    q = """
+    UPDATE knowledge_cache SET hits = hits + 1
+    WHERE model = %s AND mode = %s AND query_hash = %s
+        AND created_at > CURRENT_TIMESTAMP - make_interval(secs => %s)
+    RETURNING response
+    """
+
+    try:
+        return await async_execute_write(q, (model, mode, _query_hash(query), KNOWLEDGE_CACHE_TTL))
+    except Exception as e:
+        knowledge_stats["db_errors"] += 1
+        print(f"Knowledge cache read failed: {e}")
+        return None
+
+async def _store(model: str, mode: str, query: str, response: str):
+    q = """
+    INSERT INTO knowledge_cache (model, mode, query_hash, query, response)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (model, mode, query_hash) DO UPDATE
+    SET response = EXCLUDED.response, created_at = CURRENT_TIMESTAMP, hits = 0
+    """
+
+    try:
+        await async_execute_write(q, (model, mode, _query_hash(query), query, response))
+    except Exception as e:
+        knowledge_stats["db_errors"] += 1
+        print(f"Knowledge cache write failed: {e}")
+
+async def get_context(model: str, mode: str, query: str, fetch):
+    """
+    Cached LightRAG context for a query, `fetch()` is awaited on a miss. Misses
+    check the knowledge_cache table first when KNOWLEDGE_CACHE_PERSIST is on,
+    and concurrent identical queries share one upstream call. `fetch` should
+    raise on failure so errors are never cached.
+    """
+    normalized = normalize_query(query)
+
+    async def load():
+        if KNOWLEDGE_CACHE_PERSIST:
+            stored = await _load_stored(model, mode, normalized)
+            if stored is not None:
+                knowledge_stats["db_hits"] += 1
+                return stored
+
+        knowledge_stats["upstream_calls"] += 1
+        response = await fetch()
+
+        if KNOWLEDGE_CACHE_PERSIST:
+            await _store(model, mode, normalized, response)
+
+        return response
+
+    return await knowledge_cache.get_or_load((model, mode, normalized), load)
+
+async def invalidate(model: str = None):
+    """Drop cached answers, e.g. after the knowledge base was reindexed"""
+    if model is None:
+        knowledge_cache.clear()
+    else:
+        knowledge_cache.invalidate_where(lambda key: key[0] == model)
+
+    if not KNOWLEDGE_CACHE_PERSIST:
+        return 0
+
+    if model is None:
+        rows = await async_execute_read("DELETE FROM knowledge_cache RETURNING model")
+    else:
+        rows = await async_execute_read("DELETE FROM knowledge_cache WHERE model = %s RETURNING model", (model,))
+
+    return len(rows)
+
+def get_stats():
+    return {
+        "persist": KNOWLEDGE_CACHE_PERSIST,
+        **knowledge_cache.get_stats(),
+        **knowledge_stats,
+    }
@@ -1,116 +1,297 @@
 from openai import AsyncOpenAI
 from typing import List, AsyncGenerator
-from fastapi.concurrency import run_in_threadpool
 from fastmcp import Client
+from fastmcp.client.messages import MessageHandler
 
 import json
 import httpx
-import aiohttp
 import asyncio
 import re
 
+from contextlib import AsyncExitStack
 from copy import deepcopy
 
-from services import chat
+from services import backends, chat, context, knowledge
 from app.mcp.server import mcp
 
-from config import LIGHTRAG_URL, LLAMA_SERVER_URL
+from config import (
+    TOOL_CALL_CONCURRENCY, TOOL_CALL_TIMEOUT,
+    LLM_TIMEOUT, LLM_MAX_CONNECTIONS, LLM_SLOT_AFFINITY, LIGHTRAG_TIMEOUT, LIGHTRAG_MAX_CONNECTIONS, HTTP_CONNECT_TIMEOUT
+)
 
-mcp_client = Client(mcp)
+class _ToolListHandler(MessageHandler):
+    async def on_tool_list_changed(self, message):
+        global _openai_tools
+        _openai_tools = None
+
+mcp_client = Client(mcp, message_handler=_ToolListHandler())
 
 active_agent_tasks = {}
 
+# OpenAI-format tool catalogue, rebuilt only when the MCP server's tools change
+_openai_tools = None
+_tools_lock = asyncio.Lock()
+_session = None
+_session_lock = asyncio.Lock()
+
+def _to_openai_tool(tool):
+    """MCP tool -> OpenAI function, without the arguments the loop injects itself"""
+    schema = deepcopy(tool.inputSchema) if tool.inputSchema else {"type": "object", "properties": {}}
+
+    props = schema.get("properties", {})
+    required = schema.get("required", [])
+
+    for injected in ("topology_id", "model_name"):
+        props.pop(injected, None)
+        if injected in required:
+            required.remove(injected)
+
+    return {
+        "type": "function",
+        "function": {
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": schema
+        }
+    }
+
+async def _connect():
+    """Keep one in-process MCP client session open for every agent request"""
+    global _session
+
+    if _session is not None:
+        return
+
+    async with _session_lock:
+        if _session is None:
+            session = AsyncExitStack()
+            await session.enter_async_context(mcp_client)
+            _session = session
+
+async def start():
+    get_http_client("llm")
+    get_http_client("lightrag")
+
+    await _connect()
+    await get_openai_tools()
+
+async def close():
+    global _session, _openai_tools
+
+    if _session is not None:
+        session, _session = _session, None
+        await session.aclose()
+
+    _openai_tools = None
+
+    _openai_clients.clear()
+    for client in _http_clients.values():
+        await client.aclose()
+    _http_clients.clear()
+
+async def get_openai_tools():
+    global _openai_tools
+
+    if _openai_tools is None:
+        async with _tools_lock:
+            if _openai_tools is None:
+                await _connect()
+                _openai_tools = [_to_openai_tool(tool) for tool in await mcp_client.list_tools()]
+
+    return _openai_tools
+
+# Tools without side effects; calls to them in one turn may run concurrently
+READ_ONLY_TOOLS = {"list_devices", "fetch_live_config", "fetch_related_knowledge", "verify_configuration"}
+
+def _tool_call_batches(calls: list):
+    """
+    Split a turn's tool calls into batches that keep their order: consecutive
+    read-only calls share a batch, any other tool runs alone so mutations stay
+    serialized with respect to everything around them.
+    """
+    batch = []
+
+    for call in calls:
+        if call["name"] in READ_ONLY_TOOLS:
+            batch.append(call)
+            continue
+
+        if batch:
+            yield batch
+            batch = []
+
+        yield [call]
+
+    if batch:
+        yield batch
+
+async def _call_tool(func_name: str, args: dict, limit: asyncio.Semaphore):
+    """(result text for the model, error message or None)"""
+    async with limit:
+        try:
+            await _connect()
+            result = await asyncio.wait_for(
+                mcp_client.call_tool(func_name, args),
+                timeout=TOOL_CALL_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            return f"Error: tool timed out after {TOOL_CALL_TIMEOUT}s", "Timeout exceeded"
+        except Exception as e:
+            return f"Error: {e}", str(e)
+
+    if result.content and len(result.content) > 0:
+        result_str = result.content[0].text or ""
+    else:
+        result_str = str(result) or ""
+
+    return result_str or "Tool executed successfully", None
+
+# One pooled client per backend kind, opened by start() and shared by every request
+_http_clients = {}
+_openai_clients = {}
+
+http_stats = {}
+
+def _http_client(name: str, timeout: float, max_connections: int):
+    stats = http_stats[name] = {"requests": 0, "connections": 0}
+
+    async def trace(event_name, info):
+        if event_name == "connection.connect_tcp.complete":
+            stats["connections"] += 1
+
+    async def on_request(request):
+        stats["requests"] += 1
+        request.extensions["trace"] = trace
+
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(timeout, connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        event_hooks={"request": [on_request]},
+    )
+
+def get_http_client(name: str):
+    client = _http_clients.get(name)
+
+    if client is None or client.is_closed:
+        if name == "llm":
+            client = _http_client(name, LLM_TIMEOUT, LLM_MAX_CONNECTIONS)
+        else:
+            client = _http_client(name, LIGHTRAG_TIMEOUT, LIGHTRAG_MAX_CONNECTIONS)
+        _http_clients[name] = client
+
+    return client
+
+def get_openai_client(base_url: str):
+    client = _openai_clients.get(base_url)
+
+    if client is None:
+        client = _openai_clients[base_url] = AsyncOpenAI(
+            api_key="secret",
+            base_url=base_url,
+            timeout=LLM_TIMEOUT,
+            # Retried on another replica by the pool instead
+            max_retries=0,
+            http_client=get_http_client("llm"),
+        )
+
+    return client
+
+def get_http_stats():
+    return {
+        name: {
+            **stats,
+            "reuse_rate": round(1 - stats["connections"] / stats["requests"], 3) if stats["requests"] else None,
+        } for name, stats in http_stats.items()
+    }
+
 async def query_context(query: str, model: str, mode: str = "hybrid"):
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            payload = {
-                "query": query,
-                "mode": mode,
-                "only_need_context": True,
-                "only_need_prompt": False,
-                "response_type": "Multiple Paragraphs",
-                "top_k": 60,
-                "chunk_top_k": 10,
-                "max_entity_tokens": 1000,
-                "max_relation_tokens": 1000,
-                "max_total_tokens": 4096,
-                "enable_rerank": False,
-                "include_references": False,
-                "include_chunk_content": False,
-                "stream": False
-            }
+    payload = {
+        "query": query,
+        "mode": mode,
+        "only_need_context": True,
+        "only_need_prompt": False,
+        "response_type": "Multiple Paragraphs",
+        "top_k": 60,
+        "chunk_top_k": 10,
+        "max_entity_tokens": 1000,
+        "max_relation_tokens": 1000,
+        "max_total_tokens": 4096,
+        "enable_rerank": False,
+        "include_references": False,
+        "include_chunk_content": False,
+        "stream": False
+    }
+
+    async def post(backend):
+        response = await get_http_client("lightrag").post(f"{backend.url}/query/stream", json=payload)
+        response.raise_for_status()
+
+        return response.text
+
+    async def fetch():
+        return await backends.lightrag_pools[model].call(post)
 
-            response = await client.post(f"{LIGHTRAG_URL[model]}/query/stream", json=payload)
-            
-            if response.status_code != 200:
-                return f"Error: LLM Server returned status {response.status_code}"
-            
-            return response.text
-        
+    try:
+        return await knowledge.get_context(model, mode, query, fetch)
+    except httpx.HTTPStatusError as e:
+        return f"Error: LLM Server returned status {e.response.status_code}"
     except Exception as e:
-        return f"Failed to reach {LIGHTRAG_URL[model]}: {e}"
+        return f"Failed to reach LightRAG for {model}: {e}"
 
 async def response_generator(payload, current_session_id, model: str):
     full_response_text = []
     
-    async with aiohttp.ClientSession() as client:
-        async with client.post(f"{LIGHTRAG_URL[model]}/query/stream", json=payload) as response:
-            if response.status != 200:
-                yield f"data: {json.dumps({'error': f'LLM Server Error: {response.status}'})}\n\n"
-                return
+    client = get_http_client("lightrag")
 
-            async for line_bytes in response.content:
-                line = line_bytes.decode('utf-8').strip()
-                if not line:
-                    continue
+    # Generation can pause for long between chunks, only connecting is bounded
+    timeout = httpx.Timeout(LIGHTRAG_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT, read=None)
 
-                if line.startswith("data:"):
-                    line = line[5:].strip()
+    pool = backends.lightrag_pools[model]
 
-                try:
-                    data = json.loads(line)
-                    
-                    if "references" in data:
-                        continue
+    async with pool.request() as backend, client.stream("POST", f"{backend.url}/query/stream", json=payload, timeout=timeout) as response:
+        if response.status_code != 200:
+            if response.status_code >= 500:
+                pool.record_failure(backend, httpx.HTTPStatusError("LightRAG error", request=response.request, response=response))
+            yield f"data: {json.dumps({'error': f'LLM Server Error: {response.status_code}'})}\n\n"
+            return
 
-                    if "response" in data:
-                        text = data["response"]
+        async for line in response.aiter_lines():
+            line = line.strip()
+            if not line:
+                continue
 
-                        if text:
-                            full_response_text.append(text)
-                            yield f"data: {json.dumps({'text': text})}\n\n"
+            if line.startswith("data:"):
+                line = line[5:].strip()
 
-                except json.JSONDecodeError:
+            try:
+                data = json.loads(line)
+                
+                if "references" in data:
                     continue
 
+                if "response" in data:
+                    text = data["response"]
+
+                    if text:
+                        full_response_text.append(text)
+                        yield f"data: {json.dumps({'text': text})}\n\n"
+
+            except json.JSONDecodeError:
+                continue
+
     if full_response_text:
         complete = "".join(full_response_text)
-        await run_in_threadpool(
-            chat.save_chat_message,
+        await chat.save_chat_message(
             current_session_id,
             "assistant",
             complete
         )
 
-async def run_agent_loop(topology_id: str, user_query: str, history: List[dict], model: str, session_id: str = None) -> AsyncGenerator[str, None]:
-    """
-    Runs the ReAct (Reasoning + Acting) loop.
-    """
-    
-    cancel_flag = {"cancelled": False}
-    if session_id:
-        active_agent_tasks[session_id] = cancel_flag
-    
-    base_url = LLAMA_SERVER_URL[model] if isinstance(LLAMA_SERVER_URL, dict) else LLAMA_SERVER_URL
-    
-    client = AsyncOpenAI(
-        api_key="secret",
-        base_url=base_url,
-        timeout=60.0
-    )
-
-    SYSTEM_PROMPT = f"""
-    You are a Senior Network Automation Engineer managing Topology ID: {topology_id}.
+# Sent first and byte-for-byte the same on every request (no per-request
+# interpolation), together with the tool list, so llama-server can reuse the
+# KV cache of this prefix. Request specific data goes in the next message.
+AGENT_INSTRUCTIONS = """
+    You are a Senior Network Automation Engineer managing a network topology.
 
     ### CORE PRINCIPLE: "KNOWLEDGE FIRST"
     You are PROHIBITED from generating or pushing any configuration commands until you have:
@@ -125,9 +306,8 @@ async def run_agent_loop(topology_id: str, user_query: str, history: List[dict],
     - For example `list_devices` returns Router 1 (R1) and Router 2 (R2). Then you must IMMEDIATELY CALL `fetch_live_config` first for R1 and second for R2 without ANY ACTION/REASONING NEEDED TO DO.
 
     2. **Pushing Configs**:
-    - The `push_configuration` tool accepts ONLY ONE device name.
-    - You MUST generate **separate tool calls** for every device CONTINUOUSLY and SEQUENTIALLY.
-    - For example execute `push_configuration` first for R1 and second for R2 without ANY ACTION/REASONING NEEDED TO DO.
+    - The `push_configuration` tool accepts blocks for MANY devices at once.
+    - You MUST send ALL blocks for ALL target devices in **ONE single** `push_configuration` call. They are applied in parallel across devices and in order per device.
 
     ### EXECUTION PROTOCOL (STRICT SEQUENCE)
 
@@ -136,6 +316,7 @@ async def run_agent_loop(topology_id: str, user_query: str, history: List[dict],
     - **Action B**: Call `fetch_related_knowledge` (e.g., "Standard configuration for OSPF with 2 ares (2 router device)").
     - **Action C**: Call `fetch_live_config` for **EACH** target device individually. 
         *(e.g. Generate 3 separate tool calls if there are 3 devices).*
+        Pass `sections` to fetch only what the task touches (e.g. `["summary", "routing"]` for an OSPF change) instead of the full config.
 
     2. **PHASE 2: PREVIEW & EXECUTION (Action)**
     - **Trigger**: You have received the Knowledge Base (KB) context and Live Configs.
@@ -157,12 +338,12 @@ async def run_agent_loop(topology_id: str, user_query: str, history: List[dict],
         ip route 0.0.0.0 0.0.0.0 192.168.1.1
         ```
         </config_proposal>
-    - **Step B (Tool Execution)**: Immediately after the preview, call `push_configuration` with the exact commands.
+    - **Step B (Tool Execution)**: Immediately after the preview, call `push_configuration` ONCE with the exact commands for every device.
 
     3. **PHASE 3: VALIDATION (Recovery)**
     - **Trigger**: You have executed and pushed the new configuration.
-    - **Step A (Fetch live config)**: Call `fetch_live_config` for **EACH** target device individually.
-    - **Step B (Verify)**: Verify if the newly live config is matched with the planning.
+    - **Step A (Verify)**: Call `verify_configuration` ONCE with the same `device_configs` you pushed.
+    - **Step B (Report)**: Report the verdict per device. Only if lines are `missing` or `unexpected`, call `fetch_live_config` with `sections` for the affected parents to investigate.
 
     ### GUIDELINES
     - **Structure**:
@@ -170,103 +351,94 @@ async def run_agent_loop(topology_id: str, user_query: str, history: List[dict],
     Interface Config -> `parent="interface ..."`
     - **Example**:
         [
-            {{
+            {
                 "device_name": "R1",
                 "parent": "null",
                 "commands": ["hostname R1", "ip domain-name r1.router.com"]
-            }},
-            {{
+            },
+            {
                 "device_name": "R1",
                 "parent": "interface GigabitEthernet1/0",
                 "commands": ["description Inter-Router Link", "ip address 192.168.122.1 255.255.255.0"]
-            }},
-            {{
+            },
+            {
                 "device_name": "R1",
                 "parent": "ip access-list extended 101",
                 "commands": ["permit ip 192.168.1.0 0.0.0.255 any, permit ip host 10.10.10.5 host 172.16.1.5, deny ip any any"]
-            }}
+            }
         ]
+"""
+
+async def _backend_props(backend: backends.Backend):
+    """
+    llama-server /props of a replica, asked once per replica and again after
+    it is readmitted. Defaults are used while they can't be read.
+    """
+    if backend.props is None:
+        backend.props = await context.get_server_props(backend.url, get_http_client("llm"))
 
-    ### User Intention
+    return backend.props or context.DEFAULT_SERVER_PROPS
 
-    {user_query}
+async def run_agent_loop(topology_id: str, user_query: str, history: List[dict], model: str, session_id: str = None) -> AsyncGenerator[str, None]:
+    """
+    Runs the ReAct (Reasoning + Acting) loop.
     """
+    
+    cancel_flag = {"cancelled": False}
+    if session_id:
+        active_agent_tasks[session_id] = cancel_flag
+    
+    pool = backends.llm_pools[model]
 
-    async with mcp_client:
-        mcp_tools = await mcp_client.list_tools()
+    if not pool.backends:
+        yield json.dumps({"text": f"\n\n**Error**: No llama-server configured for `{model}`"})
+        return
 
-        openai_tools = []
-        
-        for tool in mcp_tools:
-            schema = deepcopy(tool.inputSchema) if tool.inputSchema else {"type": "object", "properties": {}}
-
-            props = schema.get("properties", {})
-            required = schema.get("required", [])
-            
-            if "topology_id" in props: del props["topology_id"]
-            if "topology_id" in required: required.remove("topology_id")
-                
-            if "model_name" in props: del props["model_name"]
-            if "model_name" in required: required.remove("model_name")
-
-            openai_tools.append({
-                "type": "function",
-                "function": {
-                    "name": tool.name,
-                    "description": tool.description,
-                    "parameters": schema
-                }
-            })
-
-        messages = [{"role": "user", "content": SYSTEM_PROMPT}]
+    openai_tools = await get_openai_tools()
+
+    props = await _backend_props(pool.pick(session_id))
+
+    ctx = context.AgentContext(model, props["n_ctx"], openai_tools, keep_first=2)
+    ctx.append({"role": "system", "content": AGENT_INSTRUCTIONS})
+    ctx.append({"role": "user", "content": f"Topology ID: {topology_id}\n\n### User Intention\n\n{user_query}"})
+
+
+    max_iterations = 10
+    iteration = 0
+    
+    while iteration < max_iterations:
+        if cancel_flag.get("cancelled", False):
+            yield json.dumps({"text": "\n\n**Agent stopped by user**\n\n"})
+            break
         
-        for msg in messages:
-            if "content" not in msg or msg["content"] is None:
-                msg["content"] = ""
-            if isinstance(msg.get("content"), str) == False:
-                msg["content"] = str(msg.get("content", ""))
-
-        max_iterations = 10
-        iteration = 0
+        iteration += 1
         
-        while iteration < max_iterations:
-            if cancel_flag.get("cancelled", False):
-                yield json.dumps({"text": "\n\n**Agent stopped by user**\n\n"})
-                break
-            
-            iteration += 1
-            
-            total_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
-            if total_tokens > 45000:
-                messages_truncated = [messages[0]]
-                for msg in reversed(messages[1:]):
-                    msg_tokens = len(str(msg.get("content", ""))) // 4
-                    if total_tokens - msg_tokens < 45000:
-                        messages_truncated.insert(1, msg)
-                        total_tokens -= msg_tokens
-                    else:
-                        break
-                messages = messages_truncated
-            
-            for msg in messages:
-                if "content" not in msg or msg["content"] is None:
-                    msg["content"] = ""
-
-                if "role" in msg and msg["role"] == "assistant":
-                    if "tool_calls" in msg and msg["tool_calls"]:
-                        if not msg.get("content"):
-                            msg["content"] = ""
-            
+        async def create_completion(backend: backends.Backend):
+            props = await _backend_props(backend)
+
+            # Sessions stick to one replica, and to one slot on it, so their
+            # earlier turns are still in the KV cache
+            extra_body = {"cache_prompt": True}
+            if session_id and LLM_SLOT_AFFINITY and props.get("total_slots"):
+                extra_body["id_slot"] = context.assign_slot(backend.url, session_id, props["total_slots"])
+
+            return await get_openai_client(backend.url).chat.completions.create(
+                model=model,
+                messages=ctx.prepare(),
+                tools=openai_tools,
+                tool_choice="auto",
+                stream=True,
+                stream_options={"include_usage": True},
+                extra_body=extra_body,
+            )
+
+        async with AsyncExitStack() as stack:
+            # A replica that fails before streaming anything is retried on the next one
             try:
-                response = await client.chat.completions.create(
-                    model=model,
-                    messages=messages,
-                    tools=openai_tools,
-                    tool_choice="auto",
-                    stream=True,
-                )
+                backend, response = await stack.enter_async_context(pool.stream(create_completion, session_id))
             except Exception as e:
-                error_msg = f"\n\n**Error**: LLM server connection failed - {str(e)}\n\nPlease ensure the server is running at `{base_url}`"
+                urls = ", ".join(f"`{b.url}`" for b in pool.backends)
+                error_msg = f"\n\n**Error**: LLM server connection failed - {str(e)}\n\nPlease ensure the server is running at {urls}"
                 yield json.dumps({"text": error_msg})
                 return
 
@@ -276,27 +448,35 @@ async def run_agent_loop(topology_id: str, user_query: str, history: List[dict],
             finish_reason = None
 
             first_reason = True
-            
+        
             try:
                 async for chunk in response:
+                    if chunk.usage:
+                        ctx.calibrate(chunk.usage.prompt_tokens)
+                        ctx.record_cache_usage(chunk.usage, getattr(chunk, "timings", None))
+
+                    # The usage chunk comes last with no choices
+                    if not chunk.choices:
+                        continue
+
                     delta = chunk.choices[0].delta
                     finish_reason = chunk.choices[0].finish_reason
 
                     if hasattr(delta, 'reasoning_content') and delta.reasoning_content:
                         if first_reason:
                             reasoning_content += "<think>"
-                            
+                        
                             yield json.dumps({"text": "<think>"})
                             first_reason = False
 
                         reasoning_content += delta.reasoning_content
                         yield json.dumps({"text": delta.reasoning_content})
-                    
+                
                     if not hasattr(delta, 'reasoning_content') and not first_reason and not delta.tool_calls and not first_reason:
                         reasoning_content += "</think>\n"
                         first_reason = True
                         yield json.dumps({"text": "</think>\n"})
-                    
+                
                     if delta.content:
                         current_content += delta.content
                         yield json.dumps({"text": delta.content})
@@ -309,74 +489,71 @@ async def run_agent_loop(topology_id: str, user_query: str, history: List[dict],
                             if tc.function.name: tool_calls[tc.index]["function"]["name"] = tc.function.name
                             if tc.function.arguments: tool_calls[tc.index]["function"]["arguments"] += tc.function.arguments
             except Exception as e:
+                pool.record_failure(backend, e)
                 error_msg = f"\n\n**Streaming Error**: {str(e)}"
                 yield json.dumps({"text": error_msg})
                 return
 
-            if finish_reason == "stop" and not tool_calls:
-                break
-            
-            if not tool_calls:
-                break
-            
-            assistant_msg = {
-                "role": "assistant",
-                "content": current_content or "",
-                "tool_calls": [
-                    {
-                        "id": tc["id"] or "call_default",
-                        "type": "function",
-                        "function": tc["function"]
-                    } for tc in tool_calls
-                ]
-            }
+        if finish_reason == "stop" and not tool_calls:
+            break
+        
+        if not tool_calls:
+            break
+        
+        assistant_msg = {
+            "role": "assistant",
+            "content": current_content or "",
+            "tool_calls": [
+                {
+                    "id": tc["id"] or "call_default",
+                    "type": "function",
+                    "function": tc["function"]
+                } for tc in tool_calls
+            ]
+        }
+
+        ctx.append(assistant_msg)
+
+        calls = []
+
+        for tc in tool_calls:
+            func_name = tc["function"]["name"]
+            try:
+                args = json.loads(tc["function"]["arguments"])
+            except:
+                args = {}
 
-            messages.append(assistant_msg)
+            args["topology_id"] = topology_id
 
-            for tc in tool_calls:
-                func_name = tc["function"]["name"]
-                try:
-                    args = json.loads(tc["function"]["arguments"])
-                except:
-                    args = {}
+            if func_name == "fetch_related_knowledge":
+                args["model_name"] = model
 
-                args["topology_id"] = topology_id
+            calls.append({"id": tc["id"] or "call_default", "name": func_name, "args": args})
 
-                if func_name == "fetch_related_knowledge":
-                    args["model_name"] = model
+        limit = asyncio.Semaphore(TOOL_CALL_CONCURRENCY)
 
-                    q = args["query"]
+        for batch in _tool_call_batches(calls):
+            for call in batch:
+                func_name, args = call["name"], call["args"]
+
+                if func_name == "fetch_related_knowledge":
+                    q = args.get("query")
                     yield json.dumps({"text": f"\n\n> Calling tool: `{func_name}` with query: \n\n`{q}`"})
                 elif func_name == "fetch_live_config":
-                    d = args["device_name"]
+                    d = args.get("device_name")
                     yield json.dumps({"text": f"\n\n> Calling tool: `{func_name}` for `{d}`"})
                 else:
                     yield json.dumps({"text": f"\n\n> Calling Tool: `{func_name}`...\n\n"})
 
-                try:
-                    result = await asyncio.wait_for(
-                        mcp_client.call_tool(func_name, args),
-                        timeout=120.0
-                    )
-                    
-                    if result.content and len(result.content) > 0:
-                        result_str = result.content[0].text or ""
-                    else:
-                        result_str = str(result) or ""
-                    
-                    if not result_str:
-                        result_str = "Tool executed successfully"
-                        
-                except asyncio.TimeoutError:
-                    yield json.dumps({"text": f"\n\n> Failed to call tool `{func_name}`: Timeout exceeded\n\n"})
-                except Exception as e:
-                    yield json.dumps({"text": f"\n\nSomething occured...\n\n"})
+            results = await asyncio.gather(*(_call_tool(call["name"], call["args"], limit) for call in batch))
 
-                messages.append({
+            for call, (result_str, error) in zip(batch, results):
+                if error:
+                    yield json.dumps({"text": f"\n\n> Failed to call tool `{call['name']}`: {error}\n\n"})
+
+                ctx.append({
                     "role": "tool",
-                    "tool_call_id": tc["id"] or "call_default",
-                    "name": func_name,
-                    "content": str(result_str) if result_str else "Success"
-                })
-                
-                await asyncio.sleep(0.1)
\ No newline at end of file
+                    "tool_call_id": call["id"],
+                    "name": call["name"],
+                    "content": result_str
+                })
\ No newline at end of file
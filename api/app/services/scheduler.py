@@ -0,0 +1,193 @@
+import threading
+import time
+
+from concurrent.futures import Future
+from contextlib import contextmanager, ExitStack
+
+from config import DEVICE_MAX_CONNECTIONS
+
+class _DeviceState:
+    def __init__(self):
+        self.cond = threading.Condition()
+        # Operations currently connected to the device
+        self.active = 0
+        self.writing = False
+        self.writers_waiting = 0
+        self.queued = 0
+        # Read operation name -> Future shared by every caller asking for it
+        self.inflight = {}
+
+# (topology_id, device_name) -> _DeviceState
+_devices = {}
+_devices_lock = threading.Lock()
+_stats_lock = threading.Lock()
+
+scheduler_stats = {
+    "reads": 0,
+    "writes": 0,
+    "coalesced": 0,
+    "waits": 0,
+    "wait_time_ms": 0.0,
+    "max_wait_ms": 0.0,
+}
+
+def _state(topology_id: str, device_name: str):
+    key = (topology_id, device_name)
+
+    with _devices_lock:
+        state = _devices.get(key)
+        if state is None:
+            state = _devices[key] = _DeviceState()
+
+    return state
+
+def _record_wait(started: float):
+    waited = (time.monotonic() - started) * 1000
+
+    with _stats_lock:
+        if waited >= 1:
+            scheduler_stats["waits"] += 1
+        scheduler_stats["wait_time_ms"] += waited
+        scheduler_stats["max_wait_ms"] = max(scheduler_stats["max_wait_ms"], waited)
+
+@contextmanager
+def _slot(state: _DeviceState, exclusive: bool):
+    """
+    Hold one of the device's DEVICE_MAX_CONNECTIONS slots, or all of them when
+    `exclusive`. Waiting writers go first so reads can't starve a push.
+    """
+    started = time.monotonic()
+
+    with state.cond:
+        state.queued += 1
+        if exclusive:
+            state.writers_waiting += 1
+
+        try:
+            while state.writing or (
+                state.active > 0 if exclusive
+                else state.active >= DEVICE_MAX_CONNECTIONS or state.writers_waiting > 0
+            ):
+                state.cond.wait()
+        finally:
+            state.queued -= 1
+            if exclusive:
+                state.writers_waiting -= 1
+
+        state.active += 1
+        state.writing = exclusive
+
+    _record_wait(started)
+
+    try:
+        yield
+    finally:
+        with state.cond:
+            state.active -= 1
+            if exclusive:
+                state.writing = False
+            state.cond.notify_all()
+
+def read(topology_id: str, device_name: str, operation: str, fn):
+    """
+    Run a read-only operation on a device. Callers asking for the same
+    `operation` while it is running get that run's result instead of
+    connecting again.
+    """
+    state = _state(topology_id, device_name)
+
+    with state.cond:
+        future = state.inflight.get(operation)
+        owner = future is None
+
+        if owner:
+            future = state.inflight[operation] = Future()
+
+    with _stats_lock:
+        scheduler_stats["reads" if owner else "coalesced"] += 1
+
+    if not owner:
+        return future.result()
+
+    try:
+        with _slot(state, exclusive=False):
+            result = fn()
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with state.cond:
+            state.inflight.pop(operation, None)
+
+def try_read(topology_id: str, device_name: str, fn):
+    """
+    Run a background read only if the device has a free slot right now and
+    no push is waiting. Returns False instead of queueing when it's busy.
+    """
+    state = _state(topology_id, device_name)
+
+    with state.cond:
+        if state.writing or state.writers_waiting or state.active >= DEVICE_MAX_CONNECTIONS:
+            return False
+        state.active += 1
+
+    try:
+        fn()
+    finally:
+        with state.cond:
+            state.active -= 1
+            state.cond.notify_all()
+
+    return True
+
+@contextmanager
+def devices(topology_id: str, device_names, exclusive: bool):
+    """
+    Hold a slot on several devices at once, e.g. for one Ansible play over
+    them. Taken in sorted order so two multi-device operations can't deadlock.
+    Yields `release(device_name)` to hand a device back as soon as the
+    operation is done with it, the rest are released when the block exits.
+    """
+    with _stats_lock:
+        scheduler_stats["writes" if exclusive else "reads"] += 1
+
+    held = {}
+
+    def release(device_name: str):
+        stack = held.pop(device_name, None)
+        if stack is not None:
+            stack.close()
+
+    try:
+        for device_name in sorted(set(device_names)):
+            stack = ExitStack()
+            stack.enter_context(_slot(_state(topology_id, device_name), exclusive))
+            held[device_name] = stack
+
+        yield release
+    finally:
+        for device_name in reversed(list(held)):
+            release(device_name)
+
+def get_stats():
+    with _devices_lock:
+        states = list(_devices.items())
+
+    busy = {
+        f"{topology_id}/{device_name}": {
+            "active": state.active,
+            "queued": state.queued,
+            "writing": state.writing,
+        } for (topology_id, device_name), state in states if state.active or state.queued
+    }
+
+    return {
+        "max_connections_per_device": DEVICE_MAX_CONNECTIONS,
+        "tracked_devices": len(states),
+        "queue_depth": sum(d["queued"] for d in busy.values()),
+        "busy": busy,
+        **scheduler_stats,
+    }
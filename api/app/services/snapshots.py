@@ -0,0 +1,111 @@
+import difflib
+
+from datetime import datetime
+
+from config import SNAPSHOT_KEYFRAME_INTERVAL
+from utils.db import async_execute_read
+from utils.delta import apply_delta
+from services.devices import normalize_config
+
+async def get_history(topology_id: str, device_id: str, limit: int = 50):
+    q = """
+    SELECT cs.id, cs.seq, cs.created_at, cs.last_seen_at, cs.observations,
+        CASE WHEN cs.content IS NULL THEN 'delta' ELSE 'full' END as storage,
+        COALESCE(octet_length(cs.content), octet_length(cs.delta)) as stored_bytes
+    FROM config_snapshots cs
+    JOIN devices d ON d.device_id = cs.device_id
+    WHERE d.topology_id = %s AND cs.device_id = %s
+    ORDER BY cs.created_at DESC
+    LIMIT %s
+    """
+
+    return await async_execute_read(q, (topology_id, device_id, limit))
+
+async def _reconstruct(device_id: str, created_at: datetime):
+    """
+    Rebuild the snapshot taken at `created_at` by walking forward to the nearest
+    full row (a keyframe or the latest snapshot) and applying deltas backwards.
+    """
+    q = """
+    SELECT id, content, delta, created_at FROM config_snapshots
+    WHERE device_id = %s AND created_at {op} %s
+    ORDER BY created_at ASC
+    LIMIT %s
+    """
+
+    chain = []
+    op = ">="
+
+    while True:
+        rows = await async_execute_read(q.format(op=op), (device_id, created_at, SNAPSHOT_KEYFRAME_INTERVAL + 1))
+        if not rows:
+            raise ValueError(f"Snapshot history for device {device_id} is broken: no full snapshot found")
+
+        for row in rows:
+            chain.append(row)
+            if row["content"] is not None:
+                content = row["content"]
+                for older in reversed(chain[:-1]):
+                    content = apply_delta(content, older["delta"])
+                return content
+
+        created_at = rows[-1]["created_at"]
+        op = ">"
+
+async def _get_snapshot(topology_id: str, device_id: str, snapshot_id: str = None, at: datetime = None):
+    q = """
+    SELECT cs.id as snapshot_id, cs.device_id, cs.created_at, cs.last_seen_at, cs.observations
+    FROM config_snapshots cs
+    JOIN devices d ON d.device_id = cs.device_id
+    WHERE d.topology_id = %s AND cs.device_id = %s
+    """
+    params = [topology_id, device_id]
+
+    if snapshot_id:
+        q += " AND cs.id = %s"
+        params.append(snapshot_id)
+    elif at:
+        q += " AND cs.created_at <= %s"
+        params.append(at)
+
+    q += " ORDER BY cs.created_at DESC LIMIT 1"
+
+    result = await async_execute_read(q, params)
+    if not result:
+        return None
+
+    snapshot = result[0]
+    snapshot["content"] = await _reconstruct(device_id, snapshot["created_at"])
+
+    return snapshot
+
+async def get_config_at(topology_id: str, device_id: str, at: datetime):
+    """Config of a device as it was at time `at`"""
+    return await _get_snapshot(topology_id, device_id, at=at)
+
+async def get_snapshot_config(topology_id: str, device_id: str, snapshot_id: str):
+    return await _get_snapshot(topology_id, device_id, snapshot_id=snapshot_id)
+
+async def diff_snapshots(topology_id: str, device_id: str, from_id: str, to_id: str = None):
+    """Unified diff between two snapshots, `to_id` defaults to the latest one"""
+    old = await _get_snapshot(topology_id, device_id, snapshot_id=from_id)
+    new = await _get_snapshot(topology_id, device_id, snapshot_id=to_id)
+
+    if not old or not new:
+        return None
+
+    diff = list(difflib.unified_diff(
+        normalize_config(old["content"]).split("\n"),
+        normalize_config(new["content"]).split("\n"),
+        fromfile=str(old["snapshot_id"]),
+        tofile=str(new["snapshot_id"]),
+        lineterm="",
+    ))
+
+    return {
+        "from": {"snapshot_id": old["snapshot_id"], "created_at": old["created_at"]},
+        "to": {"snapshot_id": new["snapshot_id"], "created_at": new["created_at"]},
+        "added": sum(1 for l in diff if l.startswith("+") and not l.startswith("+++")),
+        "removed": sum(1 for l in diff if l.startswith("-") and not l.startswith("---")),
+        "diff": "\n".join(diff),
+    }
@@ -0,0 +1,241 @@
+import re
+import threading
+import time
+
+from pylibsshext.session import Session
+
+from config import SSH_PORT, SSH_CONNECT_TIMEOUT, SSH_COMMAND_TIMEOUT, SSH_IDLE_TIMEOUT, SSH_KEEPALIVE_INTERVAL
+from services import scheduler
+
+# Exec-mode prompt on the last line of the shell output, e.g. "R1#" or "core-sw>"
+PROMPT = re.compile(r"[\w.\-/:]+[#>]\s*$")
+# How IOS reports a command it didn't run, below a '^' marker line. Other
+# '%' lines are messages (e.g. %LINK-3-UPDOWN) and don't mean it failed
+REJECTED = re.compile(r"^% (Invalid input|Incomplete command|Ambiguous command)", re.MULTILINE)
+
+# (topology_id, device_name) -> DeviceSession
+_sessions = {}
+_key_locks = {}
+_pool_lock = threading.Lock()
+_reaper = None
+
+ssh_stats = {
+    "connects": 0,
+    "reuses": 0,
+    "retries": 0,
+    "commands": 0,
+    "failures": 0,
+    "evictions": 0,
+    "keepalives": 0,
+    "keepalives_skipped": 0,
+}
+
+class CommandError(RuntimeError):
+    """The device rejected a command, the session itself is fine"""
+
+class DeviceSession:
+    """
+    One authenticated libssh session to a device with a single interactive
+    shell. IOS tears the session down after one exec request, so commands are
+    typed into the shell and their output is read up to the next prompt.
+    """
+
+    def __init__(self, host: str, username: str, password: str):
+        self.target = (host, username, password)
+        self.last_used = time.monotonic()
+        self.prompt = None
+
+        self.session = Session()
+        self.session.connect(
+            host=host,
+            user=username,
+            password=password,
+            port=SSH_PORT,
+            timeout=SSH_CONNECT_TIMEOUT,
+            host_key_checking=False,
+            look_for_keys=False,
+        )
+
+        try:
+            self.shell = self.session.invoke_shell()
+            self._read_until_prompt(SSH_CONNECT_TIMEOUT)
+            # No --More-- paging and no syslog messages in command output
+            self._execute("terminal length 0", SSH_COMMAND_TIMEOUT)
+            self._execute("terminal no monitor", SSH_COMMAND_TIMEOUT)
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def alive(self):
+        return self.session.is_connected and not self.shell.is_eof()
+
+    def _read_until_prompt(self, timeout: float):
+        output = ""
+        deadline = time.monotonic() + timeout
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"No prompt from {self.target[0]} after {timeout}s: {output[-200:]!r}")
+
+            if self.shell.poll(timeout=int(min(remaining, 1) * 1000)) < 0:
+                raise ConnectionError(f"Shell to {self.target[0]} was closed")
+
+            data = self.shell.read_nonblocking(size=1024)
+            if data is None:
+                raise ConnectionError(f"Shell to {self.target[0]} was closed")
+
+            output += data.decode("utf-8", errors="replace").replace("\r", "")
+            last_line = output.rsplit("\n", 1)[-1].strip()
+
+            if self.prompt is None and PROMPT.fullmatch(last_line):
+                self.prompt = last_line
+
+            if self.prompt is not None and last_line == self.prompt:
+                return output
+
+    def _execute(self, command: str, timeout: float):
+        # Drop anything printed while idle, e.g. syslog messages
+        while self.shell.poll(timeout=0) > 0 and self.shell.read_nonblocking(size=1024):
+            pass
+
+        self.shell.write(command.encode("utf-8") + b"\n")
+        lines = self._read_until_prompt(timeout).split("\n")
+
+        # First line echoes the command, the last one is the prompt
+        return "\n".join(lines[1:-1]).strip()
+
+    def run(self, command: str):
+        output = self._execute(command, SSH_COMMAND_TIMEOUT)
+        self.last_used = time.monotonic()
+
+        if not output or REJECTED.search(output):
+            raise CommandError(f"'{command}' failed on {self.target[0]}: {output or 'no output'}")
+
+        return output
+
+    def ping(self):
+        """Send an empty line and wait for the prompt, keeps the session from timing out"""
+        self._execute("", SSH_CONNECT_TIMEOUT)
+
+    def close(self):
+        for closable in (getattr(self, "shell", None), self.session):
+            try:
+                if closable is not None:
+                    closable.close()
+            except Exception:
+                pass
+
+def _key_lock(key):
+    with _pool_lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+def _drop(key):
+    with _pool_lock:
+        session = _sessions.pop(key, None)
+
+    if session:
+        session.close()
+
+def target_from_inventory(inventory: dict, device_name: str):
+    """(host, username, password) out of an inventory built by ansible.get_device_inventory"""
+    host_vars = inventory["all"]["hosts"][device_name]
+    group_vars = inventory["all"]["vars"]
+
+    return host_vars["ansible_host"], group_vars["ansible_user"], group_vars["ansible_password"]
+
+def run_command(topology_id: str, device_name: str, target: tuple, command: str):
+    """
+    Run a show command over the pooled session for a device, connecting on first
+    use or when its address/credentials changed. When a reused session fails the
+    command is retried once on a fresh one, a failed session is always dropped.
+    """
+    key = (topology_id, device_name)
+
+    with _key_lock(key):
+        session = _sessions.get(key)
+
+        if session and (session.target != target or not session.alive):
+            _drop(key)
+            session = None
+
+        if session is not None:
+            ssh_stats["reuses"] += 1
+            ssh_stats["commands"] += 1
+
+            try:
+                return session.run(command)
+            except CommandError:
+                raise
+            except Exception as e:
+                _drop(key)
+                ssh_stats["retries"] += 1
+                print(f"SSH session to {device_name} failed, reconnecting: {e}")
+
+        try:
+            session = DeviceSession(*target)
+            ssh_stats["connects"] += 1
+
+            with _pool_lock:
+                _sessions[key] = session
+            _start_reaper()
+
+            ssh_stats["commands"] += 1
+            return session.run(command)
+        except CommandError:
+            raise
+        except Exception:
+            ssh_stats["failures"] += 1
+            _drop(key)
+            raise
+
+def _reap():
+    """Close sessions idle past SSH_IDLE_TIMEOUT and keep the rest from timing out"""
+    while True:
+        time.sleep(SSH_KEEPALIVE_INTERVAL)
+
+        with _pool_lock:
+            entries = list(_sessions.items())
+
+        for key, session in entries:
+            lock = _key_lock(key)
+            if not lock.acquire(blocking=False):
+                continue
+
+            try:
+                idle = time.monotonic() - session.last_used
+
+                if idle > SSH_IDLE_TIMEOUT or not session.alive:
+                    _drop(key)
+                    ssh_stats["evictions"] += 1
+                elif idle >= SSH_KEEPALIVE_INTERVAL:
+                    # Doesn't touch last_used, keepalives aren't use for idle eviction.
+                    # Skipped while the device is busy, a push has it to itself
+                    if scheduler.try_read(*key, session.ping):
+                        ssh_stats["keepalives"] += 1
+                    else:
+                        ssh_stats["keepalives_skipped"] += 1
+            except Exception:
+                _drop(key)
+                ssh_stats["evictions"] += 1
+            finally:
+                lock.release()
+
+def _start_reaper():
+    global _reaper
+
+    with _pool_lock:
+        if _reaper is None:
+            _reaper = threading.Thread(target=_reap, name="ssh-session-reaper", daemon=True)
+            _reaper.start()
+
+def close_all():
+    with _pool_lock:
+        keys = list(_sessions)
+
+    for key in keys:
+        _drop(key)
+
+def get_stats():
+    return {"open_sessions": len(_sessions), **ssh_stats}
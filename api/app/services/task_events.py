@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+from services.jobs import JOB_EVENTS_CHANNEL
+from utils import db
+
+# task_id -> set of asyncio.Queue, one per connected stream
+_subscribers = {}
+_listener = None
+
+async def _listen():
+    """Fan NOTIFYs from any worker process out to the streams in this process"""
+    while True:
+        try:
+            conn = await db.async_connect(autocommit=True)
+
+            async with conn:
+                await conn.execute(f"LISTEN {JOB_EVENTS_CHANNEL}")
+
+                async for notify in conn.notifies():
+                    try:
+                        event = json.loads(notify.payload)
+                    except json.JSONDecodeError:
+                        continue
+
+                    for queue in _subscribers.get(event.get("task_id"), ()):
+                        queue.put_nowait(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Job event listener failed: {e}")
+            await asyncio.sleep(1)
+
+def subscribe(task_id: str):
+    global _listener
+
+    if _listener is None or _listener.done():
+        _listener = asyncio.create_task(_listen())
+
+    queue = asyncio.Queue()
+    _subscribers.setdefault(task_id, set()).add(queue)
+
+    return queue
+
+def unsubscribe(task_id: str, queue: asyncio.Queue):
+    queues = _subscribers.get(task_id)
+
+    if queues is not None:
+        queues.discard(queue)
+        if not queues:
+            del _subscribers[task_id]
+
+async def close():
+    global _listener
+
+    if _listener is not None:
+        _listener.cancel()
+        _listener = None
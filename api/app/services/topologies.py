@@ -1,10 +1,14 @@
-from utils.db import execute_write, execute_read
+from utils.db import execute_read, async_execute_write, async_execute_read
 
 def get_topology_detail(topology_id: str):
     result = execute_read("SELECT * FROM topologies WHERE project_id = %s", (topology_id,))
     return result[0] if result else None
 
-def create_new_topology(topology_id: str, name: str):
+async def get_topology_detail_async(topology_id: str):
+    result = await async_execute_read("SELECT * FROM topologies WHERE project_id = %s", (topology_id,))
+    return result[0] if result else None
+
+async def create_new_topology(topology_id: str, name: str):
     q = """
     INSERT INTO topologies (project_id, name)
     VALUES (%s, %s)
@@ -13,9 +17,9 @@ def create_new_topology(topology_id: str, name: str):
     RETURNING *;
     """
 
-    return execute_write(q, (topology_id, name,))
+    return await async_execute_write(q, (topology_id, name,))
 
-def update_user_topology(topology_id: str, username: str, password: str):
+async def update_user_topology(topology_id: str, username: str, password: str):
     q = """
     UPDATE topologies SET 
         username = %s,
@@ -24,4 +28,4 @@ def update_user_topology(topology_id: str, username: str, password: str):
     RETURNING project_id
     """
 
-    return execute_write(q, (username, password, topology_id))
\ No newline at end of file
+    return await async_execute_write(q, (username, password, topology_id))
\ No newline at end of file
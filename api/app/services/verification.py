@@ -0,0 +1,73 @@
+import asyncio
+
+from starlette.concurrency import run_in_threadpool
+
+from services import ansible, config_cache, devices, snapshots
+from utils.ios_config import parse_config, verify_blocks
+
+# (topology_id, device_name) -> id of the snapshot a push started from
+_pre_push = {}
+
+def record_pre_push(topology_id: str, device_names):
+    """Remember each device's latest stored snapshot before configuration is pushed"""
+    for device_name in set(device_names):
+        latest = devices.get_latest_config_by_name(topology_id, device_name)
+        _pre_push[(topology_id, device_name)] = latest["snapshot_id"] if latest else None
+
+async def _verify_device(topology_id: str, device_name: str, blocks: list):
+    latest = await run_in_threadpool(devices.get_latest_config_by_name, topology_id, device_name)
+
+    key = (topology_id, device_name)
+    before_id = _pre_push.pop(key) if key in _pre_push else (latest["snapshot_id"] if latest else None)
+
+    # The push invalidated the cache, so this is either a post-push fetch or a live one
+    after = await run_in_threadpool(config_cache.get_config, topology_id, device_name)
+    if after is None:
+        after = await run_in_threadpool(ansible.run_fetch_single_config, topology_id, device_name)
+
+        if after.startswith("Error"):
+            return {"status": "unknown", "error": after}
+
+    before = None
+    if before_id and latest:
+        snapshot = await snapshots.get_snapshot_config(topology_id, latest["device_id"], before_id)
+        before = parse_config(snapshot["content"]) if snapshot else None
+
+    result = verify_blocks(before, parse_config(after), blocks)
+
+    applied = sum(b["applied"] for b in result["blocks"])
+    missing = sum(len(b["missing"]) for b in result["blocks"])
+
+    if not missing:
+        status = "applied"
+    elif applied:
+        status = "partial"
+    else:
+        status = "not_applied"
+
+    return {"status": status, **result}
+
+async def verify_push(topology_id: str, device_configs: list):
+    """Per device verdict of whether the pushed blocks are in the live config"""
+    blocks_by_device = {}
+
+    for config in device_configs:
+        parent = config.get("parent")
+        if parent in ("", "null", "None"):
+            parent = None
+
+        blocks_by_device.setdefault(config.get("device_name"), []).append({
+            "parent": parent,
+            "commands": config.get("commands", []),
+        })
+
+    names = list(blocks_by_device)
+    results = await asyncio.gather(
+        *(_verify_device(topology_id, name, blocks_by_device[name]) for name in names),
+        return_exceptions=True
+    )
+
+    return {
+        name: {"status": "unknown", "error": str(result)} if isinstance(result, Exception) else result
+        for name, result in zip(names, results)
+    }
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+from collections import OrderedDict
+
+MISSING = object()
+
+class TTLCache:
+    """
+    Bounded LRU cache with a per-entry TTL and hit/miss counters.
+    get_or_load() coalesces concurrent loads of the same key into one call.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key, max_age: float = None, default=None):
+        """Cached value if it is younger than both the TTL and `max_age`"""
+        limit = self.ttl if max_age is None else min(self.ttl, max_age)
+
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is not None and time.monotonic() - entry[0] <= limit:
+                self._data.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+
+            self.stats["misses"] += 1
+            return default
+
+    def age(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return None if entry is None else time.monotonic() - entry[0]
+
+    def set(self, key, value, age: float = 0):
+        """Store `value`, optionally as if it had been loaded `age` seconds ago"""
+        with self._lock:
+            self._data[key] = (time.monotonic() - age, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.stats["invalidations"] += 1
+
+    def invalidate_where(self, predicate):
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+                self.stats["invalidations"] += 1
+
+    def items(self):
+        """(key, value) of every entry that hasn't expired"""
+        now = time.monotonic()
+
+        with self._lock:
+            return [(key, value) for key, (stored, value) in self._data.items() if now - stored <= self.ttl]
+
+    def clear(self):
+        with self._lock:
+            self.stats["invalidations"] += len(self._data)
+            self._data.clear()
+
+    async def get_or_load(self, key, loader, max_age: float = None):
+        """Return the cached value or await `loader()` once for all concurrent callers"""
+        value = self.get(key, max_age, default=MISSING)
+        if value is not MISSING:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+
+        try:
+            value = await loader()
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark as retrieved so a load nobody else waited on doesn't log a warning
+            future.exception()
+            raise
+        else:
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def get_stats(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else None,
+            **self.stats,
+        }
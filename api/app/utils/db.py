@@ -1,38 +1,323 @@
+import threading
+import time
+
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
+
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+
+from psycopg import AsyncConnection
+from psycopg.rows import dict_row
+from psycopg.types.string import TextLoader
+from psycopg_pool import AsyncConnectionPool
+
+from config import (
+    DB_HOST, DB_NAME, DB_PORT, DB_USER, DB_PASSWORD,
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT, DB_POOL_HEALTH_CHECK_INTERVAL,
+    DB_ASYNC_POOL_MIN_SIZE, DB_ASYNC_POOL_MAX_SIZE
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX_SIZE)
+_last_used = {}
 
-from config import DB_HOST, DB_NAME, DB_USER, DB_PASSWORD
+_async_pool = None
+
+# Connection bound by transaction() / async_transaction() for the current request
+_current_conn = ContextVar("db_connection", default=None)
+_current_async_conn = ContextVar("async_db_connection", default=None)
+
+pool_stats = {
+    "checkouts": 0,
+    "waits": 0,
+    "wait_time_ms": 0.0,
+    "timeouts": 0,
+    "health_check_failures": 0,
+    "in_use": 0,
+    "max_in_use": 0,
+}
 
 def get_connection():
     conn = psycopg2.connect(
         host=DB_HOST,
         database=DB_NAME,
-        port="5432",
+        port=DB_PORT,
         user=DB_USER,
         password=DB_PASSWORD
     )
 
     return conn
 
-def execute_write(query, params=None):
-    conn = get_connection()
+def get_pool():
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(
+                    DB_POOL_MIN_SIZE,
+                    DB_POOL_MAX_SIZE,
+                    host=DB_HOST,
+                    database=DB_NAME,
+                    port=DB_PORT,
+                    user=DB_USER,
+                    password=DB_PASSWORD
+                )
+
+    return _pool
+
+def close_pool():
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            _last_used.clear()
+
+def _is_healthy(conn):
+    if conn.closed:
+        return False
+
+    if time.monotonic() - _last_used.get(id(conn), 0) < DB_POOL_HEALTH_CHECK_INTERVAL:
+        return True
+
     try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+def _checkout():
+    started = time.monotonic()
+
+    if not _pool_slots.acquire(blocking=False):
+        with _stats_lock:
+            pool_stats["waits"] += 1
+        if not _pool_slots.acquire(timeout=DB_POOL_TIMEOUT):
+            with _stats_lock:
+                pool_stats["timeouts"] += 1
+            raise RuntimeError(f"Timed out after {DB_POOL_TIMEOUT}s waiting for a database connection")
+        with _stats_lock:
+            pool_stats["wait_time_ms"] += (time.monotonic() - started) * 1000
+
+    try:
+        pool = get_pool()
+        conn = pool.getconn()
+
+        if not _is_healthy(conn):
+            with _stats_lock:
+                pool_stats["health_check_failures"] += 1
+            _last_used.pop(id(conn), None)
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+    except Exception:
+        _pool_slots.release()
+        raise
+
+    with _stats_lock:
+        pool_stats["checkouts"] += 1
+        pool_stats["in_use"] += 1
+        pool_stats["max_in_use"] = max(pool_stats["max_in_use"], pool_stats["in_use"])
+
+    return conn
+
+def _release(conn):
+    broken = conn.closed
+
+    if not broken and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+
+    if broken:
+        _last_used.pop(id(conn), None)
+    else:
+        _last_used[id(conn)] = time.monotonic()
+
+    try:
+        get_pool().putconn(conn, close=broken)
+    finally:
+        with _stats_lock:
+            pool_stats["in_use"] -= 1
+        _pool_slots.release()
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection, reusing the one bound by transaction() if any"""
+    conn = _current_conn.get()
+    if conn is not None:
+        yield conn
+        return
+
+    conn = _checkout()
+    try:
+        yield conn
+    finally:
+        _release(conn)
+
+@contextmanager
+def transaction():
+    """
+    Run every execute_read/execute_write inside the block on one pooled
+    connection and commit once at the end (rollback on error).
+    Nested calls join the outer transaction.
+    """
+    if _current_conn.get() is not None:
+        yield _current_conn.get()
+        return
+
+    conn = _checkout()
+    token = _current_conn.set(conn)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _current_conn.reset(token)
+        _release(conn)
+
+def get_pool_stats():
+    return {
+        "min_size": DB_POOL_MIN_SIZE,
+        "max_size": DB_POOL_MAX_SIZE,
+        "open": 0 if _pool is None else len(_pool._pool) + len(_pool._used),
+        "idle": 0 if _pool is None else len(_pool._pool),
+        "saturation": round(pool_stats["in_use"] / DB_POOL_MAX_SIZE, 2),
+        **pool_stats,
+    }
+
+def execute_write(query, params=None):
+    with connection() as conn:
         with conn.cursor() as cur:
             cur.execute(query, params)
-            conn.commit()
+            if _current_conn.get() is None:
+                conn.commit()
             try:
                 result = cur.fetchone()
                 return result[0] if result else None
             except (psycopg2.ProgrammingError, TypeError):
                 return None
-    finally:
-        conn.close()
 
 def execute_read(query, params=None):
-    conn = get_connection()
-    try:
+    with connection() as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute(query, params)
             return cur.fetchall()
-    finally:
-        conn.close()
+
+
+async def _configure_async_connection(conn):
+    # Return UUID columns as str, same as the psycopg2 path
+    conn.adapters.register_loader("uuid", TextLoader)
+
+async def async_connect(**kwargs):
+    """Dedicated (non pooled) async connection, e.g. for LISTEN"""
+    conn = await AsyncConnection.connect(
+        host=DB_HOST,
+        dbname=DB_NAME,
+        port=DB_PORT,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        **kwargs
+    )
+    await _configure_async_connection(conn)
+
+    return conn
+
+async def get_async_pool():
+    global _async_pool
+
+    if _async_pool is None:
+        _async_pool = AsyncConnectionPool(
+            kwargs={
+                "host": DB_HOST,
+                "dbname": DB_NAME,
+                "port": DB_PORT,
+                "user": DB_USER,
+                "password": DB_PASSWORD,
+            },
+            min_size=DB_ASYNC_POOL_MIN_SIZE,
+            max_size=DB_ASYNC_POOL_MAX_SIZE,
+            timeout=DB_POOL_TIMEOUT,
+            configure=_configure_async_connection,
+            check=AsyncConnectionPool.check_connection,
+            open=False,
+        )
+        await _async_pool.open()
+
+    return _async_pool
+
+async def close_async_pool():
+    global _async_pool
+
+    if _async_pool is not None:
+        pool, _async_pool = _async_pool, None
+        await pool.close()
+
+def get_async_pool_stats():
+    if _async_pool is None:
+        return {"min_size": DB_ASYNC_POOL_MIN_SIZE, "max_size": DB_ASYNC_POOL_MAX_SIZE, "open": False}
+
+    stats = _async_pool.get_stats()
+    in_use = stats.get("pool_size", 0) - stats.get("pool_available", 0)
+
+    return {
+        "min_size": DB_ASYNC_POOL_MIN_SIZE,
+        "max_size": DB_ASYNC_POOL_MAX_SIZE,
+        "open": True,
+        "in_use": in_use,
+        "saturation": round(in_use / DB_ASYNC_POOL_MAX_SIZE, 2),
+        **stats,
+    }
+
+@asynccontextmanager
+async def async_connection():
+    conn = _current_async_conn.get()
+    if conn is not None:
+        yield conn
+        return
+
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        yield conn
+
+@asynccontextmanager
+async def async_transaction():
+    """Async counterpart of transaction()"""
+    if _current_async_conn.get() is not None:
+        yield _current_async_conn.get()
+        return
+
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        token = _current_async_conn.set(conn)
+        try:
+            async with conn.transaction():
+                yield conn
+        finally:
+            _current_async_conn.reset(token)
+
+async def async_execute_write(query, params=None):
+    async with async_connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, params)
+            if cur.description is None:
+                return None
+            result = await cur.fetchone()
+            return result[0] if result else None
+
+async def async_execute_read(query, params=None):
+    async with async_connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(query, params)
+            return await cur.fetchall()
@@ -0,0 +1,35 @@
+import json
+import zlib
+
+from difflib import SequenceMatcher
+
+def encode_delta(base: str, target: str):
+    """
+    Line-level delta that rebuilds `target` from `base`, zlib-compressed.
+    Ops are ["c", start, end] to copy base lines and ["a", [lines]] to add new ones.
+    """
+    base_lines = base.split("\n")
+    target_lines = target.split("\n")
+
+    ops = []
+    matcher = SequenceMatcher(None, base_lines, target_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["c", i1, i2])
+        elif tag in ("replace", "insert"):
+            ops.append(["a", target_lines[j1:j2]])
+
+    return zlib.compress(json.dumps(ops, separators=(",", ":")).encode("utf-8"))
+
+def apply_delta(base: str, delta):
+    base_lines = base.split("\n")
+    ops = json.loads(zlib.decompress(bytes(delta)).decode("utf-8"))
+
+    lines = []
+    for op in ops:
+        if op[0] == "c":
+            lines.extend(base_lines[op[1]:op[2]])
+        else:
+            lines.extend(op[1])
+
+    return "\n".join(lines)
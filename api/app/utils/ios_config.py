@@ -0,0 +1,418 @@
+import re
+
+from functools import lru_cache
+
+SECTION_KINDS = (
+    ("interfaces", re.compile(r"^interface\s")),
+    ("routing", re.compile(r"^(router\s|ip route\s|ipv6 route\s)")),
+    ("acls", re.compile(r"^((ip|ipv6|mac) access-list\s|access-list\s)")),
+    ("lines", re.compile(r"^line\s")),
+    ("banners", re.compile(r"^banner\s")),
+)
+
+KINDS = ("global", "interfaces", "routing", "acls", "lines", "banners", "other")
+
+# Header lines IOS prints around the config that carry no configuration
+PREAMBLE = re.compile(r"^(Building configuration\.\.\.|Current configuration :|end$)")
+
+class Section:
+    def __init__(self, kind: str, header: str):
+        self.kind = kind
+        self.header = header
+        # Raw child lines, indentation kept
+        self.lines = []
+
+    def render(self):
+        if self.kind in ("global", "banners") or self.header in ("ip route", "ipv6 route") or self.header.startswith("access-list "):
+            return "\n".join(self.lines)
+
+        return "\n".join([self.header, *self.lines])
+
+    @property
+    def commands(self):
+        """Child commands without indentation, as they'd be pushed under the header"""
+        return [l.strip() for l in self.lines if l.strip() and not l.strip().startswith("!")]
+
+class ConfigIndex:
+    """
+    Running-config split into top-level sections: interfaces, routing processes
+    and static routes, ACLs, lines, banners, other blocks (crypto, class-map...)
+    and the remaining single-line globals.
+    """
+
+    def __init__(self, sections: list):
+        self.sections = sections
+        self.by_header = {s.header: s for s in sections}
+
+    def of_kind(self, kind: str):
+        return [s for s in self.sections if s.kind == kind]
+
+    def global_lines(self):
+        return [l for s in self.of_kind("global") for l in s.lines]
+
+    def select(self, selectors: list):
+        """
+        Sections matching a kind ("interfaces", "routing", ...) or a header
+        prefix ("interface GigabitEthernet0/1", "router ospf"), in config order.
+        Returns (sections, selectors that matched nothing).
+        """
+        wanted = set()
+        unmatched = []
+
+        for selector in selectors:
+            key = selector.strip().lower()
+            key = {"globals": "global", "acl": "acls", "line": "lines", "banner": "banners"}.get(key, key)
+
+            if key in KINDS:
+                matches = [id(s) for s in self.of_kind(key)]
+            else:
+                matches = [id(s) for s in self.sections if s.header.lower() == key or s.header.lower().startswith(key + " ")]
+
+            if matches:
+                wanted.update(matches)
+            else:
+                unmatched.append(selector)
+
+        return [s for s in self.sections if id(s) in wanted], unmatched
+
+    def render(self, selectors: list):
+        sections, unmatched = self.select(selectors)
+
+        parts = [s.render() for s in sections]
+        parts += [f"! no section matching '{selector}'" for selector in unmatched]
+
+        return "\n!\n".join(parts)
+
+    def summary(self):
+        """A few lines per section instead of the whole config"""
+        out = []
+
+        hostname = next((l.split(None, 1)[1] for l in self.global_lines() if l.startswith("hostname ")), None)
+        if hostname:
+            out.append(f"hostname {hostname}")
+
+        interfaces = self.of_kind("interfaces")
+        if interfaces:
+            out.append("interfaces:")
+            for s in interfaces:
+                out.append(f"  {s.header.split(None, 1)[1]}: {_interface_summary(s)}")
+
+        routing = self.of_kind("routing")
+        if routing:
+            out.append("routing:")
+            for s in routing:
+                out.append(f"  {s.header}: {len(s.commands) or len(s.lines)} lines")
+
+        acls = self.of_kind("acls")
+        if acls:
+            out.append("acls:")
+            for s in acls:
+                out.append(f"  {s.header}: {len(s.commands) or len(s.lines)} entries")
+
+        for kind in ("lines", "other"):
+            sections = self.of_kind(kind)
+            if sections:
+                out.append(f"{kind}: " + ", ".join(s.header for s in sections))
+
+        out.append(f"global: {len(self.global_lines())} lines")
+
+        return "\n".join(out)
+
+def _interface_summary(section: Section):
+    address = "unassigned"
+    state = "up"
+    description = None
+
+    for command in section.commands:
+        if command.startswith("ip address ") and address == "unassigned":
+            address = command[len("ip address "):]
+        elif command == "no ip address":
+            address = "no ip address"
+        elif command == "shutdown":
+            state = "shutdown"
+        elif command.startswith("description "):
+            description = command[len("description "):]
+
+    summary = f"{address}, {state}"
+    return f'{summary}, "{description}"' if description else summary
+
+def _kind(header: str):
+    for kind, pattern in SECTION_KINDS:
+        if pattern.match(header):
+            return kind
+
+    return None
+
+def _banner_delimiter(line: str):
+    """Delimiter of 'banner motd ^C...', IOS shows the control char as '^C'"""
+    parts = line.split(None, 2)
+    if len(parts) < 3:
+        return None, ""
+
+    rest = parts[2]
+    delimiter = "^C" if rest.startswith("^C") else rest[0]
+
+    return delimiter, rest[len(delimiter):]
+
+@lru_cache(maxsize=256)
+def parse_config(config: str):
+    """Build a ConfigIndex from running-config text (cached per config string)"""
+    sections = []
+    grouped = {}
+    globals_section = None
+    current = None
+
+    lines = config.replace("\r\n", "\n").split("\n")
+    i = 0
+
+    while i < len(lines):
+        line = lines[i].rstrip()
+        i += 1
+
+        if not line.strip() or PREAMBLE.match(line):
+            continue
+
+        if line[0] in (" ", "\t"):
+            if current is not None:
+                current.lines.append(line)
+            continue
+
+        if line.startswith("!"):
+            current = None
+            continue
+
+        kind = _kind(line)
+
+        if kind == "banners":
+            section = Section("banners", " ".join(line.split()[:2]))
+            section.lines.append(line)
+
+            delimiter, rest = _banner_delimiter(line)
+            if delimiter and delimiter not in rest:
+                while i < len(lines):
+                    section.lines.append(lines[i].rstrip())
+                    i += 1
+                    if delimiter in section.lines[-1]:
+                        break
+
+            sections.append(section)
+            current = None
+            continue
+
+        # Single-line entries that belong together: numbered ACLs and static routes
+        group = None
+        if line.startswith("access-list "):
+            group = " ".join(line.split()[:2])
+        elif line.startswith(("ip route ", "ipv6 route ")):
+            group = " ".join(line.split()[:2])
+
+        if group:
+            section = grouped.get(group)
+            if section is None:
+                section = grouped[group] = Section(kind, group)
+                sections.append(section)
+            section.lines.append(line)
+            current = None
+            continue
+
+        # A following indented line decides whether this starts a block
+        has_children = i < len(lines) and lines[i][:1] in (" ", "\t")
+
+        if kind is None and not has_children:
+            if globals_section is None:
+                globals_section = Section("global", "global")
+                sections.append(globals_section)
+            globals_section.lines.append(line)
+            current = None
+            continue
+
+        current = Section(kind or "other", line)
+        sections.append(current)
+
+    return ConfigIndex(sections)
+
+INTERFACE_PREFIXES = (
+    ("tengigabitethernet", "TenGigabitEthernet"), ("te", "TenGigabitEthernet"),
+    ("gigabitethernet", "GigabitEthernet"), ("gi", "GigabitEthernet"),
+    ("fastethernet", "FastEthernet"), ("fa", "FastEthernet"),
+    ("ethernet", "Ethernet"), ("eth", "Ethernet"), ("e", "Ethernet"),
+    ("loopback", "Loopback"), ("lo", "Loopback"),
+    ("serial", "Serial"), ("se", "Serial"),
+    ("tunnel", "Tunnel"), ("tu", "Tunnel"),
+    ("port-channel", "Port-channel"), ("po", "Port-channel"),
+    ("vlan", "Vlan"), ("vl", "Vlan"),
+)
+
+# Sequence numbers IOS adds in front of named ACL entries
+ACL_SEQUENCE = re.compile(r"^\d+\s+(?=(permit|deny|remark|evaluate)\b)")
+
+def _normalize_command(command: str):
+    return ACL_SEQUENCE.sub("", " ".join(command.split())).lower()
+
+def normalize_parent(parent: str):
+    """Canonical section header: collapsed spaces and full interface names ("int gi0/1")"""
+    words = parent.split()
+    if not words:
+        return ""
+
+    if "interface".startswith(words[0].lower()) and len(words) > 1:
+        name = words[1]
+        match = re.match(r"^([a-zA-Z-]+)(.*)$", name)
+
+        if match:
+            prefix, rest = match.group(1).lower(), match.group(2)
+            for short, full in INTERFACE_PREFIXES:
+                if full.lower().startswith(prefix) and prefix.startswith(short):
+                    name = full + rest
+                    break
+
+        words = ["interface", name, *words[2:]]
+
+    return " ".join(words).lower()
+
+def _top_level(index: ConfigIndex):
+    """Every line that sits directly in global config mode"""
+    lines = []
+
+    for s in index.sections:
+        if s.kind == "banners":
+            continue
+        if s.kind == "global" or s.render() == "\n".join(s.lines):
+            lines.extend(s.lines)
+        else:
+            lines.append(s.header)
+
+    return {_normalize_command(l) for l in lines}
+
+def _section_commands(index: ConfigIndex, parent: str):
+    """Normalized commands under `parent` (None = global), None if the section doesn't exist"""
+    if index is None:
+        return None
+
+    if parent is None:
+        return _top_level(index)
+
+    key = normalize_parent(parent)
+    for s in index.sections:
+        if normalize_parent(s.header) == key:
+            return {_normalize_command(c) for c in s.commands}
+
+    return None
+
+def _is_applied(command: str, present: set):
+    if command in present:
+        return True
+
+    # "no X" is in effect when nothing starting with X is configured
+    if command.startswith("no "):
+        target = command[3:]
+        return not any(c == target or c.startswith(target + " ") for c in present)
+
+    return False
+
+# Words that name the setting a command changes, by its leading words (one
+# word if none match). None: each line is a setting of its own, like static
+# routes or helper addresses that sit side by side.
+SETTING_WORDS = {
+    "ip": 2, "ipv6": 2, "username": 2,
+    "interface": None, "router": None, "access-list": None,
+    # 'ip ospf cost' doesn't replace 'ip ospf network'
+    "ip ospf": 3, "ipv6 ospf": 3, "ip nat": 3, "ip pim": 3, "ip igmp": 3, "ip rip": 3,
+    "ip dhcp": 3, "ip vrf": 3, "ip flow": 3, "ip verify": 3, "ip domain": 3, "ip ssh": 3, "ip http": 3,
+    "ip route": None, "ipv6 route": None, "ip host": None, "ip name-server": None,
+    "ip helper-address": None, "ip summary-address": None, "ipv6 address": None,
+    "ip access-list": None, "ipv6 access-list": None, "ip prefix-list": None, "ipv6 prefix-list": None,
+}
+
+def _setting_key(command: str):
+    """
+    Words that identify what a command sets, e.g. ('ip', 'ospf', 'cost') or
+    ('description',); a command replaces the lines with the same key.
+    'no ip address' sets the same thing as 'ip address'.
+    """
+    words = command.split()
+    if words[:1] == ["no"]:
+        words = words[1:]
+
+    # Secondary addresses sit next to the primary one, and there's one
+    # access-group per direction
+    if words[-1:] == ["secondary"]:
+        return tuple(words)
+    if words[1:2] == ["access-group"]:
+        return tuple(words[:2]) + tuple(words[-1:])
+
+    for prefix in (" ".join(words[:2]), " ".join(words[:1])):
+        if prefix in SETTING_WORDS:
+            count = SETTING_WORDS[prefix]
+            return tuple(words) if count is None else tuple(words[:count])
+
+    return tuple(words[:1])
+
+def _replaces(command: str, line: str):
+    """Whether pushing `command` accounts for `line` disappearing"""
+    if command.startswith("no "):
+        target = command[3:]
+        if line == target or line.startswith(target + " "):
+            return True
+
+    return _setting_key(command) == _setting_key(line)
+
+def _section_keys(index: ConfigIndex):
+    keys = {}
+
+    for s in index.sections:
+        if s.kind == "global" or s.render() == "\n".join(s.lines):
+            continue
+        keys[normalize_parent(s.header)] = s
+
+    return keys
+
+def verify_blocks(before: ConfigIndex, after: ConfigIndex, blocks: list):
+    """
+    Check pushed blocks ({"parent", "commands"}) against the configs before and
+    after the push. Per block: how many commands are in effect, which are
+    missing, and which lines changed in that section without being asked for
+    (added as `unexpected`, gone as `removed`). `other_changes` lists sections
+    that changed although no block targeted them.
+    """
+    results = []
+    targeted = {normalize_parent(b["parent"]) if b.get("parent") else None for b in blocks}
+
+    for block in blocks:
+        parent = block.get("parent") or None
+        commands = [_normalize_command(c) for c in block.get("commands", []) if c.strip()]
+
+        present = _section_commands(after, parent)
+        previous = _section_commands(before, parent) or set()
+
+        if present is None:
+            results.append({"parent": parent or "global", "applied": 0, "missing": commands, "unexpected": [], "removed": []})
+            continue
+
+        missing = [c for c in commands if not _is_applied(c, present)]
+
+        results.append({
+            "parent": parent or "global",
+            "applied": len(commands) - len(missing),
+            "missing": missing,
+            # New section headers in global mode come from the blocks that target them
+            "unexpected": sorted(present - previous - set(commands) - targeted) if before is not None else [],
+            "removed": sorted(c for c in previous - present if not any(_replaces(p, c) for p in commands)),
+        })
+
+    other_changes = []
+    if before is not None:
+        old_sections, new_sections = _section_keys(before), _section_keys(after)
+
+        for key in sorted(old_sections.keys() | new_sections.keys()):
+            if key in targeted:
+                continue
+
+            old, new = old_sections.get(key), new_sections.get(key)
+            if old is None or new is None or old.commands != new.commands:
+                other_changes.append((new or old).header)
+
+        if None not in targeted and _top_level(before) != _top_level(after):
+            other_changes.append("global")
+
+    return {"blocks": results, "other_changes": other_changes}
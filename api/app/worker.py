@@ -0,0 +1,100 @@
+"""
+Job worker pool. Runs inside the API process (JOB_WORKERS threads) or on its
+own with `python worker.py [count]` so refreshes can scale separately from web.
+"""
+import socket
+import sys
+import threading
+import time
+import uuid
+
+from config import JOB_WORKERS, JOB_POLL_INTERVAL, JOB_LEASE_TIMEOUT, JOB_SHUTDOWN_TIMEOUT
+from services import ansible, jobs
+
+HANDLERS = {
+    "config_refresh": ansible.run_fetch_config,
+}
+
+def _heartbeat(job_id: str, done: threading.Event):
+    while not done.wait(JOB_LEASE_TIMEOUT / 3):
+        try:
+            jobs.update_job(job_id)
+        except Exception as e:
+            print(f"Job heartbeat failed for {job_id}: {e}")
+
+def run_job(job: dict):
+    handler = HANDLERS.get(job["kind"])
+    if handler is None:
+        jobs.update_job(job["id"], status="failed", message=f"Unknown job kind: {job['kind']}")
+        return
+
+    done = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job["id"], done), daemon=True).start()
+
+    try:
+        message = handler(str(job["topology_id"]), str(job["id"]))
+        jobs.complete_job(job["id"], message)
+    except Exception as e:
+        print(f"Job {job['id']} ({job['kind']}) failed: {e}")
+        jobs.fail_job(job, str(e))
+    finally:
+        done.set()
+
+def work(worker_id: str, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            job = jobs.claim_job(worker_id)
+        except Exception as e:
+            print(f"Worker {worker_id} could not claim a job: {e}")
+            job = None
+
+        if job is None:
+            stop.wait(JOB_POLL_INTERVAL)
+            continue
+
+        run_job(job)
+
+def start_workers(count: int = JOB_WORKERS):
+    stop = threading.Event()
+    prefix = f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+
+    # Threads are named after the worker id they claim jobs as
+    threads = [
+        threading.Thread(target=work, args=(f"{prefix}-{i}", stop), name=f"{prefix}-{i}", daemon=True)
+        for i in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+
+    return threads, stop
+
+def stop_workers(threads: list, stop: threading.Event, timeout: float = JOB_SHUTDOWN_TIMEOUT):
+    """
+    Stop claiming, give running jobs up to `timeout` seconds to finish, then
+    requeue whatever the workers still hold so another process picks it up
+    now instead of after JOB_LEASE_TIMEOUT.
+    """
+    stop.set()
+    deadline = time.monotonic() + timeout
+
+    for thread in threads:
+        thread.join(max(deadline - time.monotonic(), 0))
+
+    try:
+        requeued = jobs.requeue_jobs([t.name for t in threads])
+    except Exception as e:
+        print(f"Could not requeue running jobs: {e}")
+        return
+
+    if requeued:
+        print(f"Requeued {requeued} running job(s) on shutdown")
+
+if __name__ == "__main__":
+    threads, stop = start_workers(int(sys.argv[1]) if len(sys.argv) > 1 else JOB_WORKERS)
+
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(1)
+    except KeyboardInterrupt:
+        stop_workers(threads, stop)
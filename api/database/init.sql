@@ -1,7 +1,9 @@
 CREATE EXTENSION IF NOT EXISTS "pgcrypto";
 
-DROP TABLE IF EXISTS config_snapshots;
-DROP TABLE IF EXISTS devices;
+DROP TABLE IF EXISTS knowledge_cache;
+DROP TABLE IF EXISTS jobs;
+DROP TABLE IF EXISTS config_snapshots CASCADE;
+DROP TABLE IF EXISTS devices CASCADE;
 DROP TABLE IF EXISTS chat_messages;
 DROP TABLE IF EXISTS chat_sessions;
 DROP TABLE IF EXISTS topologies;
@@ -28,6 +30,9 @@ CREATE TABLE IF NOT EXISTS devices (
     ip_address VARCHAR(50),
     port INTEGER,
 
+    -- Points at the newest config_snapshots row, maintained by insert_config_snapshot
+    latest_snapshot_id UUID,
+
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -37,11 +42,28 @@ CREATE TABLE IF NOT EXISTS config_snapshots (
         ON DELETE CASCADE
         ON UPDATE CASCADE,
     
-    content TEXT NOT NULL,
+    -- Full text for the latest snapshot and keyframes, NULL when stored as a delta
+    content TEXT,
+    -- zlib-compressed line ops that rebuild this snapshot from the next newer one
+    delta BYTEA,
+    -- Per-device sequence number, keyframe when seq % SNAPSHOT_KEYFRAME_INTERVAL = 0
+    seq INTEGER NOT NULL DEFAULT 0,
+    -- sha256 of the config without volatile header lines
+    content_hash CHAR(64) NOT NULL,
 
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    -- An unchanged config bumps these instead of inserting a new row
+    last_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    observations INTEGER DEFAULT 1,
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    CHECK (content IS NOT NULL OR delta IS NOT NULL)
 );
 
+ALTER TABLE devices ADD CONSTRAINT fk_devices_latest_snapshot
+FOREIGN KEY (latest_snapshot_id) REFERENCES config_snapshots(id)
+    ON DELETE SET NULL;
+
 CREATE TABLE IF NOT EXISTS chat_sessions (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     topology_id UUID REFERENCES topologies(project_id) 
@@ -68,6 +90,46 @@ CREATE TABLE IF NOT EXISTS chat_messages (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE TABLE IF NOT EXISTS jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    kind VARCHAR(50) NOT NULL,
+    topology_id UUID REFERENCES topologies(project_id) 
+        ON DELETE CASCADE
+        ON UPDATE CASCADE,
+    payload JSONB DEFAULT '{}',
+
+    -- queued | running | completed | failed
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    progress INTEGER DEFAULT 0,
+    total_devices INTEGER DEFAULT 0,
+    completed_devices INTEGER DEFAULT 0,
+    failed_devices JSONB DEFAULT '[]',
+    message TEXT,
+
+    attempts INTEGER DEFAULT 0,
+    max_attempts INTEGER DEFAULT 3,
+    run_after TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    locked_by VARCHAR(255),
+    heartbeat_at TIMESTAMP,
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS knowledge_cache (
+    model VARCHAR(50) NOT NULL,
+    mode VARCHAR(20) NOT NULL,
+    -- sha256 of the normalized query
+    query_hash CHAR(64) NOT NULL,
+    query TEXT NOT NULL,
+    response TEXT NOT NULL,
+    hits INTEGER DEFAULT 0,
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (model, mode, query_hash)
+);
+
 CREATE INDEX IF NOT EXISTS idx_devices_topology_id 
 ON devices(topology_id);
 
@@ -78,4 +140,10 @@ CREATE INDEX IF NOT EXISTS idx_chat_sessions_topology_id
 ON chat_sessions(topology_id);
 
 CREATE INDEX IF NOT EXISTS idx_chat_messages_session_created 
-ON chat_messages(session_id, created_at ASC);
\ No newline at end of file
+ON chat_messages(session_id, created_at ASC);
+
+CREATE INDEX IF NOT EXISTS idx_chat_messages_created 
+ON chat_messages(created_at);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after 
+ON jobs(status, run_after);
\ No newline at end of file
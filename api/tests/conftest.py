@@ -0,0 +1,6 @@
+import pytest
+
+@pytest.fixture
+def anyio_backend():
+    # The services schedule their background work with asyncio directly
+    return "asyncio"
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import anyio
+
+REASONS = {200: "OK", 404: "Not Found", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+class FakeServer:
+    """
+    Minimal HTTP/1.1 server on localhost. Handlers get the request body and
+    return (status, body); a dict/list body is sent as JSON, an async iterator
+    is streamed line by line until it ends and the connection is closed.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.url = None
+        self._server = None
+        self._writers = set()
+
+    def route(self, method: str, path: str, handler):
+        self.routes[(method, path)] = handler
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.url = f"http://127.0.0.1:{self._server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+
+        # Streaming handlers may still hold connections open
+        for writer in list(self._writers):
+            writer.close()
+
+        await self._server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers.add(writer)
+
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    return
+
+                method, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()).strip():
+                    name, value = line.decode().split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests.append((method, path, body))
+
+                handler = self.routes.get((method, path.split("?")[0]))
+                status, payload = await handler(body) if handler else (404, {"detail": "Not Found"})
+
+                head = f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}\r\nContent-Type: application/json\r\n"
+
+                if hasattr(payload, "__aiter__"):
+                    writer.write(f"{head}Connection: close\r\n\r\n".encode())
+                    async for chunk in payload:
+                        writer.write(chunk.encode())
+                        await writer.drain()
+                    return
+
+                data = json.dumps(payload).encode()
+                writer.write(f"{head}Content-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+async def wait_for(predicate, timeout: float = 5):
+    with anyio.fail_after(timeout):
+        while not predicate():
+            await anyio.sleep(0.01)
@@ -0,0 +1,117 @@
+import os
+
+from types import SimpleNamespace
+
+import pytest
+import yaml
+
+from config import ANSIBLE_DIR, PUSH_CONFIG_BATCH_PLAYBOOK
+from services import ansible, config_cache
+
+TOPOLOGY_ID = "project-1"
+
+@pytest.fixture
+def inventories(monkeypatch):
+    """Device inventories handed out by get_device_inventory, R9 doesn't exist"""
+    def get_device_inventory(topology_id, device_name):
+        if device_name == "R9":
+            raise ValueError(f"Device {device_name} not found in topology lab.")
+
+        return {
+            "all": {
+                "hosts": {device_name: {"ansible_host": f"10.0.0.{device_name[1:]}"}},
+                "vars": {"ansible_network_os": "cisco.ios.ios"},
+            }
+        }
+
+    monkeypatch.setattr(ansible, "get_device_inventory", get_device_inventory)
+
+class Runs(list):
+    """Calls to the stubbed ansible_runner.run, plus the outcome to replay per host"""
+
+    def __init__(self):
+        super().__init__()
+        # Host -> list of per-item results (True for ok), or "unreachable"
+        self.outcomes = {}
+
+    def run(self, private_data_dir, playbook, inventory, forks, event_handler):
+        """Replays the events the batch playbook would send for the host vars it gets"""
+        self.append({"playbook": playbook, "inventory": inventory})
+        failed = False
+
+        for host, host_vars in inventory["all"]["hosts"].items():
+            outcome = self.outcomes.get(host, [])
+
+            if outcome == "unreachable":
+                failed = True
+                event_handler({"event": "runner_on_unreachable", "event_data": {"host": host, "res": {"msg": "timed out"}}})
+                continue
+
+            for item, ok in zip(host_vars.get("config_blocks", []), outcome):
+                failed = failed or not ok
+                res = {"item": item} if ok else {"item": item, "msg": f"{host} rejected it"}
+                event_handler({
+                    "event": "runner_item_on_ok" if ok else "runner_item_on_failed",
+                    "event_data": {"host": host, "res": res},
+                })
+
+        return SimpleNamespace(status="failed" if failed else "successful")
+
+@pytest.fixture
+def runs(monkeypatch, inventories):
+    runs = Runs()
+    monkeypatch.setattr(ansible.ansible_runner, "run", runs.run)
+    return runs
+
+def test_results_map_back_to_their_blocks(runs):
+    runs.outcomes.update({"R1": [True, False], "R2": "unreachable", "R3": [True]})
+
+    results = ansible.run_push_configs(TOPOLOGY_ID, [
+        {"device_name": "R1", "parent": "interface Gi0/0", "commands": ["ip address 10.0.0.1 255.255.255.0"]},
+        {"device_name": "R2", "parent": None, "commands": ["hostname R2"]},
+        {"device_name": "R1", "parent": "null", "commands": ["ip route 0.0.0.0 0.0.0.0 10.0.0.254"]},
+        {"device_name": "R3", "commands": []},
+        {"device_name": "R9", "commands": ["hostname R9"]},
+        {"device_name": "R3", "parent": "router ospf 1", "commands": ["network 10.0.0.0 0.0.0.255 area 0"]},
+    ])
+
+    assert [(r["device"], r["status"], r["error"]) for r in results] == [
+        ("R1", "success", None),
+        ("R2", "failed", "timed out"),
+        ("R1", "failed", "R1 rejected it"),
+        ("R3", "failed", "No commands provided to push."),
+        ("R9", "failed", "Device R9 not found in topology lab."),
+        ("R3", "success", None),
+    ]
+    assert results[2]["parent"] is None
+
+    # One play for every device, each host carrying its own blocks in order
+    [run] = runs
+    hosts = run["inventory"]["all"]["hosts"]
+    assert run["playbook"] == PUSH_CONFIG_BATCH_PLAYBOOK
+    assert list(hosts) == ["R1", "R2", "R3"]
+    assert [b["id"] for b in hosts["R1"]["config_blocks"]] == [0, 2]
+    assert hosts["R1"]["config_blocks"][0] == {"id": 0, "name": "interface Gi0/0", "commands": ["ip address 10.0.0.1 255.255.255.0"]}
+    assert "name" not in hosts["R1"]["config_blocks"][1]
+
+def test_missing_events_fail_the_block(runs):
+    results = ansible.run_push_configs(TOPOLOGY_ID, [{"device_name": "R1", "commands": ["hostname R1"]}])
+
+    assert results[0]["status"] == "failed"
+    assert results[0]["error"] == "No result from Ansible (status: successful)"
+
+def test_push_invalidates_cached_configs(runs):
+    config_cache.put_config(TOPOLOGY_ID, "R1", "hostname R1")
+    runs.outcomes["R1"] = [True]
+
+    ansible.run_push_configs(TOPOLOGY_ID, [{"device_name": "R1", "commands": ["hostname R1-core"]}])
+
+    assert config_cache.config_cache.get((TOPOLOGY_ID, "R1")) is None
+
+def test_playbook_reads_blocks_from_host_vars():
+    with open(os.path.join(ANSIBLE_DIR, "project", PUSH_CONFIG_BATCH_PLAYBOOK)) as f:
+        [play] = yaml.safe_load(f)
+
+    # Play vars take precedence over inventory host vars and would hide them
+    assert "config_blocks" not in play.get("vars", {})
+    assert "config_blocks" in play["tasks"][0]["loop"]
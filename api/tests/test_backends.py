@@ -0,0 +1,222 @@
+import asyncio
+import json
+
+from contextlib import suppress
+
+import httpx
+import pytest
+
+from openai import AsyncOpenAI
+
+from helpers import FakeServer, wait_for
+from services import backends, context, llm
+from utils.cache import TTLCache
+
+pytestmark = pytest.mark.anyio
+
+class FakeLlamaServer:
+    """llama-server replica answering /health and streamed /v1/chat/completions"""
+
+    def __init__(self, server: FakeServer, name: str):
+        self.server = server
+        self.name = name
+        self.status = 200
+        self.health_status = 200
+        self.completions = 0
+        self.props_status = 200
+        self.n_ctx = 8192
+        # Set to hold completions open until released
+        self.gate = None
+
+        server.route("GET", "/health", self._health)
+        server.route("GET", "/props", self._props)
+        server.route("POST", "/v1/chat/completions", self._completions)
+
+    @property
+    def url(self):
+        return f"{self.server.url}/v1"
+
+    async def _health(self, body):
+        return self.health_status, {"status": "ok" if self.health_status == 200 else "error"}
+
+    async def _props(self, body):
+        return self.props_status, {"default_generation_settings": {"n_ctx": self.n_ctx}, "total_slots": 4}
+
+    async def _completions(self, body):
+        self.completions += 1
+
+        if self.gate is not None:
+            await self.gate.wait()
+
+        if self.status != 200:
+            return self.status, {"error": {"message": f"{self.name} is down"}}
+
+        return 200, self._chunks(json.loads(body)["model"])
+
+    async def _chunks(self, model: str):
+        for content, finish_reason in ((self.name, None), ("", "stop")):
+            chunk = {
+                "id": "chatcmpl-1",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": finish_reason}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+
+        yield "data: [DONE]\n\n"
+
+@pytest.fixture
+async def replicas():
+    async with FakeServer() as a, FakeServer() as b:
+        yield FakeLlamaServer(a, "a"), FakeLlamaServer(b, "b")
+
+@pytest.fixture
+def pool(replicas):
+    return backends.BackendPool("llm:test", [r.url for r in replicas])
+
+async def chat(pool: backends.BackendPool, session_id: str = None):
+    """Stream one completion through the pool the way the agent loop does"""
+    async def create(backend):
+        client = AsyncOpenAI(api_key="secret", base_url=backend.url, max_retries=0, http_client=http_client)
+        return await client.chat.completions.create(
+            model="test",
+            messages=[{"role": "user", "content": "hello"}],
+            stream=True,
+        )
+
+    async with httpx.AsyncClient() as http_client, pool.stream(create, session_id) as (backend, response):
+        return "".join([chunk.choices[0].delta.content or "" async for chunk in response])
+
+async def test_routes_to_least_outstanding(pool, replicas):
+    a, b = pool.backends
+    replicas[0].gate = asyncio.Event()
+
+    held = asyncio.create_task(chat(pool))
+    await wait_for(lambda: a.outstanding == 1)
+
+    # a is busy with the held request, so the next ones go to b
+    assert await chat(pool) == "b"
+    assert await chat(pool) == "b"
+
+    replicas[0].gate.set()
+    assert await held == "a"
+    assert a.outstanding == b.outstanding == 0
+
+async def test_session_sticks_to_its_replica(pool, replicas):
+    a, b = pool.backends
+
+    assert await chat(pool, "s1") == "a"
+
+    async with pool.request() as busy:
+        assert busy is a
+
+        # s1 stays on a although it is busier than b, new sessions go to b
+        assert await chat(pool, "s1") == "a"
+        assert await chat(pool, "s2") == "b"
+        assert await chat(pool, "s2") == "b"
+
+async def test_fails_over_before_streaming_and_ejects(pool, replicas, monkeypatch):
+    monkeypatch.setattr(backends, "BACKEND_MAX_FAILURES", 2)
+    a, b = pool.backends
+    replicas[0].status = 503
+
+    assert await chat(pool, "s1") == "b"
+    assert a.healthy and a.failures == 1
+
+    # The session moved to b with the failover and stays there
+    assert await chat(pool, "s1") == "b"
+    assert replicas[0].completions == 1
+
+    assert await chat(pool, "s2") == "b"
+    assert not a.healthy
+    assert a.stats["ejections"] == 1
+
+    # Ejected replicas get no traffic while a healthy one is left
+    assert await chat(pool, "s3") == "b"
+    assert replicas[0].completions == 2
+
+async def test_client_errors_are_not_retried(pool, replicas):
+    a, b = pool.backends
+    replicas[0].status = 400
+
+    with pytest.raises(Exception):
+        await chat(pool)
+
+    assert replicas[1].completions == 0
+    assert a.healthy and a.failures == 0
+
+async def test_every_replica_down(pool, replicas):
+    for replica in replicas:
+        replica.status = 500
+
+    with pytest.raises(Exception):
+        await chat(pool)
+
+    assert [r.completions for r in replicas] == [1, 1]
+
+async def test_health_worker_ejects_and_readmits(pool, replicas, monkeypatch):
+    monkeypatch.setattr(backends, "BACKEND_HEALTH_INTERVAL", 0.02)
+    monkeypatch.setattr(backends, "llm_pools", {"test": pool})
+    monkeypatch.setattr(backends, "lightrag_pools", {})
+    a, b = pool.backends
+
+    a.props = {"n_ctx": 4096, "total_slots": 1}
+    replicas[0].health_status = 503
+
+    worker = asyncio.create_task(backends.health_worker())
+    try:
+        await wait_for(lambda: not a.healthy)
+        assert b.healthy
+        assert await chat(pool) == "b"
+
+        replicas[0].health_status = 200
+        await wait_for(lambda: a.healthy)
+    finally:
+        worker.cancel()
+        with suppress(asyncio.CancelledError):
+            await worker
+
+    assert a.stats["readmissions"] == 1
+    assert a.failures == 0
+    assert a.props is None
+    assert backends.get_stats()["runs"] > 0
+
+async def test_call_fails_over(pool, replicas):
+    replicas[0].status = 500
+
+    async def get(backend):
+        async with httpx.AsyncClient() as client:
+            response = await client.post(f"{backend.url}/chat/completions", json={"model": "test"})
+            response.raise_for_status()
+            return backend.url
+
+    assert await pool.call(get) == replicas[1].url
+
+async def test_props_are_asked_again_after_readmission(pool, replicas, monkeypatch):
+    monkeypatch.setattr(backends, "BACKEND_MAX_FAILURES", 1)
+    monkeypatch.setattr(context, "_props_failures", TTLCache(60, max_size=10))
+    a, b = pool.backends
+
+    async with httpx.AsyncClient() as http_client:
+        monkeypatch.setattr(llm, "get_http_client", lambda name: http_client)
+
+        replicas[0].props_status = 500
+        assert await llm._backend_props(a) == context.DEFAULT_SERVER_PROPS
+
+        # The failure is remembered, a isn't asked again right away
+        replicas[0].props_status = 200
+        assert await llm._backend_props(a) == context.DEFAULT_SERVER_PROPS
+
+        context._props_failures.clear()
+        assert await llm._backend_props(a) == {"n_ctx": 8192, "total_slots": 4}
+
+        # A replica may come back with another model or context size
+        replicas[0].n_ctx = 16384
+        replicas[0].status = 500
+        assert await chat(pool) == "b"
+        assert not a.healthy
+
+        await pool.check(http_client)
+        assert a.healthy
+        assert await llm._backend_props(a) == {"n_ctx": 16384, "total_slots": 4}
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import compaction
+
+NOW = datetime(2026, 10, 17, 12, 0)
+
+def snapshots(*ages: timedelta):
+    """Rows created `ages` ago, newest first like the compaction query"""
+    return [{"id": str(i), "created_at": NOW - age} for i, age in enumerate(sorted(ages))]
+
+def test_parse_retention():
+    assert compaction.parse_retention("7d:all, 30d:1h, *:1d") == [(604800, 0), (2592000, 3600), (None, 86400)]
+    assert compaction.parse_retention("*:all") == [(None, 0)]
+
+@pytest.mark.parametrize("spec", ["7d:all", "7d:all,30d:1h", ""])
+def test_retention_needs_a_last_tier(spec):
+    with pytest.raises(ValueError):
+        compaction.parse_retention(spec)
+
+def test_expired_keeps_the_newest_per_bucket(monkeypatch):
+    monkeypatch.setattr(compaction, "RETENTION_TIERS", compaction.parse_retention("1d:all,7d:1h,*:1d"))
+
+    rows = snapshots(
+        # Within a day, all kept
+        timedelta(minutes=5), timedelta(minutes=6), timedelta(hours=20),
+        # 11:00-12:00 three days ago, only the newest kept
+        timedelta(days=3, minutes=10), timedelta(days=3, minutes=20), timedelta(days=3, minutes=50),
+        # Another hour of that day
+        timedelta(days=3, hours=2),
+        # Two in the same day, a month ago
+        timedelta(days=30, hours=1), timedelta(days=30, hours=3),
+        timedelta(days=31, hours=1),
+    )
+
+    expired = compaction._expired(rows, NOW)
+
+    assert [r["created_at"] for r in expired] == [
+        NOW - timedelta(days=3, minutes=20),
+        NOW - timedelta(days=3, minutes=50),
+        NOW - timedelta(days=30, hours=3),
+    ]
+
+def test_buckets_are_per_tier(monkeypatch):
+    monkeypatch.setattr(compaction, "RETENTION_TIERS", compaction.parse_retention("1h:1m,*:1d"))
+
+    # Same calendar day but different tiers: each tier keeps its own newest
+    rows = snapshots(timedelta(minutes=30, seconds=10), timedelta(minutes=30, seconds=20), timedelta(hours=2), timedelta(hours=3))
+
+    assert [r["id"] for r in compaction._expired(rows, NOW)] == ["1", "3"]
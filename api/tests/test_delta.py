@@ -0,0 +1,36 @@
+import pytest
+
+from utils.delta import encode_delta, apply_delta
+
+BASE = """hostname R1
+interface GigabitEthernet0/0
+ ip address 10.0.0.1 255.255.255.0
+ shutdown
+router ospf 1
+ network 10.0.0.0 0.0.0.255 area 0
+end"""
+
+@pytest.mark.parametrize("target", [
+    BASE,
+    BASE.replace("10.0.0.1", "10.0.0.2"),
+    BASE.replace(" shutdown\n", ""),
+    BASE.replace("router ospf 1", "router ospf 1\n router-id 1.1.1.1"),
+    "hostname R1-core\n" + BASE,
+    "",
+    "completely\ndifferent\n",
+])
+def test_round_trip(target):
+    assert apply_delta(BASE, encode_delta(BASE, target)) == target
+
+def test_from_empty_base():
+    assert apply_delta("", encode_delta("", BASE)) == BASE
+
+def test_delta_from_the_database():
+    # psycopg returns bytea as memoryview
+    assert apply_delta(BASE, memoryview(encode_delta(BASE, BASE + "\n!"))) == BASE + "\n!"
+
+def test_small_change_gives_a_small_delta():
+    config = "\n".join(f"interface Loopback{i}\n ip address 10.0.{i}.1 255.255.255.255" for i in range(200))
+    changed = config.replace("10.0.150.1", "10.0.150.2")
+
+    assert len(encode_delta(config, changed)) < 100
@@ -0,0 +1,154 @@
+import asyncio
+import json
+
+import pytest
+
+from helpers import FakeServer, wait_for
+from services import devices, gns3, inventory
+
+pytestmark = pytest.mark.anyio
+
+TOPOLOGY_ID = "project-1"
+
+def node(node_id: str, name: str, console: int = 5000):
+    return {"node_id": node_id, "name": name, "node_type": "dynamips", "console": console}
+
+class FakeGNS3:
+    """GNS3 project with a node list and a notification feed fed from a queue"""
+
+    def __init__(self, server: FakeServer, nodes: list):
+        self.nodes = nodes
+        self.nodes_status = 200
+        self.feed = asyncio.Queue()
+        self.connections = 0
+
+        server.route("GET", f"/projects/{TOPOLOGY_ID}/nodes", self._nodes)
+        server.route("GET", f"/projects/{TOPOLOGY_ID}/notifications", self._notifications)
+
+    def send(self, action: str, event: dict):
+        self.feed.put_nowait(json.dumps({"action": action, "event": event}) + "\n")
+
+    async def _nodes(self, body):
+        return self.nodes_status, self.nodes
+
+    async def _notifications(self, body):
+        self.connections += 1
+        return 200, self._lines()
+
+    async def _lines(self):
+        while True:
+            line = await self.feed.get()
+            if line is None:
+                return
+            yield line
+
+@pytest.fixture
+def db_calls(monkeypatch):
+    calls = []
+
+    async def sync_devices(topology_id, nodes):
+        calls.append(("sync", [n["node_id"] for n in nodes]))
+
+    async def list_devices_async(topology_id):
+        return [{"device_id": "n1", "ip_address": "10.0.0.1"}]
+
+    async def create_new_device(topology_id, device_id, name, device_type=None, port=None):
+        calls.append(("upsert", device_id, name))
+
+    async def delete_device(topology_id, device_id):
+        calls.append(("delete", device_id))
+
+    monkeypatch.setattr(devices, "sync_devices", sync_devices)
+    monkeypatch.setattr(devices, "list_devices_async", list_devices_async)
+    monkeypatch.setattr(devices, "create_new_device", create_new_device)
+    monkeypatch.setattr(devices, "delete_device", delete_device)
+
+    return calls
+
+@pytest.fixture
+async def gns3_server(monkeypatch, db_calls):
+    async with FakeServer() as server:
+        monkeypatch.setattr(gns3, "GNS_URL", server.url)
+        monkeypatch.setattr(inventory, "GNS_URL", server.url)
+        monkeypatch.setattr(inventory, "GNS3_NOTIFICATIONS_ENABLED", True)
+        monkeypatch.setattr(inventory, "GNS3_NOTIFICATIONS_RETRY", 0.05)
+        monkeypatch.setattr(inventory, "inventory_stats", {k: None if k == "last_error" else 0 for k in inventory.inventory_stats})
+        gns3.gns3_cache.clear()
+
+        fake = FakeGNS3(server, [node("n1", "R1")])
+        try:
+            yield fake
+        finally:
+            await inventory.close()
+            await gns3.close()
+            inventory.inventories.clear()
+            inventory.ip_addresses.clear()
+
+async def test_follows_node_changes(gns3_server, db_calls):
+    inventory.subscribe(TOPOLOGY_ID)
+    await wait_for(lambda: inventory.is_live(TOPOLOGY_ID))
+
+    assert db_calls == [("sync", ["n1"])]
+    assert inventory.list_devices(TOPOLOGY_ID) == [{
+        "device_id": "n1",
+        "topology_id": TOPOLOGY_ID,
+        "name": "R1",
+        "device_type": "Router",
+        "port": 5000,
+        "ip_address": "10.0.0.1",
+    }]
+
+    gns3_server.send("node.created", node("n2", "R2", 5001))
+    await wait_for(lambda: "n2" in inventory.inventories[TOPOLOGY_ID])
+
+    gns3_server.send("node.updated", node("n2", "R2-core", 5001))
+    await wait_for(lambda: inventory.inventories[TOPOLOGY_ID]["n2"]["name"] == "R2-core")
+
+    # Unchanged nodes and non router/switch nodes don't touch the database
+    gns3_server.send("node.updated", node("n2", "R2-core", 5001))
+    gns3_server.send("node.created", {"node_id": "pc", "name": "PC1", "node_type": "vpcs"})
+    gns3_server.send("node.deleted", {"node_id": "n1"})
+    await wait_for(lambda: "n1" not in inventory.inventories[TOPOLOGY_ID])
+
+    assert db_calls[1:] == [("upsert", "n2", "R2"), ("upsert", "n2", "R2-core"), ("delete", "n1")]
+    assert [d["device_id"] for d in inventory.list_devices(TOPOLOGY_ID)] == ["n2"]
+    assert inventory.inventory_stats["nodes_created"] == 1
+    assert inventory.inventory_stats["nodes_updated"] == 1
+    assert inventory.inventory_stats["nodes_deleted"] == 1
+
+async def test_project_closed_reconnects(gns3_server):
+    inventory.subscribe(TOPOLOGY_ID)
+    await wait_for(lambda: inventory.is_live(TOPOLOGY_ID))
+
+    gns3_server.nodes = [node("n1", "R1"), node("n3", "R3")]
+    gns3_server.send("project.closed", {})
+
+    await wait_for(lambda: gns3_server.connections == 2 and inventory.is_live(TOPOLOGY_ID))
+
+    assert "was closed" in inventory.inventory_stats["last_error"]
+    assert inventory.inventory_stats["reconnects"] == 1
+    assert set(inventory.inventories[TOPOLOGY_ID]) == {"n1", "n3"}
+
+@pytest.mark.parametrize("status, nodes", [(500, []), (200, [])])
+async def test_failed_or_empty_load_is_not_live(gns3_server, db_calls, status, nodes):
+    gns3_server.nodes_status = status
+    gns3_server.nodes = nodes
+
+    inventory.subscribe(TOPOLOGY_ID)
+    await wait_for(lambda: inventory.inventory_stats["reconnects"] >= 2)
+
+    assert not inventory.is_live(TOPOLOGY_ID)
+    assert TOPOLOGY_ID not in inventory.inventories
+    assert inventory.list_devices(TOPOLOGY_ID) is None
+    assert db_calls == []
+
+async def test_close_stops_subscriptions(gns3_server):
+    inventory.subscribe(TOPOLOGY_ID)
+    await wait_for(lambda: inventory.is_live(TOPOLOGY_ID))
+
+    task = inventory._subscriptions[TOPOLOGY_ID]
+    await inventory.close()
+
+    assert task.done()
+    assert inventory.get_stats()["subscriptions"] == 0
+    assert not inventory.is_live(TOPOLOGY_ID)
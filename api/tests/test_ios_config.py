@@ -0,0 +1,176 @@
+from utils.ios_config import parse_config, normalize_parent, verify_blocks
+
+CONFIG = """Building configuration...
+
+Current configuration : 1200 bytes
+!
+version 15.2
+hostname R1
+!
+interface GigabitEthernet0/0
+ description Uplink
+ ip address 10.0.0.1 255.255.255.0
+ duplex auto
+!
+interface GigabitEthernet0/1
+ no ip address
+ shutdown
+!
+router ospf 1
+ network 10.0.0.0 0.0.0.255 area 0
+!
+ip route 0.0.0.0 0.0.0.0 10.0.0.254
+ip route 192.168.0.0 255.255.0.0 10.0.0.253
+!
+ip access-list extended WEB
+ 10 permit tcp any any eq 80
+ 20 deny ip any any
+access-list 101 permit ip 192.168.1.0 0.0.0.255 any
+access-list 101 deny ip any any
+!
+banner motd ^C
+Authorized access only
+^C
+!
+line vty 0 4
+ login local
+!
+end
+"""
+
+def test_sections_by_kind():
+    index = parse_config(CONFIG)
+
+    assert [(s.kind, s.header) for s in index.sections] == [
+        ("global", "global"),
+        ("interfaces", "interface GigabitEthernet0/0"),
+        ("interfaces", "interface GigabitEthernet0/1"),
+        ("routing", "router ospf 1"),
+        ("routing", "ip route"),
+        ("acls", "ip access-list extended WEB"),
+        ("acls", "access-list 101"),
+        ("banners", "banner motd"),
+        ("lines", "line vty 0 4"),
+    ]
+    assert index.global_lines() == ["version 15.2", "hostname R1"]
+    assert index.by_header["ip route"].lines == ["ip route 0.0.0.0 0.0.0.0 10.0.0.254", "ip route 192.168.0.0 255.255.0.0 10.0.0.253"]
+    assert index.by_header["banner motd"].lines == ["banner motd ^C", "Authorized access only", "^C"]
+    assert index.by_header["interface GigabitEthernet0/0"].commands == ["description Uplink", "ip address 10.0.0.1 255.255.255.0", "duplex auto"]
+
+def test_same_text_is_parsed_once():
+    assert parse_config(CONFIG) is parse_config(CONFIG)
+
+def test_render_selects_kinds_and_headers():
+    index = parse_config(CONFIG)
+
+    assert index.render(["router ospf"]) == "router ospf 1\n network 10.0.0.0 0.0.0.255 area 0"
+    assert index.render(["acl"]) == "\n!\n".join([
+        "ip access-list extended WEB\n 10 permit tcp any any eq 80\n 20 deny ip any any",
+        "access-list 101 permit ip 192.168.1.0 0.0.0.255 any\naccess-list 101 deny ip any any",
+    ])
+    assert index.render(["interface GigabitEthernet0/1", "router bgp"]) == "\n!\n".join([
+        "interface GigabitEthernet0/1\n no ip address\n shutdown",
+        "! no section matching 'router bgp'",
+    ])
+
+def test_summary():
+    assert parse_config(CONFIG).summary().split("\n") == [
+        "hostname R1",
+        "interfaces:",
+        '  GigabitEthernet0/0: 10.0.0.1 255.255.255.0, up, "Uplink"',
+        "  GigabitEthernet0/1: no ip address, shutdown",
+        "routing:",
+        "  router ospf 1: 1 lines",
+        "  ip route: 2 lines",
+        "acls:",
+        "  ip access-list extended WEB: 2 entries",
+        "  access-list 101: 2 entries",
+        "lines: line vty 0 4",
+        "global: 2 lines",
+    ]
+
+def test_normalize_parent():
+    assert normalize_parent("int  gi0/1") == "interface gigabitethernet0/1"
+    assert normalize_parent("interface Fa0/0.10") == "interface fastethernet0/0.10"
+    assert normalize_parent("interface Lo0") == "interface loopback0"
+    assert normalize_parent("router ospf 1") == "router ospf 1"
+
+BEFORE = """hostname R1
+interface GigabitEthernet0/0
+ ip address 10.0.0.1 255.255.255.0
+ ip address 10.1.0.1 255.255.255.0 secondary
+ ip helper-address 10.9.9.1
+ ip helper-address 10.9.9.2
+ ip ospf network point-to-point
+ shutdown
+interface GigabitEthernet0/1
+ description LAN
+ip access-list extended WEB
+ 10 permit tcp any any eq 80
+router ospf 1
+ network 10.0.0.0 0.0.0.255 area 0
+ip route 0.0.0.0 0.0.0.0 10.0.0.254
+ip route 10.8.0.0 255.255.0.0 10.0.0.253
+"""
+
+def verify(after: str, blocks: list, before: str = BEFORE):
+    return verify_blocks(parse_config(before) if before else None, parse_config(after), blocks)
+
+def test_replaced_settings_are_not_reported():
+    after = BEFORE.replace("10.0.0.1 255.255.255.0\n", "10.0.0.2 255.255.255.0\n").replace(" shutdown\n", "")
+    after = after.replace(" ip helper-address 10.9.9.1\n", "")
+
+    result = verify(after, [{
+        "parent": "int gi0/0",
+        "commands": ["ip address 10.0.0.2 255.255.255.0", "no shutdown", "no ip helper-address 10.9.9.1"],
+    }])
+
+    assert result == {
+        "blocks": [{"parent": "int gi0/0", "applied": 3, "missing": [], "unexpected": [], "removed": []}],
+        "other_changes": [],
+    }
+
+def test_unrelated_removals_in_the_same_family_are_reported():
+    after = BEFORE.replace("10.0.0.1 255.255.255.0\n", "10.0.0.2 255.255.255.0\n")
+    after = after.replace(" ip address 10.1.0.1 255.255.255.0 secondary\n", "")
+    after = after.replace(" ip ospf network point-to-point\n", " ip ospf cost 10\n")
+    after = after.replace(" ip helper-address 10.9.9.2\n", " ip helper-address 10.9.9.3\n")
+
+    [block] = verify(after, [{
+        "parent": "interface GigabitEthernet0/0",
+        "commands": ["ip address 10.0.0.2 255.255.255.0", "ip ospf cost 10", "ip helper-address 10.9.9.3"],
+    }])["blocks"]
+
+    assert block["applied"] == 3
+    assert block["removed"] == [
+        "ip address 10.1.0.1 255.255.255.0 secondary",
+        "ip helper-address 10.9.9.2",
+        "ip ospf network point-to-point",
+    ]
+
+def test_missing_unexpected_and_other_changes():
+    after = BEFORE.replace(" description LAN\n", " description Users\n")
+    after = after.replace("ip route 10.8.0.0 255.255.0.0 10.0.0.253\n", "ip route 10.7.0.0 255.255.0.0 10.0.0.253\n")
+    after = after.replace(" 10 permit tcp any any eq 80\n", " 10 permit tcp any any eq 80\n 20 permit tcp any any eq 443\n 30 permit udp any any\n")
+
+    result = verify(after, [
+        {"parent": "ip access-list extended WEB", "commands": ["permit tcp any any eq 443", "deny ip any any"]},
+        {"parent": None, "commands": ["ip route 10.7.0.0 255.255.0.0 10.0.0.253"]},
+    ])
+
+    assert result["blocks"] == [
+        {"parent": "ip access-list extended WEB", "applied": 1, "missing": ["deny ip any any"], "unexpected": ["permit udp any any"], "removed": []},
+        # Another static route going away isn't explained by adding one
+        {"parent": "global", "applied": 1, "missing": [], "unexpected": [], "removed": ["ip route 10.8.0.0 255.255.0.0 10.0.0.253"]},
+    ]
+    assert result["other_changes"] == ["interface GigabitEthernet0/1"]
+
+def test_missing_section_and_no_previous_config():
+    result = verify(BEFORE, [{"parent": "interface Loopback0", "commands": ["ip address 1.1.1.1 255.255.255.255"]}])
+    assert result["blocks"] == [{
+        "parent": "interface Loopback0", "applied": 0, "missing": ["ip address 1.1.1.1 255.255.255.255"], "unexpected": [], "removed": [],
+    }]
+
+    after = BEFORE.replace(" description LAN\n", " description LAN\n shutdown\n")
+    [block] = verify(after, [{"parent": "interface GigabitEthernet0/1", "commands": ["description LAN"]}], before=None)["blocks"]
+    assert block["applied"] == 1 and block["unexpected"] == []
@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+
+from services import scheduler
+
+TOPOLOGY_ID = "project-1"
+
+def wait_until(predicate, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+def start(fn, *args):
+    thread = threading.Thread(target=fn, args=args, daemon=True)
+    thread.start()
+    return thread
+
+@pytest.fixture
+def device(request):
+    """A device of its own for each test, with its scheduler state"""
+    name = request.node.name
+    yield name, scheduler._state(TOPOLOGY_ID, name)
+
+    with scheduler._devices_lock:
+        for key in [k for k in scheduler._devices if k[1].startswith(name)]:
+            del scheduler._devices[key]
+
+def test_same_read_is_coalesced(device):
+    name, state = device
+    release = threading.Event()
+    calls = []
+    results = []
+    coalesced = scheduler.scheduler_stats["coalesced"]
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "hostname R1"
+
+    def reader():
+        results.append(scheduler.read(TOPOLOGY_ID, name, "show running-config", fetch))
+
+    threads = [start(reader)]
+    wait_until(lambda: calls)
+    threads += [start(reader), start(reader)]
+    wait_until(lambda: scheduler.scheduler_stats["coalesced"] == coalesced + 2)
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["hostname R1"] * 3
+    assert state.inflight == {}
+
+    # Finished reads aren't reused
+    assert scheduler.read(TOPOLOGY_ID, name, "show running-config", lambda: "hostname R1-core") == "hostname R1-core"
+
+def test_coalesced_reads_share_the_error(device):
+    name, state = device
+    release = threading.Event()
+    errors = []
+    coalesced = scheduler.scheduler_stats["coalesced"]
+
+    def fetch():
+        release.wait(5)
+        raise ConnectionError("unreachable")
+
+    def reader():
+        try:
+            scheduler.read(TOPOLOGY_ID, name, "show running-config", fetch)
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [start(reader)]
+    wait_until(lambda: state.active == 1)
+    threads.append(start(reader))
+    wait_until(lambda: scheduler.scheduler_stats["coalesced"] == coalesced + 1)
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+
+def test_waiting_writer_goes_before_new_reads(device):
+    name, state = device
+    release = threading.Event()
+    order = []
+
+    def first_read():
+        release.wait(5)
+        order.append("read")
+
+    def push():
+        with scheduler.devices(TOPOLOGY_ID, [name], exclusive=True):
+            order.append("push")
+
+    threads = [start(scheduler.read, TOPOLOGY_ID, name, "show running-config", first_read)]
+    wait_until(lambda: state.active == 1)
+
+    threads.append(start(push))
+    wait_until(lambda: state.writers_waiting == 1)
+
+    threads.append(start(scheduler.read, TOPOLOGY_ID, name, "show version", lambda: order.append("later read")))
+    wait_until(lambda: state.queued == 2)
+
+    # Background reads don't queue behind a push, they're skipped
+    assert scheduler.try_read(TOPOLOGY_ID, name, lambda: order.append("keepalive")) is False
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ["read", "push", "later read"]
+    assert (state.active, state.writing, state.queued) == (0, False, 0)
+    assert scheduler.try_read(TOPOLOGY_ID, name, lambda: order.append("keepalive")) is True
+
+def test_devices_release_one_early(device):
+    name, state = device
+    other = scheduler._state(TOPOLOGY_ID, f"{name}-2")
+
+    with scheduler.devices(TOPOLOGY_ID, [name, f"{name}-2"], exclusive=False) as release:
+        assert state.active == other.active == 1
+
+        release(name)
+        assert state.active == 0 and other.active == 1
+
+        # Releasing twice is harmless
+        release(name)
+
+    assert other.active == 0
@@ -0,0 +1,77 @@
+import pytest
+
+from services import ssh
+
+class FakeShell:
+    """Interactive IOS shell: echoes each line, prints its answer and the prompt"""
+
+    def __init__(self, answers: dict):
+        self.answers = answers
+        self.typed = []
+        self.buffer = b"\r\nR1#"
+
+    def poll(self, timeout):
+        return len(self.buffer)
+
+    def read_nonblocking(self, size):
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def write(self, data: bytes):
+        command = data.decode().rstrip("\n")
+        self.typed.append(command)
+
+        answer = self.answers.get(command)
+        lines = [command, answer] if answer else [command]
+        self.buffer += "\r\n".join([*lines, "R1#"]).encode()
+
+    def is_eof(self):
+        return False
+
+    def close(self):
+        pass
+
+class FakeSession:
+    is_connected = True
+
+    def __init__(self, shell: FakeShell):
+        self.shell = shell
+
+    def connect(self, **kwargs):
+        pass
+
+    def invoke_shell(self):
+        return self.shell
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def shell(monkeypatch):
+    shell = FakeShell({
+        "show clock": "%LINK-3-UPDOWN: Interface GigabitEthernet0/1, changed state to up\r\n*10:00:00.000 UTC Sat Oct 17 2026",
+        "show runing-config": "               ^\r\n% Invalid input detected at '^' marker.",
+        "show ip": "% Incomplete command.",
+        "sh c": '% Ambiguous command:  "sh c"',
+    })
+
+    monkeypatch.setattr(ssh, "Session", lambda: FakeSession(shell))
+    return shell
+
+def test_session_setup(shell):
+    session = ssh.DeviceSession("10.0.0.1", "admin", "secret")
+
+    assert session.prompt == "R1#"
+    assert shell.typed == ["terminal length 0", "terminal no monitor"]
+
+def test_messages_are_not_rejections(shell):
+    session = ssh.DeviceSession("10.0.0.1", "admin", "secret")
+
+    assert session.run("show clock").endswith("UTC Sat Oct 17 2026")
+
+@pytest.mark.parametrize("command", ["show runing-config", "show ip", "sh c", "show nothing"])
+def test_rejected_commands(shell, command):
+    session = ssh.DeviceSession("10.0.0.1", "admin", "secret")
+
+    with pytest.raises(ssh.CommandError):
+        session.run(command)
@@ -0,0 +1,45 @@
+import pytest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routes import topology
+from services import jobs
+
+TOPOLOGY_ID = "project-1"
+TASK_ID = "6f1c2d8e-3b1a-4c55-9a57-0d6c1f2e9b10"
+
+@pytest.fixture
+def client(monkeypatch):
+    lookups = []
+
+    async def get_job(job_id):
+        lookups.append(job_id)
+        return {"id": job_id, "topology_id": TOPOLOGY_ID, "status": "completed"} if job_id == TASK_ID else None
+
+    monkeypatch.setattr(jobs, "get_job", get_job)
+
+    app = FastAPI()
+    app.include_router(topology.router)
+
+    with TestClient(app) as client:
+        client.lookups = lookups
+        yield client
+
+@pytest.mark.parametrize("path", ["/task/{}", "/task/{}/events"])
+def test_malformed_task_id_is_not_found(client, path):
+    response = client.get(f"/topologies/{TOPOLOGY_ID}" + path.format("not-a-uuid"))
+
+    assert response.status_code == 404
+    assert client.lookups == []
+
+def test_unknown_task_is_not_found(client):
+    response = client.get(f"/topologies/{TOPOLOGY_ID}/task/00000000-0000-0000-0000-000000000000")
+
+    assert response.status_code == 404
+
+def test_task_status(client):
+    response = client.get(f"/topologies/{TOPOLOGY_ID}/task/{TASK_ID}")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
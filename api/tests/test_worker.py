@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+import worker
+from services import jobs
+
+@pytest.fixture
+def queue(monkeypatch):
+    """In-memory stand-in for the jobs table, claimed in order"""
+    class Queue:
+        def __init__(self):
+            self.queued = []
+            self.running = {}
+            self.done = []
+            self.failed = []
+            self.requeued = []
+
+        def claim_job(self, worker_id):
+            if not self.queued:
+                return None
+
+            job = self.queued.pop(0)
+            job["attempts"] += 1
+            self.running[job["id"]] = worker_id
+            return job
+
+        def complete_job(self, job_id, message):
+            del self.running[job_id]
+            self.done.append((job_id, message))
+
+        def fail_job(self, job, error):
+            del self.running[job["id"]]
+            self.failed.append((job["id"], error))
+
+        def requeue_jobs(self, worker_ids):
+            held = [job_id for job_id, worker_id in self.running.items() if worker_id in worker_ids]
+            self.requeued.extend(held)
+            return len(held)
+
+    queue = Queue()
+    for name in ("claim_job", "complete_job", "fail_job", "requeue_jobs"):
+        monkeypatch.setattr(jobs, name, getattr(queue, name))
+    monkeypatch.setattr(jobs, "update_job", lambda job_id, **fields: None)
+    monkeypatch.setattr(worker, "JOB_POLL_INTERVAL", 0.01)
+
+    return queue
+
+def job(job_id: str, kind: str = "config_refresh"):
+    return {"id": job_id, "kind": kind, "topology_id": "project-1", "attempts": 0, "max_attempts": 3}
+
+def test_runs_claimed_jobs(queue, monkeypatch):
+    def refresh(topology_id, job_id):
+        if job_id == "j2":
+            raise RuntimeError("no devices")
+        return f"refreshed {topology_id}"
+
+    monkeypatch.setitem(worker.HANDLERS, "config_refresh", refresh)
+    queue.queued += [job("j1"), job("j2")]
+
+    threads, stop = worker.start_workers(2)
+    try:
+        deadline = time.monotonic() + 5
+        while (queue.queued or queue.running) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        worker.stop_workers(threads, stop, timeout=5)
+
+    assert queue.done == [("j1", "refreshed project-1")]
+    assert queue.failed == [("j2", "no devices")]
+    assert queue.requeued == []
+    assert not any(t.is_alive() for t in threads)
+
+def test_stop_requeues_jobs_still_running(queue, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def refresh(topology_id, job_id):
+        started.set()
+        release.wait(5)
+        return "done"
+
+    monkeypatch.setitem(worker.HANDLERS, "config_refresh", refresh)
+    queue.queued.append(job("j1"))
+
+    threads, stop = worker.start_workers(1)
+    assert started.wait(5)
+
+    # The worker's thread name is the id it claimed the job as
+    assert queue.running == {"j1": threads[0].name}
+
+    worker.stop_workers(threads, stop, timeout=0.05)
+    assert queue.requeued == ["j1"]
+
+    release.set()
+    threads[0].join(5)
+
+def test_fail_job_backs_off_then_gives_up(monkeypatch):
+    writes = []
+    updates = []
+
+    monkeypatch.setattr(jobs, "execute_write", lambda q, params=None: writes.append(params))
+    monkeypatch.setattr(jobs, "publish_progress", lambda job_id: None)
+    monkeypatch.setattr(jobs, "update_job", lambda job_id, **fields: updates.append(fields))
+    monkeypatch.setattr(jobs, "JOB_RETRY_BACKOFF", 10)
+
+    jobs.fail_job({"id": "j1", "attempts": 1, "max_attempts": 3}, "timeout")
+    jobs.fail_job({"id": "j1", "attempts": 2, "max_attempts": 3}, "timeout")
+    jobs.fail_job({"id": "j1", "attempts": 3, "max_attempts": 3}, "timeout")
+
+    assert [params[0] for params in writes] == [10, 20]
+    assert writes[1][1] == "Attempt 2 failed: timeout. Retrying in 20s..."
+    assert updates == [{"status": "failed", "message": "Error: timeout"}]
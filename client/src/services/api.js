@@ -28,6 +28,9 @@ export const topologyService = {
   getTaskStatus: (topologyId, taskId) =>
     api.get(`/topologies/${topologyId}/task/${taskId}`),
 
+  streamTaskEvents: (topologyId, taskId) =>
+    new EventSource(`${api.defaults.baseURL}/topologies/${topologyId}/task/${taskId}/events`),
+
   getChatSessions: (topologyId) => api.get(`/topologies/${topologyId}/chat`),
 
   deleteChatSession: (topologyId, sessionId) =>
@@ -113,7 +113,7 @@ export const useTopologyStore = defineStore("topology", {
             message: response.data.message,
           };
 
-          this.pollTaskStatus(topologyId, taskId);
+          this.watchTaskStatus(topologyId, taskId);
         }
 
         return response.data;
@@ -123,6 +123,77 @@ export const useTopologyStore = defineStore("topology", {
       }
     },
 
+    watchTaskStatus(topologyId, taskId) {
+      const source = topologyService.streamTaskEvents(topologyId, taskId);
+      let finished = false;
+
+      source.addEventListener("progress", (event) => {
+        const task = JSON.parse(event.data);
+
+        this.currentTask = {
+          ...this.currentTask,
+          id: taskId,
+          status: task.status,
+          progress: task.progress || 0,
+          message: task.message || "Processing...",
+          completed_devices: task.completed_devices || 0,
+          total_devices: task.total_devices || 0,
+        };
+      });
+
+      source.addEventListener("device", (event) => {
+        const device = JSON.parse(event.data);
+
+        if (device.status === "failed") {
+          console.warn(`Config refresh failed for ${device.device}:`, device.error);
+        }
+      });
+
+      source.addEventListener("summary", async (event) => {
+        const task = JSON.parse(event.data);
+
+        finished = true;
+        source.close();
+
+        this.currentTask = {
+          id: taskId,
+          status: task.status,
+          progress: task.progress || 0,
+          message: task.message,
+          completed_devices: task.completed_devices || 0,
+          total_devices: task.total_devices || 0,
+        };
+
+        if (task.status === "completed") {
+          await this.fetchDevices(topologyId);
+          setTimeout(() => {
+            this.currentTask = null;
+          }, 3000);
+        } else {
+          this.error = task.message;
+          setTimeout(() => {
+            this.currentTask = null;
+          }, 5000);
+        }
+      });
+
+      source.onerror = (event) => {
+        if (finished) return;
+        finished = true;
+        source.close();
+
+        // An "error" event sent by the server, e.g. the task was deleted
+        if (event.data) {
+          this.error = JSON.parse(event.data).detail;
+          this.currentTask = null;
+          return;
+        }
+
+        // Stream unavailable (e.g. a proxy buffering it): fall back to polling
+        this.pollTaskStatus(topologyId, taskId);
+      };
+    },
+
     async pollTaskStatus(topologyId, taskId) {
       const poll = async () => {
         try {
@@ -151,7 +222,7 @@ export const useTopologyStore = defineStore("topology", {
             setTimeout(() => {
               this.currentTask = null;
             }, 5000);
-          } else if (task.status === "running") {
+          } else if (task.status === "running" || task.status === "queued") {
             setTimeout(poll, 1000);
           }
         } catch (error) {